@@ -0,0 +1,121 @@
+# benchmarks/startup_time.py
+"""Mede o tempo de inicialização até o diálogo de login.
+
+Uso (na pasta do projeto):
+
+    python benchmarks/startup_time.py [--runs 5] [--budget-ms 800] [--top 15]
+
+1. ``python -X importtime -c "import main"``: tempo de importação de cada
+   módulo carregado antes do login; falha se algum módulo pesado (janelas de
+   operação, QtPrintSupport) voltar a ser importado na inicialização.
+2. Processo novo que importa ``main``, cria o QApplication e exibe o
+   LoginWindow: tempo até a primeira pintura (mediana de ``--runs``
+   execuções). Falha se passar de ``--budget-ms``.
+
+Resultados (Linux, Python 3.11.7, PySide6 6.9.1, QT_QPA_PLATFORM=offscreen,
+``--runs 11``, três execuções do script em cada versão):
+
+    versão                              import main     até a primeira pintura
+    antes da importação adiada          85-89 ms        87-89 ms (163 módulos)
+    com a importação adiada             54-56 ms        55-60 ms (142 módulos)
+
+Na versão anterior todas as janelas de operação e o QtPrintSupport eram
+importados antes do login. Ela chamava ``locale.setlocale(pt_BR.UTF-8)``
+na importação; onde esse locale não existe, a medição usa um
+sitecustomize que recai em C.UTF-8 (nas duas versões, custo desprezível).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Não podem ser importados antes do login
+DEFERRED_MODULES = (
+    "views.main_window",
+    "views.buy_window",
+    "views.request_window",
+    "views.stock_off_window",
+    "views.movement",
+    "views.report_window",
+    "PySide6.QtPrintSupport",
+)
+
+FIRST_PAINT = """
+import time
+start = time.perf_counter()
+import main
+from PySide6.QtWidgets import QApplication
+from views.login_window import LoginWindow
+app = QApplication([])
+window = LoginWindow()
+window.show()
+app.processEvents()
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def import_times():
+    """{módulo: (próprio, acumulado) em microssegundos} de ``import main``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def first_paint_ms(runs):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", FIRST_PAINT],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de inicialização até o login")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0,
+                        help="limite para a mediana até a primeira pintura")
+    parser.add_argument("--top", type=int, default=15,
+                        help="módulos mais lentos exibidos")
+    args = parser.parse_args()
+
+    times = import_times()
+    total = times.get("main", (0, 0))[1]
+    print(f"import main: {total / 1000:.1f} ms ({len(times)} módulos)")
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (own, cumulative) in slowest:
+        print(f"  {own / 1000:8.1f} ms  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = [name for name in DEFERRED_MODULES if name in times]
+    if eager:
+        print("Importados antes do login:", ", ".join(eager))
+        failed = True
+
+    samples = first_paint_ms(args.runs)
+    median = statistics.median(samples)
+    print(f"Até a primeira pintura: mediana {median:.1f} ms "
+          f"(mín. {min(samples):.1f}, máx. {max(samples):.1f}, {args.runs} execuções)")
+    if median > args.budget_ms:
+        print(f"Acima do limite de {args.budget_ms:.0f} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,6 @@ import sys
 from PySide6.QtWidgets import QApplication, QStyleFactory
 
 from views.login_window import LoginWindow
-from views.main_window import MainWindow
 
 
 def main():
@@ -21,7 +20,9 @@ def main():
             role = login_dialog.role
             name = login_dialog.name
 
-            # Criar e exibir a janela principal
+            # Criar e exibir a janela principal (importada só depois do login,
+            # para o diálogo de login aparecer o quanto antes)
+            from views.main_window import MainWindow
             window = MainWindow(role, username, name)
             window.show()
 
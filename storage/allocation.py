@@ -0,0 +1,133 @@
+# storage/allocation.py
+
+import os
+
+FIFO = "fifo"          # por ordem de ID: as requisições mais antigas são atendidas primeiro
+# Pelo campo "prioridade" (maior primeiro); empate por ID. Nenhuma janela
+# grava esse campo: ele vem de fora do programa (editado em requisicoes.json
+# ou gravado por outro sistema). Sem ele, todas têm prioridade 0 e a
+# política equivale a FIFO.
+PRIORITY = "priority"
+FAIR = "fair"          # divisão justa (max-min): todas recebem igualmente até a demanda
+
+POLICIES = {
+    FIFO: "Ordem de chegada",
+    PRIORITY: "Prioridade",
+    FAIR: "Divisão justa",
+}
+
+# Política usada quando a janela não escolhe outra
+ALLOCATION_POLICY = os.environ.get("REQUISICAO_ALOCACAO", FIFO)
+
+
+class Allocation:
+    """Resultado da alocação do estoque entre as requisições.
+
+    ``allocated`` -> {id: {item: quantidade reservada do estoque}},
+    ``demand`` -> {item: quantidade solicitada no total},
+    ``shortfall`` -> {item: quantidade que falta comprar} (só itens com falta).
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.allocated = {}
+        self.demand = {}
+        self.shortfall = {}
+
+    def for_requests(self, req_ids):
+        """{item: quantidade alocada} somada sobre as requisições ``req_ids``"""
+        totals = {}
+        for req_id in req_ids:
+            for item, qty in self.allocated.get(req_id, {}).items():
+                totals[item] = totals.get(item, 0) + qty
+        return totals
+
+
+def allocate(requests, stock, policy=ALLOCATION_POLICY, reserved=None):
+    """Distribui o saldo de ``stock`` entre ``requests`` segundo ``policy``.
+
+    ``stock`` é uma StockTable (ou dicionário item -> registro). ``reserved``
+    é o total reservado por item (storage.reservation), incluindo o das
+    próprias ``requests``; a parte reservada por outras requisições (já
+    compradas, à espera de envio) não é distribuída. Com PRIORITY, vale o
+    campo ``prioridade`` das requisições (ausente = 0), que o programa não
+    define: vem de fora dele. Cada item é distribuído de forma independente;
+    o custo é O(L log L) para L linhas de requisição (a ordenação das
+    requisições é feita uma única vez).
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Política de alocação desconhecida: {policy}")
+
+    if policy == PRIORITY:
+        ordered = sorted(requests, key=lambda req: (-req.get("prioridade", 0), req["id"]))
+    else:
+        ordered = sorted(requests, key=lambda req: req["id"])
+
+    # item -> [(id, quantidade)] já na ordem de atendimento
+    lines = {}
+    for request in ordered:
+        for item in request.get("itens", []):
+            lines.setdefault(item["item"], []).append((request["id"], item["quantidade"]))
+
+    result = Allocation(policy)
+    for item, demands in lines.items():
+        record = stock.get(item) or {}
+        total = sum(qty for _, qty in demands)
+        held = max(0, reserved.get(item, 0) - total) if reserved is not None else 0
+        on_hand = max(0, record.get("quantidade", 0) - held)
+        result.demand[item] = total
+        if total > on_hand:
+            result.shortfall[item] = total - on_hand
+
+        if policy == FAIR:
+            shares = _fair_shares(demands, on_hand)
+        else:
+            shares = _in_order(demands, on_hand)
+        for req_id, qty in shares:
+            if qty:
+                per_request = result.allocated.setdefault(req_id, {})
+                per_request[item] = per_request.get(item, 0) + qty
+    return result
+
+
+def _in_order(demands, on_hand):
+    """Atende as demandas na ordem dada até o saldo acabar"""
+    shares = []
+    for req_id, qty in demands:
+        given = min(qty, on_hand)
+        on_hand -= given
+        shares.append((req_id, given))
+    return shares
+
+
+def _fair_shares(demands, on_hand):
+    """Divisão max-min: nenhuma requisição recebe mais que a parte igual das demais.
+
+    As demandas menores que a parte igual são atendidas por inteiro e a sobra
+    volta a ser dividida entre as restantes; as unidades que não se dividem
+    por igual vão para as mais antigas.
+    """
+    count = len(demands)
+    given = [0] * count
+    remaining = on_hand
+    by_size = sorted(range(count), key=lambda pos: demands[pos][1])
+    for done, pos in enumerate(by_size):
+        share = remaining // (count - done)
+        if demands[pos][1] <= share:
+            given[pos] = demands[pos][1]
+            remaining -= given[pos]
+            continue
+        # Esta e as maiores querem mais que a parte igual: todas recebem a parte
+        for other in by_size[done:]:
+            given[other] = share
+        remaining -= share * (count - done)
+        break
+
+    # Unidades que sobraram do arredondamento (menos que o número de demandas)
+    for pos in range(count):
+        if remaining == 0:
+            break
+        if given[pos] < demands[pos][1]:
+            given[pos] += 1
+            remaining -= 1
+    return [(req_id, given[pos]) for pos, (req_id, _) in enumerate(demands)]
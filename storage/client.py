@@ -0,0 +1,211 @@
+# storage/client.py
+
+import copy
+import json
+import socket
+import threading
+from contextlib import nullcontext
+
+from storage.concurrency import ConflictError, InsufficientStockError, LockTimeout
+from storage.json_store import _MISSING
+from storage.stock_table import StockTable
+
+# Pedidos sem efeito colateral: podem ser repetidos após uma reconexão
+_READ_METHODS = {
+    "ping", "exists", "read", "stock", "version", "stock_version", "requests_with_status",
+    "reserved_quantities"
+}
+
+
+class RemoteError(Exception):
+    """Erro devolvido pelo serviço de dados sem equivalente local"""
+
+
+def _raise_error(error):
+    kind, message = error.get("type"), error.get("message", "")
+    if kind == "InsufficientStockError":
+        raise InsufficientStockError(error["name"], {
+            item: tuple(values) for item, values in error["shortages"].items()
+        })
+    if kind == "ConflictError":
+        raise ConflictError(error["name"], error["keys"])
+    if kind == "PermissionError":
+        raise PermissionError(message)
+    if kind == "FileNotFoundError":
+        raise FileNotFoundError(message)
+    if kind == "JSONDecodeError":
+        raise json.JSONDecodeError(message, "", 0)
+    if kind == "LockTimeout":
+        raise LockTimeout(message)
+    raise RemoteError(f"{kind}: {message}")
+
+
+class RemoteStore:
+    """Cliente do serviço de dados (storage.server) com a interface do JsonStore.
+
+    Mantém uma única conexão aberta e um cache local com a versão de cada
+    coleção; uma leitura sem alterações no servidor custa apenas uma
+    pergunta e uma resposta curtas. ``address`` é ``host:porta`` ou
+    ``unix:/caminho/do/socket``.
+    """
+
+    def __init__(self, address, timeout=30.0):
+        self.address = address
+        self.data_dir = address
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._file = None
+        self._sock = None
+        self._next_id = 0
+        self._cache = {}   # (tipo, nome) -> (versão, dados)
+        self._tables = {}  # nome -> (lista de origem, StockTable)
+
+    # ----------------------------------------------------------------- conexão
+
+    def _connect(self):
+        if self.address.startswith("unix:"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address[len("unix:"):])
+        else:
+            host, port = self.address.rsplit(":", 1)
+            sock = socket.create_connection((host, int(port)), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def _disconnect(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._file = None
+        self._sock = None
+
+    def call(self, method, **params):
+        """Envia um pedido e aguarda a resposta pela conexão compartilhada"""
+        attempts = 2 if method in _READ_METHODS else 1
+        with self._lock:
+            for attempt in range(attempts):
+                try:
+                    if self._file is None:
+                        self._connect()
+                    self._next_id += 1
+                    message = {"id": self._next_id, "method": method, "params": params}
+                    self._file.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self._file.flush()
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("O serviço de dados encerrou a conexão")
+                    break
+                except OSError:
+                    self._disconnect()
+                    if attempt == attempts - 1:
+                        raise
+
+        response = json.loads(line)
+        if "error" in response:
+            _raise_error(response["error"])
+        return response.get("result")
+
+    # ----------------------------------------------------------------- leitura
+
+    def path(self, name):
+        return f"{self.address}/{name}"
+
+    def exists(self, name):
+        return self.call("exists", name=name)
+
+    def version(self, name):
+        return self.call("version", name=name)
+
+    def stock_version(self, name):
+        return self.call("stock_version", name=name)
+
+    def _cached_call(self, method, name):
+        cached = self._cache.get((method, name))
+        known_version = cached[0] if cached else None
+        result = self.call(method, name=name, known_version=known_version)
+        if result.get("unchanged"):
+            return cached[1]
+        self._cache[(method, name)] = (result["version"], result["data"])
+        return result["data"]
+
+    def read(self, name, default=_MISSING):
+        try:
+            return self._cached_call("read", name)
+        except FileNotFoundError:
+            if default is _MISSING:
+                raise
+            return default
+
+    def read_copy(self, name, default=_MISSING):
+        return copy.deepcopy(self.read(name, default))
+
+    def requests_with_status(self, *statuses):
+        return self.call("requests_with_status", statuses=list(statuses))
+
+    def reserved_quantities(self):
+        return self.call("reserved_quantities")
+
+    def stock(self, name):
+        return self._cached_call("stock", name)
+
+    def stock_table(self, name):
+        """Saldo indexado por item, reconstruído só quando o servidor informa mudança"""
+        rows = self.stock(name)
+        cached = self._tables.get(name)
+        if cached is None or cached[0] is not rows:
+            cached = self._tables[name] = (rows, StockTable(rows))
+        return cached[1]
+
+    # ----------------------------------------------------------------- escrita
+
+    def write(self, name, data):
+        self.call("write", name=name, data=data)
+
+    def record_movements(self, events):
+        if events:
+            self.call("record_movements", events=events)
+
+    def allocate_ids(self, name, count=1):
+        return self.call("allocate_ids", name=name, count=count)
+
+    def update_request_status(self, req_id, status):
+        return self.call("update_request_status", req_id=req_id, status=status)
+
+    def lock(self, *names):
+        """Cada pedido é bloqueado pelo próprio serviço; não há o que bloquear no cliente"""
+        return nullcontext()
+
+    def modify(self, name, func, default=None):
+        raise TypeError("modify() não pode ser enviado ao serviço de dados")
+
+    def save_records(self, name, records, key="id"):
+        with self.transaction() as tx:
+            tx.save_records(name, records, key)
+
+    def transaction(self):
+        from storage.transaction import Transaction
+        return Transaction(self)
+
+    def commit_transaction(self, tx):
+        self.call("commit", transaction=tx.to_message())
+
+    def recover(self):
+        """A recuperação é feita pelo próprio serviço ao iniciar"""
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._cache.clear()
+            self._tables.clear()
+        else:
+            self._cache.pop(("read", name), None)
+            self._cache.pop(("stock", name), None)
+            self._tables.pop(name, None)
@@ -0,0 +1,180 @@
+# storage/concurrency.py
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+    import fcntl
+
+# Tempo máximo de espera por um arquivo bloqueado por outra estação
+LOCK_TIMEOUT = 10.0
+LOCK_SUFFIX = ".lock"
+
+# Campo de versão mantido em cada registro salvo com save_records
+VERSION_KEY = "versao"
+
+
+class LockTimeout(TimeoutError):
+    """Outro processo manteve o arquivo bloqueado por tempo demais"""
+
+
+class ConflictError(Exception):
+    """Registros alterados por outra estação desde que foram carregados"""
+
+    def __init__(self, name, keys):
+        self.name = name
+        self.keys = list(keys)
+        super().__init__(
+            f"Registros alterados por outro usuário em {name}: "
+            + ", ".join(str(k) for k in self.keys)
+        )
+
+
+class InsufficientStockError(ConflictError):
+    """Saldo menor que o exigido no momento do commit (outra estação o consumiu).
+
+    ``keys`` são os itens sem saldo; ``shortages`` -> {item: (exigido, disponível)}.
+    """
+
+    def __init__(self, name, shortages):
+        self.shortages = dict(shortages)
+        super().__init__(name, self.shortages)
+        self.args = (
+            f"Saldo insuficiente em {name}: "
+            + ", ".join(f"{item} (exigido {need}, disponível {have})"
+                        for item, (need, have) in self.shortages.items()),
+        )
+
+
+# Bloqueios mantidos por este processo: caminho -> [descritor, contagem]
+_held = {}
+_thread_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _os_lock(fd):
+    if msvcrt:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _os_unlock(fd):
+    if msvcrt:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """Bloqueio exclusivo consultivo num arquivo ``<dados>.lock``.
+
+    É reentrante na mesma thread e exclui tanto outras threads quanto outros
+    processos (inclusive em outras estações que usam a mesma pasta).
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path + LOCK_SUFFIX
+        self.timeout = timeout
+
+    def acquire(self):
+        with _registry_lock:
+            thread_lock = _thread_locks.setdefault(self.path, threading.RLock())
+        if not thread_lock.acquire(timeout=self.timeout):
+            raise LockTimeout(f"Tempo esgotado aguardando {self.path}")
+
+        held = _held.get(self.path)
+        if held:
+            held[1] += 1
+            return
+
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        except OSError:
+            thread_lock.release()
+            raise
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _os_lock(fd)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    thread_lock.release()
+                    raise LockTimeout(f"Tempo esgotado aguardando {self.path}")
+                time.sleep(0.02)
+        _held[self.path] = [fd, 1]
+
+    def release(self):
+        held = _held[self.path]
+        held[1] -= 1
+        if held[1] == 0:
+            del _held[self.path]
+            try:
+                _os_unlock(held[0])
+            finally:
+                os.close(held[0])
+        _thread_locks[self.path].release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+@contextmanager
+def lock_files(paths, timeout=LOCK_TIMEOUT):
+    """Bloqueia vários arquivos sempre na mesma ordem (evita impasses)"""
+    locks = [FileLock(path, timeout) for path in sorted(set(paths))]
+    acquired = []
+    try:
+        for lock in locks:
+            lock.acquire()
+            acquired.append(lock)
+        yield
+    finally:
+        for lock in reversed(acquired):
+            lock.release()
+
+
+def merge_records(name, current, changes, key="id"):
+    """Aplica ``changes`` sobre ``current`` conferindo a versão de cada registro.
+
+    Cada registro alterado traz em ``versao`` a versão que foi carregada; se
+    a versão gravada for outra, alguém o alterou nesse meio-tempo e nada é
+    aplicado (ConflictError). Os demais registros do arquivo ficam intactos.
+    """
+    index = {rec[key]: pos for pos, rec in enumerate(current)}
+    conflicts = []
+    merged = []
+
+    for rec in changes:
+        base = rec.get(VERSION_KEY, 0)
+        pos = index.get(rec[key])
+        stored_version = current[pos].get(VERSION_KEY, 0) if pos is not None else 0
+        if stored_version != base or (pos is None and base):
+            conflicts.append(rec[key])
+            continue
+        merged.append((pos, dict(rec, **{VERSION_KEY: base + 1})))
+
+    if conflicts:
+        raise ConflictError(name, conflicts)
+
+    for pos, rec in merged:
+        if pos is None:
+            index[rec[key]] = len(current)
+            current.append(rec)
+        else:
+            current[pos] = rec
+    return current
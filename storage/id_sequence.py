@@ -0,0 +1,50 @@
+# storage/id_sequence.py
+
+import os
+import threading
+
+from storage.json_store import get_store
+
+# IDs reservados de uma vez por estação. Blocos maiores reduzem o acesso ao
+# arquivo compartilhado; os IDs não usados de um bloco são perdidos quando o
+# programa fecha. Mesmo com 1 a numeração pode ter lacunas: a janela de
+# requisições reserva o ID ao clicar em Criar, e ele se perde se a requisição
+# não for salva.
+ID_BLOCK_SIZE = int(os.environ.get("REQUISICAO_ID_BLOCO", "1"))
+
+
+class IdSequence:
+    """Gerador de IDs de uma coleção, sem colisões entre estações.
+
+    Cada chamada a ``next_id`` custa O(1): usa o bloco já reservado ou
+    reserva um novo com ``store.allocate_ids`` (sequência persistida e
+    protegida por bloqueio no repositório).
+    """
+
+    def __init__(self, name, store=None, block_size=ID_BLOCK_SIZE):
+        self.name = name
+        self.store = store
+        self.block_size = max(1, block_size)
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            if self._next >= self._end:
+                store = self.store or get_store()
+                self._next = store.allocate_ids(self.name, self.block_size)
+                self._end = self._next + self.block_size
+            self._next += 1
+            return self._next - 1
+
+
+_sequences = {}
+
+
+def get_sequence(name):
+    """Sequência compartilhada da coleção ``name`` neste processo"""
+    sequence = _sequences.get(name)
+    if sequence is None:
+        sequence = _sequences[name] = IdSequence(name)
+    return sequence
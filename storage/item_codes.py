@@ -0,0 +1,39 @@
+# storage/item_codes.py
+
+from storage.json_store import get_store, CODIGOS_JSON
+from storage.text_index import normalize
+
+
+class ItemCodeIndex:
+    """Índice código -> item usado pela leitura de código de barras.
+
+    Os códigos vêm de ``codigos.json``; além deles, o próprio nome de cada
+    item do estoque (sem acentos/maiúsculas) é aceito como código, para a
+    digitação manual. A resolução de uma leitura é uma consulta a dicionário.
+    """
+
+    def __init__(self, items=(), codes=()):
+        self._items = {}
+        for item in items:
+            self._items[normalize(item)] = item
+        for entry in codes:
+            code, item = str(entry.get("codigo", "")).strip(), entry.get("item")
+            if code and item:
+                self._items[normalize(code)] = item
+
+    def __len__(self):
+        return len(self._items)
+
+    def resolve(self, code):
+        """Item lido pelo código ``code`` (None se desconhecido)"""
+        return self._items.get(normalize(code.strip()))
+
+
+def load_item_codes(stock_name, store=None):
+    """Índice com os itens do estoque ``stock_name`` e os códigos cadastrados.
+
+    Com o banco SQLite, que não guarda códigos, só os nomes são aceitos.
+    """
+    store = store or get_store()
+    items = (record["item"] for record in store.stock_table(stock_name))
+    return ItemCodeIndex(items, store.read(CODIGOS_JSON, default=[]))
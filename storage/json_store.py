@@ -0,0 +1,288 @@
+# storage/json_store.py
+
+import copy
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+from storage.request_index import RequestIndex
+
+# Diretório onde ficam os arquivos de dados
+if getattr(sys, 'frozen', False):
+    DATA_DIR = os.path.dirname(sys.executable)
+else:
+    # Raiz do projeto (sobe um nível a partir deste pacote)
+    DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nomes dos arquivos controlados pelo repositório
+REQUISICOES_JSON = "requisicoes.json"
+REQUISICOES_COMPRADAS_JSON = "requisicoes_compradas.json"
+ESTOQUE_ALMOX_JSON = "almoxarifado.json"
+ESTOQUE_SETOR_JSON = "setor.json"
+USERS_JSON = "users.json"
+# Próximo ID livre de cada coleção (storage.id_sequence)
+SEQUENCIAS_JSON = "sequencias.json"
+# Códigos de barras dos itens: [{"codigo": "789...", "item": "Caneta"}] (storage.item_codes)
+CODIGOS_JSON = "codigos.json"
+
+_MISSING = object()
+
+
+class JsonStore:
+    """Repositório dos arquivos JSON com cache em memória.
+
+    Cada arquivo é lido uma única vez e mantido já convertido; ele só é
+    lido de novo quando a assinatura (mtime, tamanho, inode) muda no disco.
+    Os dados devolvidos por ``read`` são compartilhados entre as janelas e
+    não devem ser alterados — use ``read_copy`` para obter uma cópia editável.
+    Pode ser usado pelas threads de carregamento (views.workers): o cache é
+    protegido por um bloqueio interno.
+
+    Com algum arquivo bloqueado (``lock`` ou durante um commit) a assinatura
+    não basta: em compartilhamentos de rede o mtime é grosseiro e outra
+    estação pode regravar o arquivo com o mesmo tamanho. Nesses trechos toda
+    leitura vai ao disco; se o conteúdo não mudou, os objetos em cache são
+    mantidos (os índices construídos sobre eles continuam válidos).
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self._cache = {}      # nome -> (assinatura, dados)
+        self._versions = {}   # nome -> contador de alterações
+        self._ledger = None
+        self._request_index = RequestIndex()
+        self._lock = threading.RLock()
+        self._local = threading.local()  # profundidade de lock() na thread atual
+
+    def path(self, name):
+        """Caminho absoluto de um arquivo de dados"""
+        return os.path.join(self.data_dir, name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def signature(self, name):
+        """Retorna (mtime, tamanho, inode) do arquivo ou None se ele não existir"""
+        try:
+            st = os.stat(self.path(name))
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def version(self, name):
+        """Contador incrementado sempre que o conteúdo em cache é substituído"""
+        return self._versions.get(name, 0)
+
+    def read(self, name, default=_MISSING):
+        """Retorna o conteúdo do arquivo, relendo do disco apenas se ele mudou.
+
+        Levanta FileNotFoundError (ou devolve ``default``, se informado) quando
+        o arquivo não existe e json.JSONDecodeError quando está corrompido.
+        """
+        with self._lock:
+            sig = self.signature(name)
+            if sig is None:
+                self._cache.pop(name, None)
+                if default is _MISSING:
+                    raise FileNotFoundError(f"Arquivo {self.path(name)} não encontrado")
+                return default
+
+            cached = self._cache.get(name)
+            fresh = getattr(self._local, "locked", 0) > 0
+            if cached is not None and cached[0] == sig and not fresh:
+                return cached[1]
+
+            with open(self.path(name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if cached is not None and cached[1] == data:
+                self._cache[name] = (sig, cached[1])
+                return cached[1]
+            self._store(name, sig, data)
+            return data
+
+    def read_copy(self, name, default=_MISSING):
+        """Cópia independente dos dados, que pode ser alterada livremente"""
+        return copy.deepcopy(self.read(name, default))
+
+    def write(self, name, data):
+        """Grava os dados e atualiza o cache sem reler o disco.
+
+        Passa pela transação (temporário + renomeação): uma queda no meio
+        nunca deixa o arquivo pela metade.
+        """
+        with self.transaction() as tx:
+            tx.write(name, data)
+
+    @contextmanager
+    def lock(self, *names):
+        """Bloqueio exclusivo (entre processos) dos arquivos informados"""
+        from storage.concurrency import lock_files
+        with lock_files(self.path(name) for name in names):
+            depth = getattr(self._local, "locked", 0)
+            self._local.locked = depth + 1
+            try:
+                yield
+            finally:
+                self._local.locked = depth
+
+    def modify(self, name, func, default=None):
+        """Lê, altera e grava um arquivo com ele bloqueado do início ao fim"""
+        with self.transaction() as tx:
+            tx.modify(name, func, default)
+
+    def save_records(self, name, records, key="id"):
+        """Grava só os registros alterados, detectando edições concorrentes.
+
+        Levanta storage.concurrency.ConflictError se algum registro mudou no
+        disco desde que foi carregado; em caso de sucesso a ``versao`` de
+        cada registro informado é incrementada.
+        """
+        with self.transaction() as tx:
+            tx.save_records(name, records, key)
+
+    def refresh_cache(self, name, data, changed=None):
+        """Associa ``data`` à assinatura atual do arquivo recém-gravado.
+
+        ``changed`` são as chaves dos registros alterados (None se não se
+        sabe); com elas o índice de status é atualizado sem ser refeito.
+        """
+        with self._lock:
+            previous = self._cache.get(name)
+            self._store(name, self.signature(name), data)
+            index = self._request_index
+            if (name == REQUISICOES_JSON and changed is not None
+                    and previous is not None and index.source is previous[1]):
+                index.update(data, changed)
+
+    def requests_with_status(self, *statuses):
+        """Requisições com algum dos status informados (lista compartilhada: não alterar)"""
+        with self._lock:
+            requests = self.read(REQUISICOES_JSON, default=[])
+            if self._request_index.source is not requests:
+                self._request_index.rebuild(requests)
+            return self._request_index.select(statuses)
+
+    def reserved_quantities(self):
+        """{item: quantidade reservada} pelas requisições aprovadas e ainda não enviadas"""
+        with self._lock:
+            requests = self.read(REQUISICOES_JSON, default=[])
+            if self._request_index.source is not requests:
+                self._request_index.rebuild(requests)
+            # Cópia: o índice continua sendo atualizado pelas próximas transações
+            return dict(self._request_index.reserved())
+
+    def transaction(self):
+        """Transação que grava vários arquivos e o livro de uma só vez"""
+        from storage.transaction import Transaction
+        return Transaction(self)
+
+    def commit_transaction(self, tx):
+        from storage.ledger import LEDGER_FILE
+        from storage.transaction import commit_files
+
+        # O livro também é bloqueado para conferir os saldos exigidos
+        names = tx.names | ({LEDGER_FILE} if tx.events or tx.requirements else set())
+        with self.lock(*names):
+            tx.resolve()
+            commit_files(self, tx)
+        # Fora dos bloqueios da transação: o ponto de controle regrava os
+        # estoques; se falhar, a transação continua valendo (só é registrado)
+        if tx.events:
+            self.ledger.checkpoint_if_due()
+
+    def recover(self):
+        """Conclui ou desfaz uma transação interrompida por queda ou erro"""
+        from storage.transaction import recover
+        recover(self)
+
+    @property
+    def ledger(self):
+        """Livro de movimentações de estoque (storage.ledger.StockLedger)"""
+        with self._lock:
+            if self._ledger is None:
+                from storage.ledger import StockLedger
+                self._ledger = StockLedger(self)
+            return self._ledger
+
+    def stock(self, name):
+        """Saldo atual de um estoque: ponto de controle + eventos do livro"""
+        return self.ledger.stock(name)
+
+    def stock_table(self, name):
+        """Saldo atual indexado por item (storage.stock_table.StockTable)"""
+        return self.ledger.table(name)
+
+    def stock_version(self, name):
+        """Muda sempre que o saldo de algum estoque muda"""
+        return self.ledger.version
+
+    def record_movements(self, events):
+        """Registra eventos de movimentação (acréscimo ao livro, sem reescrever os estoques)"""
+        self.ledger.append(events)
+
+    def allocate_ids(self, name, count=1):
+        """Reserva ``count`` IDs consecutivos de ``name`` e devolve o primeiro.
+
+        O próximo ID livre fica em sequencias.json, alterado com o arquivo
+        bloqueado; a coleção só é percorrida na primeira reserva, para
+        inicializar a sequência a partir do maior ID existente.
+        """
+        with self.lock(SEQUENCIAS_JSON):
+            sequences = self.read_copy(SEQUENCIAS_JSON, default={})
+            next_id = sequences.get(name)
+            if next_id is None:
+                records = self.read(name, default=[])
+                next_id = max((rec["id"] for rec in records), default=0) + 1
+            sequences[name] = next_id + count
+            with self.transaction() as tx:
+                tx.write(SEQUENCIAS_JSON, sequences)
+        return next_id
+
+    def update_request_status(self, req_id, status):
+        """Altera o status de uma requisição (reescreve o arquivo inteiro)"""
+        with self.transaction() as tx:
+            tx.update_request_status(req_id, status)
+
+    def invalidate(self, name=None):
+        """Descarta o cache de um arquivo (ou de todos) forçando nova leitura"""
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(name, None)
+
+    def _store(self, name, sig, data):
+        self._cache[name] = (sig, data)
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+
+_store = None
+
+
+def get_store():
+    """Instância compartilhada do repositório usada por todas as janelas.
+
+    Usa o banco SQLite quando ele já foi criado pela migração
+    (``python -m storage.sqlite_store``); a variável de ambiente
+    REQUISICAO_BACKEND=json força o uso dos arquivos JSON. Com
+    REQUISICAO_SERVER=host:porta (ou unix:/caminho) os dados são obtidos do
+    serviço iniciado com ``python -m storage.server``.
+    """
+    global _store
+    if _store is None:
+        server = os.environ.get("REQUISICAO_SERVER")
+        if server:
+            from storage.client import RemoteStore
+            _store = RemoteStore(server)
+            return _store
+
+        from storage import sqlite_store
+        db_path = os.path.join(DATA_DIR, sqlite_store.DATABASE_FILE)
+        if os.environ.get("REQUISICAO_BACKEND") != "json" and os.path.exists(db_path):
+            _store = sqlite_store.SqliteStore(db_path)
+        else:
+            _store = JsonStore()
+            _store.recover()
+    return _store
@@ -0,0 +1,288 @@
+# storage/ledger.py
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from storage.json_store import ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON
+from storage.stock_table import StockTable
+from storage.transaction import _replace
+
+# Livro de movimentações (uma linha JSON por evento, somente acréscimos)
+LEDGER_FILE = "movimentos.jsonl"
+# Último ponto de controle: estoques consolidados + posição no livro
+CHECKPOINT_FILE = "movimentos.checkpoint.json"
+# Quantidade de eventos acumulados que dispara um novo ponto de controle
+CHECKPOINT_INTERVAL = 500
+
+STOCK_FILES = (ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON)
+
+# Tipos de movimentação
+COMPRA = "compra"
+ENVIO = "envio"
+RECEBIMENTO = "recebimento"
+BAIXA = "baixa"
+
+# Eventos apenas registrados no histórico, sem efeito no saldo
+# (o setor já recebe o crédito no envio)
+NEUTRAL_EVENTS = {RECEBIMENTO}
+
+
+def new_event(tipo, estoque, item, quantidade, valor_unitario=None, requisicao=None):
+    """Cria um evento de movimentação; ``quantidade`` é a variação do saldo"""
+    event = {
+        "tipo": tipo,
+        "estoque": estoque,
+        "item": item,
+        "quantidade": quantidade,
+    }
+    if valor_unitario is not None:
+        event["valor_unitario"] = valor_unitario
+    if requisicao is not None:
+        event["requisicao"] = requisicao
+    return event
+
+
+def apply_event(table, event):
+    """Aplica um evento a uma StockTable (storage.stock_table).
+
+    Compras recalculam o preço médio ponderado; nos demais tipos o valor
+    unitário do evento só é usado quando o item ainda não existe.
+    """
+    if event["tipo"] in NEUTRAL_EVENTS:
+        return
+
+    name = event["item"]
+    qty = event["quantidade"]
+    unit = event.get("valor_unitario")
+    row = table.get(name)
+
+    if row is None:
+        row = table.insert(
+            {"item": name, "quantidade": 0, "valor_unitario": unit or 0.0, "valor_total": 0.0}
+        )
+    elif event["tipo"] == COMPRA and unit is not None and qty > 0:
+        current_value = row["quantidade"] * row["valor_unitario"]
+        new_qty = row["quantidade"] + qty
+        if new_qty:
+            row["valor_unitario"] = (current_value + qty * unit) / new_qty
+
+    row["quantidade"] += qty
+    row["valor_total"] = row["quantidade"] * row["valor_unitario"]
+    table.touch()
+
+
+class StockLedger:
+    """Saldos de estoque derivados de um ponto de controle + livro de eventos.
+
+    Cada operação apenas acrescenta linhas ao livro. O saldo atual é o
+    ponto de controle mais os eventos gravados depois dele; a leitura é
+    incremental, ou seja, só os bytes novos do livro são processados.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._tables = None          # nome do estoque -> StockTable
+        self._seq = 0                # último evento aplicado
+        self._offset = 0             # bytes do livro já processados
+        self._since_checkpoint = 0
+        self._checkpoint_sig = None
+        self._ledger_ino = None
+        self._version = 0            # muda sempre que algum saldo muda
+        # Protege o estado em memória (acessado também por threads de carregamento).
+        # Ordem dos bloqueios: arquivo do livro -> este -> cache do repositório
+        self._lock = threading.RLock()
+
+    @property
+    def ledger_path(self):
+        return self.store.path(LEDGER_FILE)
+
+    @property
+    def checkpoint_path(self):
+        return self.store.path(CHECKPOINT_FILE)
+
+    def stock(self, name):
+        """Lista de registros do estoque ``name`` com o saldo atual"""
+        return self.table(name).rows()
+
+    def table(self, name):
+        """StockTable do estoque ``name`` (consulta por item em O(1))"""
+        with self._lock:
+            self._sync()
+            table = self._tables.get(name)
+            if table is None:
+                table = self._tables[name] = StockTable()
+            return table
+
+    @property
+    def version(self):
+        """Contador de alterações dos saldos (para detectar se algo mudou)"""
+        with self._lock:
+            self._sync()
+            return self._version
+
+    def append(self, events):
+        """Acrescenta eventos ao livro e aplica-os ao saldo em memória"""
+        if not events:
+            return
+        with self.store.lock(LEDGER_FILE):
+            stamped, payload = self.prepare(events)
+            self.write_prepared(stamped, payload, checkpoint=False)
+        self.checkpoint_if_due()
+
+    def prepare(self, events):
+        """Numera os eventos e monta as linhas a gravar, sem tocar no disco.
+
+        Retorna (eventos numerados, bytes a acrescentar ao livro). Usado pelas
+        transações, que gravam o livro junto com os demais arquivos. Deve ser
+        chamado com o livro bloqueado, para que a numeração não se repita.
+        """
+        with self._lock:
+            self._sync()
+            seq = self._seq
+        now = datetime.now().isoformat(timespec="seconds")
+        stamped = [
+            dict(event, seq=seq + i, data=now)
+            for i, event in enumerate(events, start=1)
+        ]
+        payload = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in stamped)
+        return stamped, payload.encode("utf-8")
+
+    def write_prepared(self, stamped, payload, fsync=True, checkpoint=True):
+        """Acrescenta ao livro as linhas de ``prepare`` e aplica os eventos.
+
+        Com ``checkpoint=False`` o ponto de controle devido não é gravado aqui;
+        quem chamou deve usar ``checkpoint_if_due`` depois de liberar seus
+        bloqueios (o ponto de controle regrava os arquivos de estoque).
+        """
+        with open(self.ledger_path, "ab") as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        with self._lock:
+            if self._ledger_ino is None:
+                self._ledger_ino = self.store.signature(LEDGER_FILE)[2]
+
+            for event in stamped:
+                self._seq = event["seq"]
+                self._apply(event)
+            self._offset += len(payload)
+            self._since_checkpoint += len(stamped)
+
+        if checkpoint:
+            self.checkpoint_if_due()
+
+    @property
+    def offset(self):
+        """Bytes do livro já processados"""
+        return self._offset
+
+    def checkpoint_if_due(self):
+        """Grava um ponto de controle se já há eventos suficientes desde o último.
+
+        O ponto de controle só acelera a leitura: os eventos já estão no livro.
+        Uma falha aqui (arquivo em uso por outra estação, bloqueio demorado) é
+        apenas registrada, para não fazer uma gravação concluída parecer falha;
+        a próxima gravação tenta de novo.
+        """
+        with self._lock:
+            due = self._since_checkpoint >= CHECKPOINT_INTERVAL
+        if not due:
+            return
+        try:
+            self.checkpoint()
+        except Exception as e:
+            print(f"Ponto de controle do livro adiado: {e}")
+
+    def checkpoint(self):
+        """Grava os saldos consolidados e a posição atual do livro.
+
+        O livro e os arquivos de estoque exportados são bloqueados juntos, na
+        mesma ordem usada pelas transações; não deve ser chamado com algum
+        deles já bloqueado.
+        """
+        with self.store.lock(LEDGER_FILE, *STOCK_FILES), self._lock:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        self._sync()
+        data = {
+            "seq": self._seq,
+            "offset": self._offset,
+            "estoques": {name: table.rows() for name, table in self._tables.items()},
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_path, self.checkpoint_path)
+        self._checkpoint_sig = self.store.signature(CHECKPOINT_FILE)
+        self._since_checkpoint = 0
+
+        # Exporta os arquivos tradicionais para relatórios e cópias de segurança
+        for name in STOCK_FILES:
+            self.store.write(name, self._tables[name].rows() if name in self._tables else [])
+
+    # ----------------------------------------------------------------- interno
+
+    def _apply(self, event):
+        table = self._tables.get(event["estoque"])
+        if table is None:
+            table = self._tables[event["estoque"]] = StockTable()
+        apply_event(table, event)
+        self._version += 1
+
+    def _sync(self):
+        """Recarrega o ponto de controle se mudou e aplica o final do livro"""
+        checkpoint_sig = self.store.signature(CHECKPOINT_FILE)
+        ledger_sig = self.store.signature(LEDGER_FILE)
+        ledger_ino = ledger_sig[2] if ledger_sig else None
+        ledger_size = ledger_sig[1] if ledger_sig else 0
+
+        if (self._tables is None or checkpoint_sig != self._checkpoint_sig
+                or ledger_ino != self._ledger_ino or ledger_size < self._offset):
+            self._load_checkpoint(checkpoint_sig)
+            self._ledger_ino = ledger_ino
+
+        if ledger_size > self._offset:
+            self._replay_tail()
+
+    def _load_checkpoint(self, checkpoint_sig):
+        self._version += 1
+        self._checkpoint_sig = checkpoint_sig
+        self._since_checkpoint = 0
+
+        if checkpoint_sig is not None:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._seq = data["seq"]
+            self._offset = data["offset"]
+            stocks = data["estoques"]
+        else:
+            # Primeiro uso: os arquivos JSON atuais são o ponto de partida
+            self._seq = 0
+            self._offset = 0
+            stocks = {name: self.store.read_copy(name, default=[]) for name in STOCK_FILES}
+
+        self._tables = {name: StockTable(rows) for name, rows in stocks.items()}
+
+    def _replay_tail(self):
+        with open(self.ledger_path, "rb") as f:
+            f.seek(self._offset)
+            tail = f.read()
+
+        # Só processa linhas completas; uma gravação em andamento fica para depois
+        end = tail.rfind(b"\n") + 1
+        for line in tail[:end].splitlines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event.get("seq", 0) <= self._seq:
+                continue
+            self._seq = event["seq"]
+            self._apply(event)
+            self._since_checkpoint += 1
+        self._offset += end
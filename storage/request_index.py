@@ -0,0 +1,102 @@
+# storage/request_index.py
+
+from storage.reservation import request_reservation
+
+class RequestIndex:
+    """Índice secundário status -> IDs das requisições.
+
+    Guarda, para cada requisição, a posição na lista e o status atual. As
+    trocas de status feitas pelas transações atualizam apenas as requisições
+    alteradas; assim, montar a lista de trabalho de uma janela custa o
+    número de requisições com aquele status, e não o histórico inteiro.
+
+    Mantém também o total reservado por item (storage.reservation): cada
+    requisição alterada tira a sua reserva anterior e soma a atual.
+    """
+
+    def __init__(self):
+        self.source = None     # lista indexada (a mesma mantida no cache do repositório)
+        self._position = {}    # id -> posição na lista
+        self._status = {}      # id -> status
+        self._by_status = {}   # status -> conjunto de IDs
+        self._reservations = {}  # id -> {item: quantidade} reservada pela requisição
+        self._reserved = {}      # item -> total reservado
+
+    def rebuild(self, requests):
+        self.source = requests
+        self._position = {}
+        self._status = {}
+        self._by_status = {}
+        self._reservations = {}
+        self._reserved = {}
+        for pos, req in enumerate(requests):
+            self._position[req["id"]] = pos
+            self._track(req)
+
+    def update(self, requests, ids):
+        """Reaproveita o índice para a nova lista ``requests``.
+
+        ``ids`` são as requisições alteradas desde a lista anterior; as demais
+        devem continuar na mesma posição. Requisições novas ficam no final.
+        Se a lista encolheu, o índice é refeito.
+        """
+        previous = len(self._position)
+        if self.source is None or len(requests) < previous:
+            self.rebuild(requests)
+            return
+
+        self.source = requests
+        for pos in range(previous, len(requests)):
+            self._position[requests[pos]["id"]] = pos
+            self._track(requests[pos])
+        for req_id in ids:
+            pos = self._position.get(req_id)
+            if pos is None or requests[pos]["id"] != req_id:
+                self.rebuild(requests)
+                return
+            self._track(requests[pos])
+
+    def ids(self, status):
+        return self._by_status.get(status, set())
+
+    def select(self, statuses):
+        """Requisições com algum dos ``statuses``, na ordem da lista"""
+        positions = sorted(
+            self._position[req_id] for status in statuses for req_id in self.ids(status)
+        )
+        return [self.source[pos] for pos in positions]
+
+    def counts(self):
+        """Quantidade de requisições em cada status"""
+        return {status: len(ids) for status, ids in self._by_status.items() if ids}
+
+    def reserved(self):
+        """{item: total reservado} (dicionário do índice: não alterar)"""
+        return self._reserved
+
+    def _track(self, request):
+        self._set_status(request["id"], request.get("status"))
+        self._set_reservation(request["id"], request_reservation(request))
+
+    def _set_reservation(self, req_id, reservation):
+        previous = self._reservations.pop(req_id, None)
+        if previous == reservation:
+            if reservation:
+                self._reservations[req_id] = reservation
+            return
+        for item, qty in (previous or {}).items():
+            remaining = self._reserved[item] - qty
+            if remaining:
+                self._reserved[item] = remaining
+            else:
+                del self._reserved[item]
+        for item, qty in reservation.items():
+            self._reserved[item] = self._reserved.get(item, 0) + qty
+        if reservation:
+            self._reservations[req_id] = reservation
+
+    def _set_status(self, req_id, status):
+        if req_id in self._status:
+            self._by_status[self._status[req_id]].discard(req_id)
+        self._status[req_id] = status
+        self._by_status.setdefault(status, set()).add(req_id)
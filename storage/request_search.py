@@ -0,0 +1,171 @@
+# storage/request_search.py
+
+import bisect
+import re
+
+from storage.text_index import normalize
+
+# Status reconhecidos nas buscas ("caneta aprovada" filtra pelo status Aprovada)
+REQUEST_STATUSES = ("Pendente", "Aprovada", "Reprovada", "Comprada", "Enviada", "Finalizada")
+# Prefixo que filtra pelo início do nome do status ("status:aprov")
+STATUS_PREFIX = "status:"
+
+_WORD = re.compile(r"\w+")
+_ID_RANGE = re.compile(r"#?(\d+)(?:-(\d+))?$")
+
+
+def _words(text):
+    return _WORD.findall(normalize(text))
+
+
+def request_item_names(request):
+    """Nomes dos itens de uma requisição (aceita o formato antigo com "nome")"""
+    return [str(item.get("item") or item.get("nome", "")) for item in request.get("itens", [])]
+
+
+class RequestSearch:
+    """Busca de requisições por itens, status e faixa de IDs.
+
+    Cada termo da consulta é interpretado assim:
+
+    - ``12`` ou ``#12``: requisição 12; ``10-20``: IDs de 10 a 20;
+    - nome completo de um status (``aprovada``, ``pendente``...) ou início
+      dele com prefixo (``status:aprov``): filtra pelo status;
+    - qualquer outra palavra: início de uma palavra do nome de algum item
+      (``env`` encontra "Envelope", não o status Enviada).
+
+    Os termos de item são combinados com E, os de status e de ID com OU.
+    O índice invertido (palavra -> {id: ocorrências}) e o vocabulário
+    ordenado permitem achar as palavras por prefixo com busca binária, sem
+    percorrer as requisições. Os resultados são ordenados por relevância
+    (palavras inteiras valem mais que prefixos) e, no empate, pelas mais recentes.
+    ``update`` inclui ou substitui uma requisição sem refazer o índice.
+    """
+
+    def __init__(self, requests=(), statuses=REQUEST_STATUSES):
+        self._requests = {}    # id -> requisição
+        self._postings = {}    # palavra -> {id: ocorrências nos itens}
+        self._vocabulary = []  # palavras indexadas, em ordem
+        self._statuses = {normalize(status): status for status in statuses}
+        for request in requests:
+            self._add(request)
+        self._vocabulary = sorted(self._postings)
+
+    def __len__(self):
+        return len(self._requests)
+
+    def get(self, req_id):
+        """Requisição com o ID ``req_id`` (None se não existir)"""
+        return self._requests.get(req_id)
+
+    def update(self, request):
+        """Inclui ou substitui uma requisição (custo proporcional aos itens dela)"""
+        old = self._requests.get(request["id"])
+        if old is not None:
+            for word in self._remove(old):
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, word)]
+        for word in self._add(request):
+            bisect.insort(self._vocabulary, word)
+
+    def _add(self, request):
+        """Indexa a requisição e devolve as palavras que não existiam no índice"""
+        req_id = request["id"]
+        self._requests[req_id] = request
+        status = request.get("status")
+        if status:
+            self._statuses.setdefault(normalize(status), status)
+        new_words = []
+        for name in request_item_names(request):
+            for word in _words(name):
+                postings = self._postings.get(word)
+                if postings is None:
+                    postings = self._postings[word] = {}
+                    new_words.append(word)
+                postings[req_id] = postings.get(req_id, 0) + 1
+        return new_words
+
+    def _remove(self, request):
+        """Retira a requisição do índice e devolve as palavras que ficaram sem uso"""
+        req_id = request["id"]
+        del self._requests[req_id]
+        unused = []
+        for name in request_item_names(request):
+            for word in _words(name):
+                postings = self._postings.get(word)
+                if postings is None or postings.pop(req_id, None) is None:
+                    continue
+                if not postings:
+                    del self._postings[word]
+                    unused.append(word)
+        return unused
+
+    def parse(self, query):
+        """Separa a consulta em (termos de item, status, faixas de ID).
+
+        ``statuses`` é None quando a consulta não filtra por status (um
+        ``status:`` que não corresponde a nenhum resulta num conjunto vazio).
+        """
+        terms, statuses, ranges = [], None, []
+        # Separação por espaços: \w+ quebraria as faixas "10-20"
+        for token in normalize(query).split():
+            match = _ID_RANGE.match(token)
+            if match:
+                start = int(match.group(1))
+                end = int(match.group(2) or start)
+                ranges.append((min(start, end), max(start, end)))
+                continue
+            if token.startswith(STATUS_PREFIX):
+                prefix = "".join(_words(token[len(STATUS_PREFIX):]))
+                statuses = statuses if statuses is not None else set()
+                statuses.update(s for key, s in self._statuses.items() if key.startswith(prefix))
+                continue
+            words = _words(token)
+            # Só o nome inteiro é status: "env" continua sendo busca por item
+            if len(words) == 1 and words[0] in self._statuses:
+                statuses = statuses if statuses is not None else set()
+                statuses.add(self._statuses[words[0]])
+                continue
+            terms.extend(words)
+        return terms, statuses, ranges
+
+    def search(self, query, limit=None):
+        """Requisições que atendem a ``query``, da mais relevante para a menos"""
+        terms, statuses, ranges = self.parse(query)
+
+        scores = None
+        for term in terms:
+            term_scores = self._match(term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {rid: score + term_scores[rid]
+                          for rid, score in scores.items() if rid in term_scores}
+            if not scores:
+                return []
+        if scores is None:
+            scores = dict.fromkeys(self._requests, 0)
+
+        results = []
+        for rid, score in scores.items():
+            request = self._requests[rid]
+            if statuses is not None and request.get("status") not in statuses:
+                continue
+            if ranges and not any(start <= rid <= end for start, end in ranges):
+                continue
+            results.append((score, rid))
+        results.sort(key=lambda result: (-result[0], -result[1]))
+        if limit is not None:
+            results = results[:limit]
+        return [self._requests[rid] for _, rid in results]
+
+    def _match(self, term):
+        """{id: pontuação} das requisições com alguma palavra começando por ``term``"""
+        scores = {}
+        pos = bisect.bisect_left(self._vocabulary, term)
+        while pos < len(self._vocabulary) and self._vocabulary[pos].startswith(term):
+            word = self._vocabulary[pos]
+            weight = 2 if word == term else 1
+            for rid, count in self._postings[word].items():
+                scores[rid] = max(scores.get(rid, 0), weight * count)
+            pos += 1
+        return scores
@@ -0,0 +1,51 @@
+# storage/reservation.py
+
+# Requisições cujos itens estão reservados no almoxarifado: aprovadas e ainda
+# não enviadas. O envio baixa o saldo e encerra a reserva; requisições
+# pendentes ou reprovadas não reservam nada.
+RESERVED_STATUSES = ("Aprovada", "Comprada")
+
+
+def request_reservation(request):
+    """{item: quantidade} reservada pela requisição no status atual"""
+    if request.get("status") not in RESERVED_STATUSES:
+        return {}
+    reserved = {}
+    for item in request.get("itens", []):
+        reserved[item["item"]] = reserved.get(item["item"], 0) + item["quantidade"]
+    return reserved
+
+
+class StockLevels:
+    """Saldo, reservado e disponível de cada item, consultados em O(1).
+
+    Combina a StockTable do estoque com os totais reservados mantidos pelo
+    repositório (``store.reserved_quantities()``).
+    """
+
+    def __init__(self, table, reserved):
+        self.table = table
+        self._reserved = reserved
+
+    def on_hand(self, item):
+        return self.table.quantity(item)
+
+    def reserved(self, item):
+        return self._reserved.get(item, 0)
+
+    def available(self, item):
+        """Saldo ainda não prometido a nenhuma requisição (nunca negativo)"""
+        return max(0, self.on_hand(item) - self.reserved(item))
+
+    def reserved_items(self):
+        """{item: quantidade reservada} (não alterar)"""
+        return self._reserved
+
+
+def stock_levels(store=None):
+    """Níveis do almoxarifado (o único estoque com reservas)"""
+    # Importado aqui: o índice de requisições do json_store usa este módulo
+    from storage.json_store import get_store, ESTOQUE_ALMOX_JSON
+
+    store = store or get_store()
+    return StockLevels(store.stock_table(ESTOQUE_ALMOX_JSON), store.reserved_quantities())
@@ -0,0 +1,207 @@
+# storage/server.py
+#
+# O serviço não tem autenticação: qualquer processo que alcance o endereço
+# lê e altera os dados (inclusive a lista de usuários). Por isso escuta só em
+# 127.0.0.1 (ou num socket Unix) por padrão; para atender outras estações,
+# restrinja o acesso à porta no firewall.
+
+import argparse
+import asyncio
+import json
+import os
+import uuid
+
+from storage.concurrency import ConflictError, InsufficientStockError
+from storage.json_store import (
+    JsonStore, DATA_DIR, REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON,
+    ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON, USERS_JSON, CODIGOS_JSON
+)
+from storage.transaction import Transaction
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Tamanho máximo de uma mensagem (uma linha JSON)
+MAX_MESSAGE = 64 * 1024 * 1024
+
+# Nomes aceitos nos pedidos; qualquer outro (ex.: "../x.json") é recusado
+STOCK_NAMES = (ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON)
+READABLE = (
+    REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON, USERS_JSON, CODIGOS_JSON
+) + STOCK_NAMES
+# users.json e os estoques (derivados do livro) não são gravados pela rede
+WRITABLE = (REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON)
+
+
+def _check_name(name, allowed):
+    if name not in allowed:
+        raise PermissionError(f"Coleção não permitida: {name}")
+
+
+class DataService:
+    """Atende os pedidos dos clientes sobre um repositório mantido em memória.
+
+    Os pedidos são executados fora do laço de eventos (``run_in_executor``):
+    a espera por um arquivo bloqueado não atrasa os demais clientes. O
+    repositório é seguro entre threads e já está em memória; cada pedido
+    custa apenas o que altera.
+    As versões devolvidas incluem um identificador da instância, para que
+    um cliente nunca confunda o cache de uma execução anterior do serviço.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.instance = uuid.uuid4().hex[:8]
+
+    def handle(self, method, params):
+        handler = getattr(self, "rpc_" + method, None)
+        if handler is None:
+            raise ValueError(f"Método desconhecido: {method}")
+        return handler(**params)
+
+    def _version(self, counter):
+        return f"{self.instance}:{counter}"
+
+    # ----------------------------------------------------------------- leitura
+
+    def rpc_ping(self):
+        return "pong"
+
+    def rpc_exists(self, name):
+        _check_name(name, READABLE)
+        return self.store.exists(name)
+
+    def rpc_read(self, name, known_version=None):
+        _check_name(name, READABLE)
+        data = self.store.read(name)
+        version = self._version(self.store.version(name))
+        if version == known_version:
+            return {"version": version, "unchanged": True}
+        return {"version": version, "data": data}
+
+    def rpc_stock(self, name, known_version=None):
+        _check_name(name, STOCK_NAMES)
+        data = self.store.stock(name)
+        version = self._version(self.store.stock_version(name))
+        if version == known_version:
+            return {"version": version, "unchanged": True}
+        return {"version": version, "data": data}
+
+    def rpc_requests_with_status(self, statuses):
+        return self.store.requests_with_status(*statuses)
+
+    def rpc_reserved_quantities(self):
+        return self.store.reserved_quantities()
+
+    def rpc_version(self, name):
+        _check_name(name, READABLE)
+        self.store.read(name, default=None)
+        return self._version(self.store.version(name))
+
+    def rpc_stock_version(self, name):
+        _check_name(name, STOCK_NAMES)
+        return self._version(self.store.stock_version(name))
+
+    # ----------------------------------------------------------------- escrita
+
+    def rpc_write(self, name, data):
+        _check_name(name, WRITABLE)
+        self.store.write(name, data)
+
+    def rpc_record_movements(self, events):
+        for event in events:
+            _check_name(event["estoque"], STOCK_NAMES)
+        self.store.record_movements(events)
+
+    def rpc_allocate_ids(self, name, count=1):
+        _check_name(name, WRITABLE)
+        return self.store.allocate_ids(name, count)
+
+    def rpc_update_request_status(self, req_id, status):
+        return self.store.update_request_status(req_id, status)
+
+    def rpc_commit(self, transaction):
+        tx = Transaction.from_message(self.store, transaction)
+        for name in tx.names:
+            _check_name(name, WRITABLE)
+        for name in tx.requirements:
+            _check_name(name, STOCK_NAMES)
+        for event in tx.events:
+            _check_name(event["estoque"], STOCK_NAMES)
+        tx.commit()
+
+    # ----------------------------------------------------------------- rede
+
+    def dispatch(self, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            result = self.handle(request["method"], request.get("params", {}))
+            return {"id": request_id, "result": result}
+        except Exception as e:
+            error = {"type": type(e).__name__, "message": str(e)}
+            if isinstance(e, ConflictError):
+                error.update(name=e.name, keys=e.keys)
+            if isinstance(e, InsufficientStockError):
+                error.update(shortages=e.shortages)
+            return {"id": request_id, "error": error}
+
+    async def serve_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # Os bloqueios de arquivo esperam com sleep: fora do laço de eventos
+                response = await loop.run_in_executor(None, self.dispatch, line)
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def start_server(store, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+    """Inicia o serviço (TCP ou socket Unix) e devolve o asyncio.Server"""
+    service = DataService(store)
+    if unix_path:
+        return await asyncio.start_unix_server(service.serve_client, unix_path, limit=MAX_MESSAGE)
+    return await asyncio.start_server(service.serve_client, host, port, limit=MAX_MESSAGE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço local de dados de requisições e estoque")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="endereço de escuta (sem autenticação: prefira 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="caminho de um socket Unix (em vez de TCP)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="pasta dos arquivos de dados")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        from storage.sqlite_store import SqliteStore, DATABASE_FILE
+        store = SqliteStore(os.path.join(args.data_dir, DATABASE_FILE))
+    else:
+        store = JsonStore(args.data_dir)
+        store.recover()
+
+    async def run():
+        server = await start_server(store, args.host, args.port, args.unix)
+        where = args.unix or f"{args.host}:{args.port}"
+        print(f"Serviço de dados em {where} ({store.data_dir})")
+        if not args.unix and args.host not in ("127.0.0.1", "localhost", "::1"):
+            print("Atenção: o serviço não tem autenticação; restrinja o acesso a esta porta.")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,728 @@
+# storage/sqlite_store.py
+
+import copy
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from storage.concurrency import ConflictError, VERSION_KEY
+from storage.ledger import apply_event, NEUTRAL_EVENTS
+from storage.reservation import RESERVED_STATUSES
+from storage.stock_table import StockTable
+from storage.json_store import (
+    JsonStore, DATA_DIR, _MISSING,
+    REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON,
+    ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON, USERS_JSON, SEQUENCIAS_JSON
+)
+
+# Banco criado pela migração; a presença dele ativa o backend SQLite
+DATABASE_FILE = "requisicoes.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requisicoes (
+    id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'Pendente',
+    extras TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_requisicoes_status ON requisicoes(status);
+
+CREATE TABLE IF NOT EXISTS requisicao_itens (
+    requisicao_id INTEGER NOT NULL REFERENCES requisicoes(id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    quantidade INTEGER NOT NULL,
+    extras TEXT,
+    PRIMARY KEY (requisicao_id, posicao)
+);
+CREATE INDEX IF NOT EXISTS idx_requisicao_itens_item ON requisicao_itens(item);
+
+CREATE TABLE IF NOT EXISTS estoque_almoxarifado (
+    item TEXT PRIMARY KEY,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    valor_unitario REAL NOT NULL DEFAULT 0,
+    valor_total REAL NOT NULL DEFAULT 0,
+    posicao INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS estoque_setor (
+    item TEXT PRIMARY KEY,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    valor_unitario REAL NOT NULL DEFAULT 0,
+    valor_total REAL NOT NULL DEFAULT 0,
+    posicao INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    name TEXT,
+    role INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS requisicoes_compradas (
+    id INTEGER PRIMARY KEY,
+    viewed INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS movimentos (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    estoque TEXT NOT NULL,
+    item TEXT NOT NULL,
+    quantidade INTEGER NOT NULL,
+    valor_unitario REAL,
+    requisicao INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_movimentos_item ON movimentos(item);
+
+CREATE TABLE IF NOT EXISTS sequencias (
+    colecao TEXT PRIMARY KEY,
+    proximo INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS versoes (
+    colecao TEXT PRIMARY KEY,
+    versao INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Tabelas de estoque por arquivo JSON equivalente
+STOCK_TABLES = {
+    ESTOQUE_ALMOX_JSON: "estoque_almoxarifado",
+    ESTOQUE_SETOR_JSON: "estoque_setor",
+}
+
+# Coleções com ID numérico sequencial
+ID_TABLES = {
+    REQUISICOES_JSON: "requisicoes",
+    REQUISICOES_COMPRADAS_JSON: "requisicoes_compradas",
+}
+
+COLLECTIONS = (
+    REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON,
+    ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON, USERS_JSON
+)
+
+_REQUEST_KEYS = ("id", "status", "itens")
+_ITEM_KEYS = ("item", "quantidade")
+
+# Sistemas de arquivos de rede (/proc/mounts), onde o SQLite não suporta WAL
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs"}
+
+# Operações de transação aplicadas linha a linha: nome da operação -> coleções
+_ROW_OPERATIONS = {
+    "save_records": {REQUISICOES_JSON},
+    "set_request_status": {REQUISICOES_JSON},
+    "add_record": {REQUISICOES_COMPRADAS_JSON},
+    "update_records": {REQUISICOES_COMPRADAS_JSON},
+}
+
+
+def _extras(record, known_keys):
+    """Serializa os campos que não têm coluna própria"""
+    extras = {k: v for k, v in record.items() if k not in known_keys}
+    return json.dumps(extras, ensure_ascii=False) if extras else None
+
+
+def on_network_share(path):
+    """Verdadeiro se ``path`` está numa pasta de rede (unidade mapeada, UNC, NFS, SMB)"""
+    path = os.path.abspath(path)
+    if sys.platform == "win32":
+        if path.startswith("\\\\"):
+            return True
+        import ctypes
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+
+    # Tipo do sistema de arquivos do ponto de montagem mais específico
+    mount_point, fs_type = "", ""
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount = fields[1].replace("\\040", " ")
+                inside = path == mount or path.startswith(mount.rstrip("/") + "/")
+                if inside and len(mount) > len(mount_point):
+                    mount_point, fs_type = mount, fields[2]
+    except OSError:
+        return False
+    return fs_type in NETWORK_FILESYSTEMS
+
+
+def _row_operation(op, name, args):
+    """Verdadeiro se a operação pode ser aplicada só nas linhas afetadas"""
+    if callable(op) or name not in _ROW_OPERATIONS.get(op, ()):
+        return False
+    if op == "set_request_status":
+        return True
+    if op == "add_record":
+        return args[1] == "id" and set(args[0]) <= {"id", "viewed"}
+    if op == "update_records":
+        return args[2] == "id" and set(args[1]) == {"viewed"}
+    return args[1] == "id"
+
+
+class SqliteStore:
+    """Backend SQLite com a mesma interface do JsonStore.
+
+    ``read``/``write`` continuam trabalhando com listas de dicionários no
+    formato dos arquivos JSON; ``write`` compara com o conteúdo em cache e
+    só grava as linhas que mudaram. Nas transações, ``save_records``,
+    ``update_request_status``, ``add_record`` e ``update_records`` são
+    aplicadas direto nas linhas afetadas: uma troca de status vira um único
+    UPDATE, sem ler a coleção inteira.
+
+    Em disco local o banco usa WAL. Numa pasta de rede, onde o SQLite não
+    suporta WAL, usa o diário tradicional (journal_mode=DELETE) com
+    sincronização completa.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(DATA_DIR, DATABASE_FILE)
+        self.data_dir = os.path.dirname(self.db_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if on_network_share(self.db_path):
+            self._conn.execute("PRAGMA journal_mode=DELETE")
+            self._conn.execute("PRAGMA synchronous=FULL")
+        else:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._cache = {}         # nome -> (versão, dados)
+        self._data_version = None
+        self._versions = {}
+        self._tables = {}        # nome -> (versão, StockTable)
+        self._status_cache = {}  # status -> (versão, requisições)
+        self._reserved_cache = None  # (versão, {item: reservado})
+
+    def path(self, name):
+        return f"{self.db_path}:{name}"
+
+    def exists(self, name):
+        return name in COLLECTIONS
+
+    def version(self, name):
+        with self._lock:
+            self._refresh_versions()
+            return self._versions.get(name, 0)
+
+    def read(self, name, default=_MISSING):
+        """Lista no formato do arquivo JSON, materializada apenas se mudou"""
+        if name not in COLLECTIONS:
+            if default is _MISSING:
+                raise FileNotFoundError(f"Coleção {name} não existe no banco")
+            return default
+
+        with self._lock:
+            self._refresh_versions()
+            version = self._versions.get(name, 0)
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            data = self._load(name)
+            self._cache[name] = (version, data)
+            return data
+
+    def read_copy(self, name, default=_MISSING):
+        return copy.deepcopy(self.read(name, default))
+
+    def write(self, name, data):
+        """Grava somente as diferenças entre ``data`` e o conteúdo atual"""
+        if name not in COLLECTIONS:
+            raise ValueError(f"Coleção desconhecida: {name}")
+
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            touched = self._write(name, data)
+        self._forget(touched)
+
+    def transaction(self):
+        """Transação com a mesma interface da do JsonStore"""
+        from storage.transaction import Transaction
+        return Transaction(self)
+
+    def commit_transaction(self, tx):
+        """Aplica todas as gravações e eventos numa única transação SQL"""
+        touched = set()
+        with self._lock, self._conn:
+            # Reserva a escrita antes de ler, para que as modificações vejam o estado final
+            self._conn.execute("BEGIN IMMEDIATE")
+            row_operations, tx.operations = self._split_operations(tx)
+            tx.resolve()  # saldos exigidos e operações sobre a coleção inteira
+            for op, name, args, _ in row_operations:
+                touched |= self._apply_row_operation(op, name, args)
+            for name, data in tx.writes.items():
+                touched |= self._write(name, data)
+            touched |= self._record(tx.events)
+        self._forget(touched)
+
+    def recover(self):
+        """O SQLite já garante a atomicidade; nada a recuperar"""
+
+    @contextmanager
+    def lock(self, *names):
+        """Exclusão entre threads; entre processos o próprio SQLite bloqueia"""
+        with self._lock:
+            yield
+
+    def modify(self, name, func, default=None):
+        with self.transaction() as tx:
+            tx.modify(name, func, default)
+
+    def save_records(self, name, records, key="id"):
+        """Grava só os registros alterados, detectando edições concorrentes"""
+        with self.transaction() as tx:
+            tx.save_records(name, records, key)
+
+    def requests_with_status(self, *statuses):
+        """Requisições com algum dos status informados, lidas pelo índice de status"""
+        with self._lock:
+            self._refresh_versions()
+            version = self._versions.get(REQUISICOES_JSON, 0)
+            cached = self._status_cache.get(statuses)
+            if cached is None or cached[0] != version:
+                cached = self._status_cache[statuses] = (version, self._load_requests(statuses))
+            return cached[1]
+
+    def reserved_quantities(self):
+        """{item: quantidade reservada}, somada pelo banco e guardada até a próxima alteração"""
+        with self._lock:
+            self._refresh_versions()
+            version = self._versions.get(REQUISICOES_JSON, 0)
+            cached = self._reserved_cache
+            if cached is None or cached[0] != version:
+                placeholders = ", ".join("?" for _ in RESERVED_STATUSES)
+                rows = self._conn.execute(
+                    "SELECT i.item, SUM(i.quantidade) FROM requisicoes r "
+                    "JOIN requisicao_itens i ON i.requisicao_id = r.id "
+                    f"WHERE r.status IN ({placeholders}) GROUP BY i.item",
+                    RESERVED_STATUSES
+                ).fetchall()
+                cached = self._reserved_cache = (version, dict(rows))
+            return dict(cached[1])
+
+    def stock(self, name):
+        return self.read(name)
+
+    def stock_table(self, name):
+        """Saldo atual indexado por item, reconstruído só quando o estoque muda"""
+        version = self.version(name)
+        cached = self._tables.get(name)
+        if cached is None or cached[0] != version:
+            cached = self._tables[name] = (version, StockTable(self.read(name)))
+        return cached[1]
+
+    def stock_version(self, name):
+        return self.version(name)
+
+    def record_movements(self, events):
+        """Aplica eventos de movimentação linha a linha e guarda o histórico"""
+        if not events:
+            return
+        with self._lock, self._conn:
+            touched = self._record(events)
+        self._forget(touched)
+
+    def allocate_ids(self, name, count=1):
+        """Reserva ``count`` IDs consecutivos de ``name`` e devolve o primeiro"""
+        table = ID_TABLES[name]
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT proximo FROM sequencias WHERE colecao = ?", (name,)
+            ).fetchone()
+            if row is None:
+                # Primeira reserva: parte do maior ID (consulta pela chave primária)
+                row = self._conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()
+            next_id = row[0]
+            self._conn.execute(
+                "INSERT INTO sequencias (colecao, proximo) VALUES (?, ?) "
+                "ON CONFLICT(colecao) DO UPDATE SET proximo = excluded.proximo",
+                (name, next_id + count)
+            )
+        return next_id
+
+    def update_request_status(self, req_id, status):
+        """Altera o status de uma requisição com um único UPDATE"""
+        with self._lock, self._conn:
+            updated = self._set_request_status(req_id, status)
+            if updated:
+                self._bump(REQUISICOES_JSON)
+        self._cache.pop(REQUISICOES_JSON, None)
+        return updated
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(name, None)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ----------------------------------------------------------------- versões
+
+    def _refresh_versions(self):
+        """Relê a tabela de versões quando outra conexão gravou no banco"""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version and self._versions:
+            return
+        self._data_version = data_version
+        self._versions = dict(self._conn.execute("SELECT colecao, versao FROM versoes"))
+
+    def _bump(self, name):
+        self._conn.execute(
+            "INSERT INTO versoes (colecao, versao) VALUES (?, 1) "
+            "ON CONFLICT(colecao) DO UPDATE SET versao = versao + 1",
+            (name,)
+        )
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    # ----------------------------------------------------------------- leitura
+
+    def _load(self, name):
+        if name == REQUISICOES_JSON:
+            return self._load_requests()
+        if name in STOCK_TABLES:
+            rows = self._conn.execute(
+                f"SELECT item, quantidade, valor_unitario, valor_total "
+                f"FROM {STOCK_TABLES[name]} ORDER BY posicao, rowid"
+            )
+            return [
+                {"item": item, "quantidade": qtd, "valor_unitario": unit, "valor_total": total}
+                for item, qtd, unit, total in rows
+            ]
+        if name == USERS_JSON:
+            rows = self._conn.execute("SELECT username, password, name, role FROM usuarios")
+            return [
+                {"username": u, "password": p, "name": n, "role": r}
+                for u, p, n, r in rows
+            ]
+        rows = self._conn.execute("SELECT id, viewed FROM requisicoes_compradas ORDER BY id")
+        return [{"id": req_id, "viewed": bool(viewed)} for req_id, viewed in rows]
+
+    def _load_requests(self, statuses=None):
+        where, params = "", ()
+        if statuses is not None:
+            # Usa o índice idx_requisicoes_status: lê só as requisições pedidas
+            where = f"WHERE status IN ({', '.join('?' * len(statuses))})"
+            params = tuple(statuses)
+
+        requests = {}
+        for req_id, status, extras in self._conn.execute(
+                f"SELECT id, status, extras FROM requisicoes {where} ORDER BY id", params):
+            request = {"id": req_id, "itens": [], "status": status}
+            if extras:
+                request.update(json.loads(extras))
+            requests[req_id] = request
+
+        item_where = where and f"WHERE requisicao_id IN (SELECT id FROM requisicoes {where})"
+        for req_id, item, qtd, extras in self._conn.execute(
+                "SELECT requisicao_id, item, quantidade, extras FROM requisicao_itens "
+                f"{item_where} ORDER BY requisicao_id, posicao", params):
+            line = {"item": item, "quantidade": qtd}
+            if extras:
+                line.update(json.loads(extras))
+            requests[req_id]["itens"].append(line)
+
+        return list(requests.values())
+
+    # ----------------------------------------------------------------- escrita
+
+    def _split_operations(self, tx):
+        """Separa as operações que podem ser aplicadas linha a linha das demais.
+
+        Uma coleção com gravação completa ou com outra operação na mesma
+        transação é tratada inteira (como no JsonStore), preservando a ordem.
+        """
+        whole = set(tx.writes)
+        for op, name, args, _ in tx.operations:
+            if not _row_operation(op, name, args):
+                whole.add(name)
+        row_operations, others = [], []
+        for operation in tx.operations:
+            (others if operation[1] in whole else row_operations).append(operation)
+        return row_operations, others
+
+    def _apply_row_operation(self, op, name, args):
+        if op == "save_records":
+            changed = self._save_requests(*args)
+        elif op == "set_request_status":
+            changed = self._set_request_status(*args)
+        elif op == "add_record":
+            record = args[0]
+            changed = self._conn.execute(
+                "INSERT OR IGNORE INTO requisicoes_compradas (id, viewed) VALUES (?, ?)",
+                (record["id"], int(bool(record.get("viewed", False))))
+            ).rowcount > 0
+        else:
+            keys, fields, _ = args
+            changed = bool(keys) and self._conn.executemany(
+                "UPDATE requisicoes_compradas SET viewed = ? WHERE id = ?",
+                [(int(bool(fields["viewed"])), key) for key in keys]
+            ).rowcount != 0
+
+        if changed:
+            self._bump(name)
+            return {name}
+        return set()
+
+    def _save_requests(self, records, key="id"):
+        """save_records nas requisições: confere a versão e grava só essas linhas"""
+        ids = [rec[key] for rec in records]
+        placeholders = ", ".join("?" for _ in ids)
+        stored = dict(self._conn.execute(
+            "SELECT id, COALESCE(json_extract(extras, '$.versao'), 0) FROM requisicoes "
+            f"WHERE id IN ({placeholders})", ids
+        ))
+        conflicts = [
+            rec[key] for rec in records
+            if stored.get(rec[key], 0) != rec.get(VERSION_KEY, 0)
+            or (rec[key] not in stored and rec.get(VERSION_KEY, 0))
+        ]
+        if conflicts:
+            raise ConflictError(REQUISICOES_JSON, conflicts)
+
+        for rec in records:
+            saved = dict(rec, **{VERSION_KEY: rec.get(VERSION_KEY, 0) + 1})
+            self._conn.execute(
+                "INSERT INTO requisicoes (id, status, extras) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, extras = excluded.extras",
+                (saved["id"], saved.get("status", "Pendente"), _extras(saved, _REQUEST_KEYS))
+            )
+            self._replace_request_items(saved)
+        return bool(records)
+
+    def _set_request_status(self, req_id, status):
+        cursor = self._conn.execute(
+            "UPDATE requisicoes SET status = ?, extras = json_set("
+            "COALESCE(extras, '{}'), '$.versao', COALESCE(json_extract(extras, '$.versao'), 0) + 1"
+            ") WHERE id = ?",
+            (status, req_id)
+        )
+        return cursor.rowcount > 0
+
+    def _replace_request_items(self, req):
+        self._conn.execute("DELETE FROM requisicao_itens WHERE requisicao_id = ?", (req["id"],))
+        self._conn.executemany(
+            "INSERT INTO requisicao_itens (requisicao_id, posicao, item, quantidade, extras) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (req["id"], pos, line.get("item") or line.get("nome", ""),
+                 line.get("quantidade") or line.get("Quantidade", 0),
+                 _extras(line, _ITEM_KEYS))
+                for pos, line in enumerate(req.get("itens", []))
+            ]
+        )
+
+    def _write(self, name, data):
+        if name == REQUISICOES_JSON:
+            changed = self._write_requests(data)
+        elif name in STOCK_TABLES:
+            changed = self._write_stock(STOCK_TABLES[name], data)
+        elif name == USERS_JSON:
+            changed = self._write_users(data)
+        else:
+            changed = self._write_purchased(data)
+
+        if changed:
+            self._bump(name)
+            return {name}
+        return set()
+
+    def _record(self, events):
+        now = datetime.now().isoformat(timespec="seconds")
+        touched = set()
+        for event in events:
+            sql_table = STOCK_TABLES[event["estoque"]]
+            self._conn.execute(
+                "INSERT INTO movimentos (data, tipo, estoque, item, quantidade, valor_unitario, requisicao) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (now, event["tipo"], event["estoque"], event["item"], event["quantidade"],
+                 event.get("valor_unitario"), event.get("requisicao"))
+            )
+            if event["tipo"] in NEUTRAL_EVENTS:
+                continue
+
+            row = self._conn.execute(
+                f"SELECT item, quantidade, valor_unitario, valor_total FROM {sql_table} WHERE item = ?",
+                (event["item"],)
+            ).fetchone()
+            table = StockTable()
+            if row:
+                table.insert(dict(zip(("item", "quantidade", "valor_unitario", "valor_total"), row)))
+            apply_event(table, event)
+            updated = table.get(event["item"])
+            self._conn.execute(
+                f"INSERT INTO {sql_table} (item, quantidade, valor_unitario, valor_total, posicao) "
+                f"VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(posicao), -1) + 1 FROM {sql_table})) "
+                f"ON CONFLICT(item) DO UPDATE SET quantidade = excluded.quantidade, "
+                f"valor_unitario = excluded.valor_unitario, valor_total = excluded.valor_total",
+                (updated["item"], updated["quantidade"],
+                 updated["valor_unitario"], updated["valor_total"])
+            )
+            touched.add(event["estoque"])
+
+        for name in touched:
+            self._bump(name)
+        return touched
+
+    def _forget(self, names):
+        for name in names:
+            self._cache.pop(name, None)
+
+    def _write_requests(self, requests):
+        # Compara com o conteúdo em cache, se ainda for o atual; senão lê do
+        # banco. Registros do próprio cache podem ter sido alterados no lugar
+        # (read em vez de read_copy) e também obrigam a ler do banco.
+        self._refresh_versions()
+        cached = self._cache.get(REQUISICOES_JSON)
+        current = None
+        if cached is not None and cached[0] == self._versions.get(REQUISICOES_JSON, 0):
+            current = {req["id"]: req for req in cached[1]}
+            if any(current.get(req["id"]) is req for req in requests):
+                current = None
+        if current is None:
+            current = {req["id"]: req for req in self._load_requests()}
+        new_ids = set()
+        changed = False
+
+        for req in requests:
+            req_id = req["id"]
+            new_ids.add(req_id)
+            old = current.get(req_id)
+            if old == req:
+                continue
+            changed = True
+
+            extras = _extras(req, _REQUEST_KEYS)
+            if old is None:
+                self._conn.execute(
+                    "INSERT INTO requisicoes (id, status, extras) VALUES (?, ?, ?)",
+                    (req_id, req.get("status", "Pendente"), extras)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE requisicoes SET status = ?, extras = ? WHERE id = ?",
+                    (req.get("status", "Pendente"), extras, req_id)
+                )
+
+            if old is None or old.get("itens") != req.get("itens"):
+                self._replace_request_items(req)
+
+        removed = set(current) - new_ids
+        if removed:
+            changed = True
+            self._conn.executemany(
+                "DELETE FROM requisicoes WHERE id = ?", [(req_id,) for req_id in removed]
+            )
+        return changed
+
+    def _write_stock(self, table, rows):
+        current = {
+            item: (qtd, unit, total, pos)
+            for item, qtd, unit, total, pos in self._conn.execute(
+                f"SELECT item, quantidade, valor_unitario, valor_total, posicao FROM {table}")
+        }
+        changes = []
+        names = set()
+        for pos, row in enumerate(rows):
+            item = row.get("item", "")
+            names.add(item)
+            values = (
+                row.get("quantidade", 0), row.get("valor_unitario", 0.0),
+                row.get("valor_total", 0.0), pos
+            )
+            if current.get(item) != values:
+                changes.append((item,) + values)
+
+        if changes:
+            self._conn.executemany(
+                f"INSERT INTO {table} (item, quantidade, valor_unitario, valor_total, posicao) "
+                f"VALUES (?, ?, ?, ?, ?) ON CONFLICT(item) DO UPDATE SET "
+                f"quantidade = excluded.quantidade, valor_unitario = excluded.valor_unitario, "
+                f"valor_total = excluded.valor_total, posicao = excluded.posicao",
+                changes
+            )
+        removed = set(current) - names
+        if removed:
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE item = ?", [(item,) for item in removed]
+            )
+        return bool(changes or removed)
+
+    def _write_users(self, users):
+        self._conn.execute("DELETE FROM usuarios")
+        self._conn.executemany(
+            "INSERT INTO usuarios (username, password, name, role) VALUES (?, ?, ?, ?)",
+            [(u["username"], u["password"], u.get("name"), u["role"]) for u in users]
+        )
+        return True
+
+    def _write_purchased(self, purchased):
+        current = dict(self._conn.execute("SELECT id, viewed FROM requisicoes_compradas"))
+        changes = [
+            (req["id"], int(bool(req.get("viewed", False))))
+            for req in purchased
+            if current.get(req["id"]) != int(bool(req.get("viewed", False)))
+        ]
+        if changes:
+            self._conn.executemany(
+                "INSERT INTO requisicoes_compradas (id, viewed) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET viewed = excluded.viewed",
+                changes
+            )
+        removed = set(current) - {req["id"] for req in purchased}
+        if removed:
+            self._conn.executemany(
+                "DELETE FROM requisicoes_compradas WHERE id = ?", [(i,) for i in removed]
+            )
+        return bool(changes or removed)
+
+
+def migrate_from_json(json_store=None, db_path=None):
+    """Importa os arquivos JSON existentes para o banco (execução única).
+
+    Retorna um dicionário com a quantidade de registros migrados por arquivo.
+    """
+    json_store = json_store or JsonStore()
+    store = SqliteStore(db_path or os.path.join(json_store.data_dir, DATABASE_FILE))
+    migrated = {}
+    try:
+        for name in COLLECTIONS:
+            if name in STOCK_TABLES:
+                data = json_store.stock(name)
+            else:
+                data = json_store.read(name, default=[])
+            store.write(name, data)
+            migrated[name] = len(data)
+
+        # IDs já reservados por outras estações não podem ser reutilizados
+        sequences = json_store.read(SEQUENCIAS_JSON, default={})
+        with store._conn:
+            store._conn.executemany(
+                "INSERT OR REPLACE INTO sequencias (colecao, proximo) VALUES (?, ?)",
+                sequences.items()
+            )
+    finally:
+        store.close()
+    return migrated
+
+
+if __name__ == "__main__":
+    # Uso: python -m storage.sqlite_store [pasta_dos_dados]
+    source = JsonStore(sys.argv[1]) if len(sys.argv) > 1 else JsonStore()
+    for file_name, count in migrate_from_json(source).items():
+        print(f"{file_name}: {count} registros migrados")
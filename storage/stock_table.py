@@ -0,0 +1,61 @@
+# storage/stock_table.py
+
+
+class StockTable:
+    """Registros de um estoque indexados pelo nome do item.
+
+    Mantém um dicionário item -> registro, atualizado a cada inclusão ou
+    remoção, de modo que consultar um item custa O(1) em vez de percorrer o
+    catálogo inteiro. A ordem de inclusão é preservada (a mesma dos arquivos
+    JSON) e ``rows()`` devolve a lista de registros, recriada apenas quando
+    itens entram ou saem da tabela.
+    """
+
+    def __init__(self, rows=()):
+        self._index = {}
+        self._rows = None
+        self.version = 0     # muda a cada alteração de saldo, inclusão ou remoção
+        for row in rows:
+            self._index[row["item"]] = row
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, item):
+        return item in self._index
+
+    def __iter__(self):
+        return iter(self._index.values())
+
+    def get(self, item, default=None):
+        return self._index.get(item, default)
+
+    def quantity(self, item):
+        """Saldo do item (0 se não existir no estoque)"""
+        row = self._index.get(item)
+        return row["quantidade"] if row else 0
+
+    def rows(self):
+        """Lista de registros na ordem de inclusão"""
+        if self._rows is None:
+            self._rows = list(self._index.values())
+        return self._rows
+
+    def insert(self, row):
+        """Inclui o registro, substituindo outro do mesmo item se houver"""
+        self._index[row["item"]] = row
+        self._rows = None
+        self.version += 1
+        return row
+
+    def remove(self, item):
+        """Remove o item e devolve o registro (None se não existir)"""
+        row = self._index.pop(item, None)
+        if row is not None:
+            self._rows = None
+            self.version += 1
+        return row
+
+    def touch(self):
+        """Registra uma alteração feita diretamente num registro da tabela"""
+        self.version += 1
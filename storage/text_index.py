@@ -0,0 +1,104 @@
+# storage/text_index.py
+
+import unicodedata
+
+
+def normalize(text):
+    """Texto sem acentos e em minúsculas ("Papel Almaço" -> "papel almaco")"""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TextIndex:
+    """Índice de prefixos e trigramas para busca enquanto se digita.
+
+    Cada chave (ex.: nome do item) é indexada pelos trigramas do texto
+    normalizado e pelos prefixos de uma e duas letras de cada palavra. Uma
+    busca por "pap a4" devolve as chaves que contêm "pap" e têm uma palavra
+    começando por "a4"; termos com três letras ou mais usam a interseção dos
+    trigramas, termos curtos usam os prefixos. Nenhuma busca percorre todas
+    as chaves, e incluir ou remover uma chave custa apenas o tamanho dela.
+    """
+
+    def __init__(self, keys=()):
+        self._texts = {}      # chave -> texto normalizado
+        self._grams = {}      # trigrama -> chaves
+        self._prefixes = {}   # prefixo de 1 ou 2 letras de uma palavra -> chaves
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, key):
+        return key in self._texts
+
+    def add(self, key, text=None):
+        """Indexa ``key`` pelo texto ``text`` (a própria chave, se omitido)"""
+        if key in self._texts:
+            self.remove(key)
+        norm = normalize(key if text is None else text)
+        self._texts[key] = norm
+        for gram in _trigrams(norm):
+            self._grams.setdefault(gram, set()).add(key)
+        for prefix in self._word_prefixes(norm):
+            self._prefixes.setdefault(prefix, set()).add(key)
+
+    def remove(self, key):
+        norm = self._texts.pop(key, None)
+        if norm is None:
+            return
+        for gram in _trigrams(norm):
+            self._discard(self._grams, gram, key)
+        for prefix in self._word_prefixes(norm):
+            self._discard(self._prefixes, prefix, key)
+
+    def search(self, query):
+        """Conjunto de chaves que atendem a todos os termos de ``query``"""
+        terms = normalize(query).split()
+        if not terms:
+            return set(self._texts)
+
+        result = None
+        # Termos longos primeiro: são os mais seletivos
+        for term in sorted(terms, key=len, reverse=True):
+            matches = self._match(term, result)
+            result = matches if result is None else result & matches
+            if not result:
+                return set()
+        return result
+
+    def _match(self, term, candidates):
+        if len(term) < 3:
+            keys = self._prefixes.get(term, set())
+            return keys if candidates is None else keys & candidates
+
+        # Interseção dos trigramas, do menor conjunto para o maior
+        sets = sorted((self._grams.get(gram, set()) for gram in _trigrams(term)), key=len)
+        keys = set(sets[0]) if candidates is None else sets[0] & candidates
+        for other in sets[1:]:
+            keys &= other
+            if not keys:
+                return keys
+        # Os trigramas podem estar fora de ordem: confirma a ocorrência do termo
+        return {key for key in keys if term in self._texts[key]}
+
+    @staticmethod
+    def _word_prefixes(norm):
+        prefixes = set()
+        for word in norm.split():
+            prefixes.add(word[:1])
+            prefixes.add(word[:2])
+        return prefixes
+
+    @staticmethod
+    def _discard(mapping, key, value):
+        values = mapping.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del mapping[key]
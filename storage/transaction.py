@@ -0,0 +1,432 @@
+# storage/transaction.py
+
+import copy
+import glob
+import json
+import os
+import time
+import uuid
+
+from storage.concurrency import merge_records, InsufficientStockError, LockTimeout, VERSION_KEY
+from storage.json_store import REQUISICOES_JSON
+
+# Diário de cada transação em andamento (transacao-<id>.journal); existe
+# apenas entre o commit e a conclusão
+JOURNAL_PREFIX = "transacao"
+JOURNAL_SUFFIX = ".journal"
+TEMP_SUFFIX = ".tmp"
+# Bloqueio da pasta de dados: mantido por commit_files do primeiro temporário
+# até o diário ser apagado, e por recover; assim recover só encontra diários e
+# temporários de transações que não estão mais em andamento
+TRANSACTION_LOCK = "transacoes"
+
+
+def journal_name(tx_id):
+    return f"{JOURNAL_PREFIX}-{tx_id}{JOURNAL_SUFFIX}"
+
+
+def _set_request_status(name, requests, req_id, status):
+    for req in requests:
+        if req["id"] == req_id:
+            req["status"] = status
+            req[VERSION_KEY] = req.get(VERSION_KEY, 0) + 1
+            break
+    return requests
+
+
+def _add_record(name, records, record, key):
+    if all(rec.get(key) != record[key] for rec in records):
+        records.append(record)
+    return records
+
+
+def _update_records(name, records, keys, fields, key):
+    keys = set(keys)
+    for rec in records:
+        if rec.get(key) in keys:
+            rec.update(fields)
+    return records
+
+
+def _merge_records(name, records, changes, key):
+    return merge_records(name, records, changes, key)
+
+
+# Operações serializáveis: nome -> função(nome, dados_atuais, *argumentos)
+OPERATIONS = {
+    "save_records": _merge_records,
+    "set_request_status": _set_request_status,
+    "add_record": _add_record,
+    "update_records": _update_records,
+}
+
+
+# Chaves dos registros alterados por cada operação (para atualizar índices)
+CHANGED_KEYS = {
+    "save_records": lambda records, key: [rec[key] for rec in records],
+    "set_request_status": lambda req_id, status: [req_id],
+    "add_record": lambda record, key: [record[key]],
+    "update_records": lambda keys, fields, key: keys,
+}
+
+
+class Transaction:
+    """Agrupa gravações de vários arquivos numa operação tudo-ou-nada.
+
+    Uso::
+
+        with store.transaction() as tx:
+            tx.record_movements(events)
+            tx.save_records(REQUISICOES_JSON, [request])
+
+    Nada é gravado até o fim do bloco; se ocorrer uma exceção, as alterações
+    preparadas são descartadas. As operações (``save_records``,
+    ``add_record``...) são aplicadas no momento do commit, com os arquivos
+    bloqueados, sobre o conteúdo mais recente; ``require_stock`` confere os
+    saldos nesse mesmo momento. Exceto ``modify``, todas são dados simples e
+    podem ser enviadas ao serviço de dados (storage.server).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.writes = {}       # nome -> dados completos do arquivo
+        self.operations = []   # (operação, nome, argumentos, padrão) aplicadas no commit
+        self.events = []       # eventos para o livro de movimentações
+        self.requirements = {}  # estoque -> {item: saldo mínimo exigido no commit}
+        self.changed = {}      # nome -> chaves alteradas (None: arquivo inteiro)
+        self._on_commit = []
+        self.committed = False
+
+    @property
+    def names(self):
+        """Arquivos afetados pela transação"""
+        return set(self.writes) | {op[1] for op in self.operations}
+
+    def write(self, name, data):
+        self.writes[name] = data
+        self.changed[name] = None
+
+    def modify(self, name, func, default=None):
+        """Agenda ``func(dados)`` sobre o conteúdo atual do arquivo (apenas local)"""
+        self.operations.append((func, name, (), default))
+
+    def save_records(self, name, records, key="id"):
+        """Grava apenas os registros informados, com verificação de versão"""
+        records = list(records)
+        self.operations.append(("save_records", name, (records, key), []))
+
+        def bump_versions():
+            for rec in records:
+                rec[VERSION_KEY] = rec.get(VERSION_KEY, 0) + 1
+        self._on_commit.append(bump_versions)
+
+    def add_record(self, name, record, key="id"):
+        """Acrescenta o registro se ainda não houver outro com a mesma chave"""
+        self.operations.append(("add_record", name, (record, key), []))
+
+    def update_records(self, name, keys, fields, key="id"):
+        """Atualiza ``fields`` nos registros cujas chaves estão em ``keys``"""
+        self.operations.append(("update_records", name, (list(keys), fields, key), []))
+
+    def record_movements(self, events):
+        self.events.extend(events)
+
+    def require_stock(self, events):
+        """Exige, no commit, saldo para todos os débitos de ``events``.
+
+        A conferência é feita com o livro bloqueado, sobre o saldo mais
+        recente; se outra estação consumiu o saldo nesse meio-tempo, o commit
+        falha com InsufficientStockError e nada é gravado.
+        """
+        for event in events:
+            if event["quantidade"] < 0:
+                required = self.requirements.setdefault(event["estoque"], {})
+                required[event["item"]] = required.get(event["item"], 0) - event["quantidade"]
+
+    def update_request_status(self, req_id, status):
+        """Troca o status de uma requisição sobre a versão mais recente do disco"""
+        self.operations.append(("set_request_status", REQUISICOES_JSON, (req_id, status), None))
+
+    def resolve(self):
+        """Aplica as operações agendadas (chamado com os arquivos bloqueados)"""
+        self.check_stock()
+        for op, name, args, default in self.operations:
+            current = self.writes.get(name)
+            if current is None and default is None:
+                current = self.store.read_copy(name)
+            elif current is None:
+                current = self.store.read_copy(name, default=copy.deepcopy(default))
+
+            if callable(op):
+                result = op(current)
+                self.changed[name] = None
+            else:
+                result = OPERATIONS[op](name, current, *args)
+                keys = self.changed.setdefault(name, set())
+                if keys is not None:
+                    keys.update(CHANGED_KEYS[op](*args))
+            self.writes[name] = current if result is None else result
+        self.operations = []
+
+    def check_stock(self):
+        """Confere as exigências de ``require_stock`` (chamado com o livro bloqueado)"""
+        for name, required in self.requirements.items():
+            table = self.store.stock_table(name)
+            shortages = {
+                item: (qty, table.quantity(item))
+                for item, qty in required.items() if table.quantity(item) < qty
+            }
+            if shortages:
+                raise InsufficientStockError(name, shortages)
+
+    def to_message(self):
+        """Representação JSON da transação para envio ao serviço de dados"""
+        if any(callable(op[0]) for op in self.operations):
+            raise TypeError("modify() não pode ser enviado ao serviço de dados")
+        return {
+            "writes": self.writes,
+            "operations": [list(op) for op in self.operations],
+            "events": self.events,
+            "requirements": self.requirements,
+        }
+
+    @classmethod
+    def from_message(cls, store, message):
+        tx = cls(store)
+        tx.writes = message.get("writes", {})
+        tx.changed = dict.fromkeys(tx.writes)
+        for op, name, args, default in message.get("operations", []):
+            if op not in OPERATIONS:
+                raise ValueError(f"Operação desconhecida: {op}")
+            tx.operations.append((op, name, tuple(args), default))
+        tx.events = message.get("events", [])
+        tx.requirements = message.get("requirements", {})
+        return tx
+
+    def commit(self):
+        if not self.committed:
+            self.store.commit_transaction(self)
+            self.committed = True
+            for callback in self._on_commit:
+                callback()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+
+def commit_files(store, tx):
+    """Efetiva uma transação do JsonStore.
+
+    1. grava cada arquivo num temporário e prepara as linhas do livro;
+    2. grava o diário com a lista de renomeações e as linhas do livro;
+    3. sincroniza tudo com o disco num único passo (fsync em lote);
+    4. renomeia os temporários e acrescenta as linhas ao livro;
+    5. apaga o diário.
+
+    Uma queda antes do passo 3 deixa apenas temporários órfãos, descartados
+    por ``recover``; depois dele, ``recover`` conclui as renomeações. Deve ser
+    chamado com os arquivos da transação (e o livro) bloqueados.
+    """
+    tx_id = uuid.uuid4().hex[:12]
+    with store.lock(TRANSACTION_LOCK):
+        _commit_files(store, tx, tx_id)
+
+
+def _commit_files(store, tx, tx_id):
+    journal_path = store.path(journal_name(tx_id))
+    renames = []
+    synced = []
+
+    try:
+        for name, data in tx.writes.items():
+            final_path = store.path(name)
+            tmp_path = f"{final_path}.tx-{tx_id}{TEMP_SUFFIX}"
+            f = open(tmp_path, "w", encoding="utf-8")
+            synced.append(f)
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            renames.append((name, tmp_path, final_path, os.fstat(f.fileno()).st_size))
+
+        ledger_entry = None
+        if tx.events:
+            ledger = store.ledger
+            stamped, payload = ledger.prepare(tx.events)
+            ledger_entry = {"offset": ledger.offset, "payload": payload.decode("utf-8")}
+
+        journal = {
+            "id": tx_id,
+            # Caminhos relativos: outra estação pode montar a pasta com outro nome
+            "renames": [
+                [os.path.basename(tmp_path), name, size] for name, tmp_path, _, size in renames
+            ],
+            "ledger": ledger_entry,
+        }
+        f = open(journal_path, "w", encoding="utf-8")
+        synced.append(f)
+        json.dump(journal, f, ensure_ascii=False)
+
+        # Único ponto de sincronização da operação
+        for f in synced:
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        for f in synced:
+            f.close()
+        for _, tmp_path, _, _ in renames:
+            _remove(tmp_path)
+        _remove(journal_path)
+        raise
+    finally:
+        for f in synced:
+            f.close()
+
+    # A partir daqui a transação está confirmada
+    for name, tmp_path, final_path, _ in renames:
+        _replace(tmp_path, final_path)
+        store.refresh_cache(name, copy.deepcopy(tx.writes[name]), tx.changed.get(name))
+    if ledger_entry:
+        # O ponto de controle fica para depois dos bloqueios (JsonStore.commit_transaction)
+        ledger.write_prepared(stamped, payload, fsync=False, checkpoint=False)
+
+    _remove(journal_path)
+
+
+def recover(store):
+    """Conclui ou descarta transações interrompidas (chamado na inicialização).
+
+    Os arquivos citados nos diários e o livro são bloqueados antes da pasta,
+    na mesma ordem usada pelos commits. Se outra estação mantiver os
+    bloqueios por tempo demais, a recuperação fica para a próxima execução.
+    """
+    from storage.ledger import LEDGER_FILE
+
+    names = {LEDGER_FILE}
+    for path in _journal_paths(store):
+        journal = _load_journal(path)
+        if journal:
+            names.update(name for _, name, _ in journal["renames"])
+
+    try:
+        with store.lock(*names), store.lock(TRANSACTION_LOCK):
+            _recover_locked(store, names)
+    except LockTimeout:
+        return
+    store.invalidate()
+
+
+def _recover_locked(store, locked):
+    # Com a pasta bloqueada, todo diário encontrado é de uma transação interrompida
+    for path in _journal_paths(store):
+        journal = _load_journal(path)
+        if journal is None:
+            # Diário incompleto: a queda ocorreu antes da sincronização
+            _remove(path)
+            continue
+        if not {name for _, name, _ in journal["renames"]} <= locked:
+            continue  # Surgiu depois da leitura acima; fica para a próxima recuperação
+
+        if _journal_complete(store, journal):
+            for tmp_name, name, _ in journal["renames"]:
+                if os.path.exists(store.path(tmp_name)):
+                    _replace(store.path(tmp_name), store.path(name))
+
+            entry = journal.get("ledger")
+            if entry:
+                _recover_ledger(store, entry)
+
+        for tmp_name, _, _ in journal["renames"]:
+            _remove(store.path(tmp_name))
+        _remove(path)
+
+    # Temporários sem diário: a queda ocorreu antes de o diário ser gravado
+    journals = {_load_journal_id(path) for path in _journal_paths(store)}
+    for tmp_path in glob.glob(os.path.join(store.data_dir, f"*.tx-*{TEMP_SUFFIX}")):
+        tx_id = tmp_path[:-len(TEMP_SUFFIX)].rsplit(".tx-", 1)[1]
+        if tx_id not in journals:
+            _remove(tmp_path)
+
+
+def _journal_paths(store):
+    """Diários presentes na pasta (inclui o diário único das versões anteriores)"""
+    return glob.glob(os.path.join(store.data_dir, f"{JOURNAL_PREFIX}*{JOURNAL_SUFFIX}"))
+
+
+def _load_journal(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _load_journal_id(path):
+    name = os.path.basename(path)[len(JOURNAL_PREFIX) + 1:-len(JOURNAL_SUFFIX)]
+    return name or None
+
+
+def _journal_complete(store, journal):
+    """Confere se todos os temporários chegaram inteiros ao disco.
+
+    As renomeações só começam depois da sincronização; portanto, se algum
+    temporário estiver faltando ou incompleto sem que o destino já tenha
+    sido renomeado, a transação nunca foi confirmada.
+    """
+    for tmp_name, name, size in journal["renames"]:
+        tmp_path = store.path(tmp_name)
+        if os.path.exists(tmp_path):
+            if os.path.getsize(tmp_path) != size:
+                return False
+        elif not store.exists(name):
+            return False
+    return True
+
+
+def _recover_ledger(store, entry):
+    """Acrescenta as linhas do livro caso a queda tenha ocorrido antes disso"""
+    from storage.ledger import LEDGER_FILE
+
+    ledger_path = store.path(LEDGER_FILE)
+    payload = entry["payload"].encode("utf-8")
+    offset = entry["offset"]
+    size = os.path.getsize(ledger_path) if os.path.exists(ledger_path) else 0
+
+    written = b""
+    if size > offset:
+        with open(ledger_path, "rb") as f:
+            f.seek(offset)
+            written = f.read(len(payload))
+    if written == payload:
+        return  # já gravado
+
+    with open(ledger_path, "r+b" if size else "wb") as f:
+        if payload.startswith(written):
+            # Descarta a gravação parcial antes de reaplicar
+            f.truncate(min(size, offset))
+        f.seek(0, os.SEEK_END)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _replace(src, dst, attempts=5):
+    """os.replace com novas tentativas (no Windows falha se outro processo estiver lendo)"""
+    for attempt in range(attempts):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """QApplication para os testes dos modelos de tabela (sem janela visível)"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    widgets = pytest.importorskip("PySide6.QtWidgets")
+    return widgets.QApplication.instance() or widgets.QApplication([])
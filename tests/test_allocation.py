@@ -0,0 +1,66 @@
+# tests/test_allocation.py
+
+import pytest
+
+from storage.allocation import allocate, FIFO, PRIORITY, FAIR
+from storage.stock_table import StockTable
+
+
+def request(req_id, quantity, priority=0, item="Caneta"):
+    return {"id": req_id, "prioridade": priority, "itens": [{"item": item, "quantidade": quantity}]}
+
+
+def shares(result, item="Caneta"):
+    return {req_id: items.get(item, 0) for req_id, items in result.allocated.items()}
+
+
+REQUESTS = [request(3, 4, priority=9), request(1, 6), request(2, 3, priority=5)]
+STOCK = StockTable([{"item": "Caneta", "quantidade": 10}])
+
+
+def test_fifo_serves_oldest_first():
+    result = allocate(REQUESTS, STOCK, FIFO)
+    assert shares(result) == {1: 6, 2: 3, 3: 1}
+    assert result.demand == {"Caneta": 13}
+    assert result.shortfall == {"Caneta": 3}
+
+
+def test_priority_serves_highest_first():
+    result = allocate(REQUESTS, STOCK, PRIORITY)
+    assert shares(result) == {3: 4, 2: 3, 1: 3}
+
+
+def test_fair_is_max_min():
+    result = allocate(REQUESTS, STOCK, FAIR)
+    # A menor demanda é atendida; as outras dividem o resto por igual
+    assert shares(result) == {1: 4, 2: 3, 3: 3}
+    assert result.shortfall == {"Caneta": 3}
+
+
+def test_fair_rounding_units_go_to_oldest():
+    requests = [request(req_id, 3) for req_id in (7, 5, 6)]
+    stock = StockTable([{"item": "Caneta", "quantidade": 5}])
+    assert shares(allocate(requests, stock, FAIR)) == {5: 2, 6: 2, 7: 1}
+
+
+@pytest.mark.parametrize("policy", [FIFO, PRIORITY, FAIR])
+def test_never_allocates_more_than_available_or_requested(policy):
+    requests = [request(1, 2), request(2, 5), request(3, 1, item="Papel")]
+    stock = StockTable([{"item": "Caneta", "quantidade": 20}])
+    result = allocate(requests, stock, policy)
+    assert result.allocated == {1: {"Caneta": 2}, 2: {"Caneta": 5}}
+    assert result.shortfall == {"Papel": 1}
+
+
+def test_stock_reserved_by_other_requests_is_not_allocated():
+    # 10 reservadas no total: 6 desta requisição e 4 de outras já compradas
+    result = allocate([request(1, 6)], STOCK, FIFO, reserved={"Caneta": 10})
+    assert shares(result) == {1: 6}
+    result = allocate([request(1, 8)], STOCK, FIFO, reserved={"Caneta": 12})
+    assert shares(result) == {1: 6}
+    assert result.shortfall == {"Caneta": 2}
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        allocate(REQUESTS, STOCK, "aleatoria")
@@ -0,0 +1,127 @@
+# tests/test_concurrency.py
+
+import json
+import os
+
+import pytest
+
+from storage.concurrency import merge_records, ConflictError, InsufficientStockError, VERSION_KEY
+from storage.json_store import (
+    JsonStore, REQUISICOES_JSON, ESTOQUE_SETOR_JSON, SEQUENCIAS_JSON
+)
+from storage.ledger import new_event, BAIXA, COMPRA
+
+
+def requests():
+    return [
+        {"id": 1, "status": "Pendente", VERSION_KEY: 2},
+        {"id": 2, "status": "Aprovada"},
+    ]
+
+
+def test_merge_records_applies_changes_and_bumps_versions():
+    current = requests()
+    merged = merge_records(REQUISICOES_JSON, current, [
+        {"id": 1, "status": "Aprovada", VERSION_KEY: 2},
+        {"id": 3, "status": "Pendente"},
+    ])
+
+    assert [(rec["id"], rec["status"], rec[VERSION_KEY]) for rec in merged[::2]] == [
+        (1, "Aprovada", 3), (3, "Pendente", 1)
+    ]
+    assert merged[1] == {"id": 2, "status": "Aprovada"}  # intacto
+
+
+def test_merge_records_rejects_stale_versions_without_applying_anything():
+    current = requests()
+    with pytest.raises(ConflictError) as info:
+        merge_records(REQUISICOES_JSON, current, [
+            {"id": 2, "status": "Comprada"},                 # versão 0: ok
+            {"id": 1, "status": "Reprovada", VERSION_KEY: 1},  # já está na 2
+            {"id": 9, "status": "Pendente", VERSION_KEY: 4},   # removida por outro
+        ])
+
+    assert info.value.name == REQUISICOES_JSON
+    assert info.value.keys == [1, 9]
+    assert current == requests()
+
+
+def test_save_records_detects_edit_from_another_workstation(tmp_path):
+    first, second = JsonStore(str(tmp_path)), JsonStore(str(tmp_path))
+    first.write(REQUISICOES_JSON, requests())
+
+    loaded = second.read_copy(REQUISICOES_JSON)[0]
+    first.save_records(REQUISICOES_JSON, [dict(first.read(REQUISICOES_JSON)[0], status="Aprovada")])
+
+    with pytest.raises(ConflictError):
+        second.save_records(REQUISICOES_JSON, [dict(loaded, status="Reprovada")])
+    assert first.read(REQUISICOES_JSON)[0]["status"] == "Aprovada"
+
+
+def rewrite_keeping_signature(store, name, data):
+    """Regrava o arquivo no lugar com o mesmo tamanho e mtime (como num compartilhamento SMB)"""
+    path = store.path(name)
+    st = os.stat(path)
+    text = json.dumps(data, indent=4)
+    assert len(text.encode("utf-8")) == st.st_size
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def test_allocate_ids_rereads_file_with_unchanged_signature(tmp_path):
+    store = JsonStore(str(tmp_path))
+    store.write(SEQUENCIAS_JSON, {REQUISICOES_JSON: 41})
+    assert store.read(SEQUENCIAS_JSON) == {REQUISICOES_JSON: 41}
+
+    # Outra estação reservou o 41 e gravou 42 com o mesmo tamanho de arquivo
+    rewrite_keeping_signature(store, SEQUENCIAS_JSON, {REQUISICOES_JSON: 42})
+
+    assert store.allocate_ids(REQUISICOES_JSON) == 42
+
+
+def test_save_records_rereads_file_with_unchanged_signature(tmp_path):
+    store = JsonStore(str(tmp_path))
+    store.write(REQUISICOES_JSON, [{"id": 1, "status": "Aprovada", VERSION_KEY: 1}])
+    loaded = store.read_copy(REQUISICOES_JSON)[0]
+
+    rewrite_keeping_signature(store, REQUISICOES_JSON,
+                              [{"id": 1, "status": "Comprada", VERSION_KEY: 2}])
+
+    with pytest.raises(ConflictError):
+        store.save_records(REQUISICOES_JSON, [dict(loaded, status="Reprovada")])
+
+
+def test_write_replaces_file_atomically(tmp_path):
+    store = JsonStore(str(tmp_path))
+    store.write(SEQUENCIAS_JSON, {"a": 1})
+    inode = os.stat(store.path(SEQUENCIAS_JSON)).st_ino
+
+    store.write(SEQUENCIAS_JSON, {"a": 2})
+
+    assert os.stat(store.path(SEQUENCIAS_JSON)).st_ino != inode  # novo arquivo renomeado
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    with open(store.path(SEQUENCIAS_JSON), encoding="utf-8") as f:
+        assert json.load(f) == {"a": 2}
+
+
+def test_require_stock_is_checked_against_the_locked_ledger(tmp_path):
+    first, second = JsonStore(str(tmp_path)), JsonStore(str(tmp_path))
+    first.record_movements([new_event(COMPRA, ESTOQUE_SETOR_JSON, "Caneta", 10, valor_unitario=1.0)])
+
+    # As duas estações conferem o mesmo saldo antes de gravar
+    assert first.stock_table(ESTOQUE_SETOR_JSON).quantity("Caneta") == 10
+    assert second.stock_table(ESTOQUE_SETOR_JSON).quantity("Caneta") == 10
+
+    events = [new_event(BAIXA, ESTOQUE_SETOR_JSON, "Caneta", -6)]
+    with first.transaction() as tx:
+        tx.record_movements(events)
+        tx.require_stock(events)
+
+    with pytest.raises(InsufficientStockError) as info:
+        with second.transaction() as tx:
+            tx.record_movements(events)
+            tx.require_stock(events)
+
+    assert info.value.shortages == {"Caneta": (6, 4)}
+    assert second.stock_table(ESTOQUE_SETOR_JSON).quantity("Caneta") == 4
@@ -0,0 +1,99 @@
+# tests/test_ledger.py
+
+import os
+
+import pytest
+
+from storage import ledger
+from storage.json_store import JsonStore, ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON
+from storage.ledger import new_event, StockLedger, BAIXA, COMPRA, ENVIO, CHECKPOINT_FILE
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger, "CHECKPOINT_INTERVAL", 3)
+    store = JsonStore(str(tmp_path))
+    store.write(ESTOQUE_ALMOX_JSON, [
+        {"item": "Caneta", "quantidade": 10, "valor_unitario": 1.5, "valor_total": 15.0},
+    ])
+    return store
+
+
+def balances(source):
+    return {
+        name: {row["item"]: row["quantidade"] for row in source.stock(name)}
+        for name in (ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON)
+    }
+
+
+def test_replay_across_checkpoint_matches_live_balances(store, tmp_path):
+    store.record_movements([new_event(COMPRA, ESTOQUE_ALMOX_JSON, "Papel", 20, valor_unitario=2.0)])
+    store.record_movements([
+        new_event(ENVIO, ESTOQUE_ALMOX_JSON, "Caneta", -4, valor_unitario=1.5),
+        new_event(ENVIO, ESTOQUE_SETOR_JSON, "Caneta", 4, valor_unitario=1.5),
+    ])
+    assert store.exists(CHECKPOINT_FILE)  # 3 eventos: ponto de controle gravado
+    # Eventos depois do ponto de controle ficam só no livro
+    store.record_movements([new_event(BAIXA, ESTOQUE_SETOR_JSON, "Caneta", -1)])
+
+    expected = {
+        ESTOQUE_ALMOX_JSON: {"Caneta": 6, "Papel": 20},
+        ESTOQUE_SETOR_JSON: {"Caneta": 3},
+    }
+    assert balances(store) == expected
+    # Outra estação: carrega o ponto de controle e aplica o final do livro
+    assert balances(JsonStore(str(tmp_path))) == expected
+    # Os arquivos exportados no ponto de controle não têm a baixa posterior
+    assert store.read(ESTOQUE_SETOR_JSON)[0]["quantidade"] == 4
+
+
+def test_events_already_in_checkpoint_are_not_applied_twice(store, tmp_path):
+    events = [new_event(COMPRA, ESTOQUE_SETOR_JSON, "Lápis", 1) for _ in range(3)]
+    store.record_movements(events)
+
+    fresh = StockLedger(JsonStore(str(tmp_path)))
+    assert fresh.table(ESTOQUE_SETOR_JSON).quantity("Lápis") == 3
+    assert fresh.offset == store.ledger.offset
+
+
+def test_partial_last_line_is_left_for_later(store, tmp_path):
+    store.record_movements([new_event(COMPRA, ESTOQUE_SETOR_JSON, "Lápis", 2)])
+    with open(store.path(ledger.LEDGER_FILE), "ab") as f:
+        f.write(b'{"seq": 2, "tipo": "compra"')  # gravação em andamento
+
+    fresh = JsonStore(str(tmp_path))
+    assert fresh.stock_table(ESTOQUE_SETOR_JSON).quantity("Lápis") == 2
+
+
+def test_checkpoint_locks_ledger_and_stock_files_together(store, monkeypatch):
+    calls = []
+    original = store.lock
+
+    def recording_lock(*names):
+        calls.append(set(names))
+        return original(*names)
+    monkeypatch.setattr(store, "lock", recording_lock)
+
+    store.record_movements([new_event(COMPRA, ESTOQUE_SETOR_JSON, "Lápis", 1) for _ in range(3)])
+
+    # Os estoques exportados nunca são bloqueados depois do livro, em outra chamada
+    checkpoint_calls = [names for names in calls if ledger.LEDGER_FILE in names and len(names) > 1]
+    assert checkpoint_calls == [{ledger.LEDGER_FILE, *ledger.STOCK_FILES}]
+    first_stock_lock = next(i for i, names in enumerate(calls) if names & set(ledger.STOCK_FILES))
+    assert calls[first_stock_lock] == checkpoint_calls[0]
+
+
+def test_checkpoint_retries_replace_while_file_is_in_use(store, monkeypatch):
+    from storage import transaction
+    original = os.replace
+    failures = []
+
+    def busy_once(src, dst):
+        if dst.endswith(CHECKPOINT_FILE) and not failures:
+            failures.append(dst)
+            raise PermissionError("arquivo em uso")
+        original(src, dst)
+    monkeypatch.setattr(transaction.os, "replace", busy_once)
+
+    store.ledger.checkpoint()
+    assert failures and store.exists(CHECKPOINT_FILE)
@@ -0,0 +1,46 @@
+# tests/test_money.py
+
+import pytest
+
+from views.money import format_currency, parse_currency
+
+
+@pytest.mark.parametrize("value", [
+    0.0, 0.01, 0.1, 1.0, 12.5, 999.99, 1000.0, 1234.56, 1234567.89, -0.5, -1234.56,
+])
+def test_format_parse_round_trip(value):
+    assert parse_currency(format_currency(value)) == pytest.approx(value)
+
+
+@pytest.mark.parametrize("text", [
+    "R$ 0,00", "R$ 0,01", "R$ 12,50", "R$ 1.000,00", "R$ 1.234.567,89", "-R$ 0,50",
+])
+def test_parse_format_round_trip(text):
+    assert format_currency(parse_currency(text)) == text
+
+
+@pytest.mark.parametrize("text, value", [
+    ("R$\xa01.234,56", 1234.56),
+    ("1234,56", 1234.56),
+    ("12.50", 12.5),
+    ("12.5", 12.5),
+    ("1.234", 1234.0),      # três casas: separador de milhar
+    ("1.234.567", 1234567.0),
+    (" R$ 7 ", 7.0),
+])
+def test_parse_accepts_common_inputs(text, value):
+    assert parse_currency(text) == pytest.approx(value)
+
+
+@pytest.mark.parametrize("text", ["", "R$", "abc", "1,2,3", "inf", "nan"])
+def test_parse_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_currency(text)
+
+
+def test_format_invalid_and_negative_zero():
+    assert format_currency("abc") == "R$ 0,00"
+    assert format_currency(None) == "R$ 0,00"
+    assert format_currency(float("nan")) == "R$ 0,00"
+    assert format_currency(-0.001) == "R$ 0,00"
+    assert format_currency("1234,5") == "R$ 1.234,50"
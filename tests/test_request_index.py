@@ -0,0 +1,87 @@
+# tests/test_request_index.py
+
+import copy
+
+from storage.request_index import RequestIndex
+from storage.request_search import REQUEST_STATUSES
+
+
+def request(req_id, status, *items):
+    return {"id": req_id, "status": status,
+            "itens": [{"item": item, "quantidade": qty} for item, qty in items]}
+
+
+REQUESTS = [
+    request(1, "Pendente", ("Caneta", 2)),
+    request(2, "Aprovada", ("Caneta", 3), ("Papel", 1)),
+    request(3, "Comprada", ("Papel", 4)),
+    request(4, "Finalizada", ("Lápis", 1)),
+]
+
+
+def state(index):
+    return (
+        [req["id"] for req in index.select(REQUEST_STATUSES)],
+        {status: sorted(index.ids(status)) for status in REQUEST_STATUSES},
+        index.counts(),
+        dict(index.reserved()),
+    )
+
+
+def rebuilt(requests):
+    index = RequestIndex()
+    index.rebuild(requests)
+    return state(index)
+
+
+def indexed(requests):
+    index = RequestIndex()
+    index.rebuild(requests)
+    return index
+
+
+def test_rebuild():
+    index = indexed(copy.deepcopy(REQUESTS))
+    assert [req["id"] for req in index.select(["Aprovada", "Pendente"])] == [1, 2]
+    assert index.counts() == {"Pendente": 1, "Aprovada": 1, "Comprada": 1, "Finalizada": 1}
+    assert index.reserved() == {"Caneta": 3, "Papel": 5}
+
+
+def test_update_status_changes_matches_rebuild():
+    requests = copy.deepcopy(REQUESTS)
+    index = indexed(requests)
+
+    changed = copy.deepcopy(requests)
+    changed[0]["status"] = "Aprovada"    # passa a reservar
+    changed[2]["status"] = "Enviada"     # deixa de reservar
+    changed[1]["itens"][0]["quantidade"] = 5
+    index.update(changed, [1, 2, 3])
+
+    assert state(index) == rebuilt(changed)
+    assert index.reserved() == {"Caneta": 7, "Papel": 1}
+    assert index.ids("Comprada") == set()
+
+
+def test_update_inserts_matches_rebuild():
+    requests = copy.deepcopy(REQUESTS)
+    index = indexed(requests)
+
+    grown = copy.deepcopy(requests) + [request(5, "Aprovada", ("Lápis", 2)), request(6, "Pendente")]
+    index.update(grown, [5, 6])
+    assert state(index) == rebuilt(grown)
+    assert index.select(["Aprovada"])[-1] is grown[4]
+
+
+def test_update_deletes_matches_rebuild():
+    requests = copy.deepcopy(REQUESTS)
+    index = indexed(requests)
+
+    # Lista menor: o índice é refeito
+    shrunk = copy.deepcopy(requests[:1] + requests[2:])
+    index.update(shrunk, [2])
+    assert state(index) == rebuilt(shrunk)
+
+    # Remoção e inclusão com o mesmo tamanho: o ID removido não está mais na posição
+    replaced = copy.deepcopy(shrunk[1:]) + [request(7, "Aprovada", ("Caneta", 1))]
+    index.update(replaced, [1, 7])
+    assert state(index) == rebuilt(replaced)
@@ -0,0 +1,67 @@
+# tests/test_request_search.py
+
+from storage.request_search import RequestSearch
+
+
+def request(req_id, status, *items):
+    return {"id": req_id, "status": status,
+            "itens": [{"item": item, "quantidade": 1} for item in items]}
+
+
+REQUESTS = [
+    request(1, "Pendente", "Envelope pardo", "Caneta azul"),
+    request(2, "Enviada", "Compasso"),
+    request(3, "Aprovada", "Caneta vermelha"),
+    request(4, "Comprada", "Lápis"),
+]
+
+
+def ids(results):
+    return [req["id"] for req in results]
+
+
+def test_parse_whole_status_words_are_filters():
+    terms, statuses, ranges = RequestSearch(REQUESTS).parse("caneta Aprovada 10-20 #7")
+    assert terms == ["caneta"]
+    assert statuses == {"Aprovada"}
+    assert ranges == [(10, 20), (7, 7)]
+
+
+def test_parse_status_prefixes_are_item_terms():
+    terms, statuses, _ = RequestSearch(REQUESTS).parse("env com")
+    assert terms == ["env", "com"]
+    assert statuses is None
+
+
+def test_parse_explicit_status_prefix():
+    search = RequestSearch(REQUESTS)
+    assert search.parse("status:aprov")[1] == {"Aprovada"}
+    assert search.parse("status:xyz")[1] == set()
+
+
+def test_search_prefix_of_status_finds_items():
+    search = RequestSearch(REQUESTS)
+    assert ids(search.search("env")) == [1]
+    assert ids(search.search("com")) == [2]
+    assert ids(search.search("enviada")) == [2]
+    assert ids(search.search("status:xyz")) == []
+
+
+def test_search_combines_terms_statuses_and_ranges():
+    search = RequestSearch(REQUESTS)
+    assert ids(search.search("caneta")) == [3, 1]
+    assert ids(search.search("caneta pendente")) == [1]
+    assert ids(search.search("caneta 2-3")) == [3]
+    assert ids(search.search("lapis")) == [4]
+
+
+def test_update_matches_a_full_rebuild():
+    search = RequestSearch(REQUESTS)
+    search.update(request(3, "Comprada", "Grampeador"))
+    search.update(request(5, "Pendente", "Caneta preta"))
+
+    rebuilt = RequestSearch(REQUESTS[:2] + [request(3, "Comprada", "Grampeador"), REQUESTS[3],
+                                            request(5, "Pendente", "Caneta preta")])
+    for query in ("caneta", "verm", "gramp", "comprada", "preta", "3-5", ""):
+        assert ids(search.search(query)) == ids(rebuilt.search(query)), query
+    assert search._vocabulary == rebuilt._vocabulary
@@ -0,0 +1,69 @@
+# tests/test_server.py
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from storage.client import RemoteStore
+from storage.json_store import JsonStore, REQUISICOES_JSON, USERS_JSON
+from storage.server import start_server
+
+
+@pytest.fixture
+def remote(tmp_path):
+    data_dir = tmp_path / "dados"
+    data_dir.mkdir()
+    store = JsonStore(str(data_dir))
+    store.write(REQUISICOES_JSON, [])
+    store.write(USERS_JSON, [{"username": "admin", "password": "x", "role": 0}])
+
+    loop = asyncio.new_event_loop()
+    socket_path = str(tmp_path / "dados.sock")
+    server = loop.run_until_complete(start_server(store, unix_path=socket_path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    client = RemoteStore("unix:" + socket_path)
+    yield client, tmp_path
+    client.close()
+
+    async def shutdown():
+        server.close()
+        await server.wait_closed()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_reads_and_writes_whitelisted_collections(remote):
+    client, _ = remote
+    client.write(REQUISICOES_JSON, [{"id": 1, "status": "Pendente", "itens": []}])
+    assert client.read(REQUISICOES_JSON)[0]["id"] == 1
+    assert client.read(USERS_JSON)[0]["username"] == "admin"
+
+
+def test_rejects_names_outside_the_data_directory(remote):
+    client, tmp_path = remote
+    with pytest.raises(PermissionError):
+        client.write("../pwned.json", {"x": 1})
+    with pytest.raises(PermissionError):
+        client.read("../pwned.json")
+    assert not os.path.exists(tmp_path / "pwned.json")
+
+
+def test_users_cannot_be_overwritten_remotely(remote):
+    client, _ = remote
+    with pytest.raises(PermissionError):
+        client.write(USERS_JSON, [])
+    with pytest.raises(PermissionError):
+        with client.transaction() as tx:
+            tx.add_record(USERS_JSON, {"username": "intruso", "password": "", "role": 0}, key="username")
+    assert len(client.read(USERS_JSON)) == 1
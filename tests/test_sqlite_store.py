@@ -0,0 +1,78 @@
+# tests/test_sqlite_store.py
+
+import pytest
+
+from storage import sqlite_store
+from storage.concurrency import ConflictError, VERSION_KEY
+from storage.json_store import REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON
+from storage.sqlite_store import SqliteStore
+
+
+def requests():
+    return [
+        {"id": 1, "status": "Pendente", "itens": [{"item": "Caneta", "quantidade": 2}]},
+        {"id": 2, "status": "Aprovada", "itens": [{"item": "Papel", "quantidade": 5}]},
+    ]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "requisicoes.db")
+    store = SqliteStore(path)
+    store.write(REQUISICOES_JSON, requests())
+    store.close()
+    return path
+
+
+def test_save_records_updates_rows_without_loading_the_table(db_path, monkeypatch):
+    store = SqliteStore(db_path)
+    loaded = store.read_copy(REQUISICOES_JSON)[0]
+
+    def full_load():
+        raise AssertionError("a coleção inteira foi lida")
+
+    monkeypatch.setattr(store, "_load_requests", full_load)
+    store.save_records(REQUISICOES_JSON, [dict(loaded, status="Aprovada")])
+    with store.transaction() as tx:
+        tx.add_record(REQUISICOES_COMPRADAS_JSON, {"id": 1, "viewed": False})
+        tx.update_records(REQUISICOES_COMPRADAS_JSON, [1], {"viewed": True})
+    monkeypatch.undo()
+
+    assert store.read(REQUISICOES_JSON)[0]["status"] == "Aprovada"
+    assert store.read(REQUISICOES_JSON)[0][VERSION_KEY] == 1
+    assert store.read(REQUISICOES_JSON)[1] == requests()[1]
+    assert store.read(REQUISICOES_COMPRADAS_JSON) == [{"id": 1, "viewed": True}]
+
+
+def test_save_records_detects_edit_from_another_connection(db_path):
+    first, second = SqliteStore(db_path), SqliteStore(db_path)
+    loaded = second.read_copy(REQUISICOES_JSON)[0]
+    first.update_request_status(1, "Aprovada")
+
+    with pytest.raises(ConflictError) as info:
+        second.save_records(REQUISICOES_JSON, [dict(loaded, status="Reprovada")])
+    assert info.value.keys == [1]
+    assert second.read(REQUISICOES_JSON)[0]["status"] == "Aprovada"
+
+
+def test_write_diffs_against_the_cached_snapshot(db_path, monkeypatch):
+    store = SqliteStore(db_path)
+    data = store.read_copy(REQUISICOES_JSON)
+    monkeypatch.setattr(store, "_load_requests", lambda: pytest.fail("a coleção inteira foi lida"))
+    data[1]["status"] = "Comprada"
+    store.write(REQUISICOES_JSON, data)
+    monkeypatch.undo()
+
+    assert [req["status"] for req in SqliteStore(db_path).read(REQUISICOES_JSON)] == [
+        "Pendente", "Comprada"
+    ]
+
+
+def test_network_share_uses_rollback_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_store, "on_network_share", lambda path: True)
+    store = SqliteStore(str(tmp_path / "rede.db"))
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+    monkeypatch.setattr(sqlite_store, "on_network_share", lambda path: False)
+    store = SqliteStore(str(tmp_path / "local.db"))
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
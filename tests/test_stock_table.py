@@ -0,0 +1,54 @@
+# tests/test_stock_table.py
+
+from storage.json_store import ESTOQUE_ALMOX_JSON
+from storage.ledger import apply_event, new_event, COMPRA, ENVIO, RECEBIMENTO
+from storage.stock_table import StockTable
+
+
+def test_stock_table_lookup_and_rows():
+    table = StockTable([
+        {"item": "Caneta", "quantidade": 5},
+        {"item": "Papel", "quantidade": 0},
+    ])
+    assert len(table) == 2 and "Caneta" in table and "Lápis" not in table
+    assert table.quantity("Caneta") == 5
+    assert table.quantity("Lápis") == 0
+    assert table.get("Lápis", {}) == {}
+    assert [row["item"] for row in table.rows()] == ["Caneta", "Papel"]
+    assert table.rows() is table.rows()  # lista reaproveitada enquanto nada entra ou sai
+
+
+def test_stock_table_insert_remove_and_versions():
+    table = StockTable([{"item": "Caneta", "quantidade": 5}])
+    rows = table.rows()
+    version = table.version
+
+    table.insert({"item": "Lápis", "quantidade": 2})
+    table.insert({"item": "Caneta", "quantidade": 7})  # substitui, mantendo a posição
+    assert [(row["item"], row["quantidade"]) for row in table.rows()] == [("Caneta", 7), ("Lápis", 2)]
+    assert table.rows() is not rows
+    assert table.version == version + 2
+
+    assert table.remove("Caneta")["quantidade"] == 7
+    assert table.remove("Caneta") is None
+    assert [row["item"] for row in table] == ["Lápis"]
+    assert table.version == version + 3
+
+    table.get("Lápis")["quantidade"] -= 1  # alteração direta no registro
+    table.touch()
+    assert table.quantity("Lápis") == 1 and table.version == version + 4
+
+
+def test_apply_event_to_stock_table():
+    table = StockTable()
+    apply_event(table, new_event(COMPRA, ESTOQUE_ALMOX_JSON, "Caneta", 10, valor_unitario=2.0))
+    apply_event(table, new_event(COMPRA, ESTOQUE_ALMOX_JSON, "Caneta", 10, valor_unitario=4.0))
+    apply_event(table, new_event(ENVIO, ESTOQUE_ALMOX_JSON, "Caneta", -5, valor_unitario=9.0))
+    version = table.version
+    apply_event(table, new_event(RECEBIMENTO, ESTOQUE_ALMOX_JSON, "Caneta", 5))  # só histórico
+
+    row = table.get("Caneta")
+    assert table.quantity("Caneta") == 15
+    assert row["valor_unitario"] == 3.0  # preço médio; o envio não o altera
+    assert row["valor_total"] == 45.0
+    assert table.version == version
@@ -0,0 +1,168 @@
+# tests/test_table_models.py
+
+import math
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import Qt  # noqa: E402
+from PySide6.QtTest import QAbstractItemModelTester  # noqa: E402
+
+from storage.reservation import StockLevels  # noqa: E402
+from storage.stock_table import StockTable  # noqa: E402
+from views.money import format_currency  # noqa: E402
+from views.table_models import (  # noqa: E402
+    PurchaseLineModel, StockTableModel,
+    PURCHASE_QTY_COLUMN, PURCHASE_PRICE_COLUMN, _PURCHASE_TOTAL_COLUMN
+)
+
+
+@pytest.fixture
+def purchase(qapp):
+    stock = StockTable([
+        {"item": "Caneta", "quantidade": 1, "valor_unitario": 2},
+        {"item": "Papel", "quantidade": 0, "valor_unitario": 10.5},
+    ])
+    items = [{"item": "Caneta", "quantidade": 3}, {"item": "Papel", "quantidade": 2}]
+    model = PurchaseLineModel()
+    QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+    totals = []
+    model.total_changed.connect(totals.append)
+    model.set_lines(PurchaseLineModel.build_lines(items, stock))
+    return model, totals
+
+
+def test_build_lines_and_total(purchase):
+    model, totals = purchase
+    assert model.purchases() == [("Caneta", 2, 2.0), ("Papel", 2, 10.5)]
+    assert totals == [25.0]
+    assert model.index(0, _PURCHASE_TOTAL_COLUMN).data() == "R$ 4,00"
+
+
+def test_integer_prices_are_edited_as_floats(purchase):
+    model, _ = purchase
+    value = model.index(0, PURCHASE_PRICE_COLUMN).data(Qt.EditRole)
+    assert isinstance(value, float)
+
+
+def test_edits_update_line_and_running_total(purchase):
+    model, totals = purchase
+    assert model.setData(model.index(0, PURCHASE_PRICE_COLUMN), "R$ 2,50")
+    assert model.setData(model.index(1, PURCHASE_QTY_COLUMN), 3)
+
+    assert totals[-2:] == [26.0, 36.5]
+    assert model.total() == 36.5
+    assert model.index(1, _PURCHASE_TOTAL_COLUMN).data() == "R$ 31,50"
+    assert model.index(0, PURCHASE_PRICE_COLUMN).data() == "R$ 2,50"
+
+
+@pytest.mark.parametrize("column, value", [
+    (PURCHASE_PRICE_COLUMN, float("inf")),
+    (PURCHASE_PRICE_COLUMN, float("nan")),
+    (PURCHASE_PRICE_COLUMN, "inf"),
+    (PURCHASE_PRICE_COLUMN, -1.0),
+    (PURCHASE_PRICE_COLUMN, "abc"),
+    (PURCHASE_QTY_COLUMN, float("inf")),
+    (PURCHASE_QTY_COLUMN, -1),
+    (PURCHASE_QTY_COLUMN, "dois"),
+    (0, "Lápis"),  # coluna não editável
+])
+def test_rejected_input_leaves_total_unchanged(purchase, column, value):
+    model, totals = purchase
+    assert not model.setData(model.index(0, column), value)
+    assert model.total() == 25.0 and math.isfinite(model.total())
+    assert totals == [25.0]
+
+
+def stock_rows(*items):
+    return [{"item": name, "quantidade": qty, "valor_unitario": 1.0, "valor_total": float(qty)}
+            for name, qty in items]
+
+
+def displayed(model):
+    return [tuple(model.index(row, col).data() for col in range(model.columnCount()))
+            for row in range(model.rowCount())]
+
+
+def fresh(rows, query=""):
+    model = StockTableModel(format_currency)
+    model.set_rows(rows)
+    model.set_filter(query)
+    return displayed(model)
+
+
+class SignalLog:
+    def __init__(self, model):
+        self.events = []
+        model.modelReset.connect(lambda: self.events.append("reset"))
+        model.rowsRemoved.connect(lambda parent, first, last: self.events.append(("removed", first, last)))
+        model.rowsInserted.connect(lambda parent, first, last: self.events.append(("inserted", first, last)))
+        model.dataChanged.connect(lambda top, bottom: self.events.append(("changed", top.row(), bottom.row())))
+
+
+BEFORE = stock_rows(("Caneta Azul", 5), ("Papel A4", 10), ("Lápis", 3), ("Borracha", 2), ("Caneta Preta", 1))
+AFTER = stock_rows(("Caneta Azul", 4), ("Lápis", 3), ("Caneta Preta", 1), ("Clipes", 7), ("Caneta Verde", 2))
+
+
+@pytest.fixture
+def stock_model(qapp):
+    model = StockTableModel(format_currency)
+    QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+    model.set_rows(BEFORE)
+    return model
+
+
+def test_update_snapshot_emits_removals_changes_and_appends(stock_model):
+    log = SignalLog(stock_model)
+    stock_model.update_rows(AFTER)
+
+    assert displayed(stock_model) == fresh(AFTER)
+    assert log.events == [
+        ("removed", 3, 3),   # Borracha (de baixo para cima)
+        ("removed", 1, 1),   # Papel A4
+        ("changed", 0, 0),   # Caneta Azul: 5 -> 4
+        ("inserted", 3, 4),  # Clipes, Caneta Verde
+    ]
+    assert stock_model.view_row("Clipes") == 3
+    assert stock_model.view_row("Papel A4") is None
+
+
+def test_update_snapshot_without_changes_emits_nothing(stock_model):
+    log = SignalLog(stock_model)
+    stock_model.update_rows(BEFORE)
+    assert log.events == []
+
+
+def test_update_snapshot_with_filter_updates_index(stock_model):
+    stock_model.set_filter("caneta")
+    assert [row[0] for row in displayed(stock_model)] == ["Caneta Azul", "Caneta Preta"]
+
+    stock_model.update_rows(AFTER)
+    assert displayed(stock_model) == fresh(AFTER, "caneta")
+    assert stock_model.view_row("Caneta Verde") == 2
+
+    # Itens removidos saem do índice; o filtro some e tudo volta a aparecer
+    stock_model.set_filter("pap")
+    assert displayed(stock_model) == []
+    stock_model.set_filter("")
+    assert displayed(stock_model) == fresh(AFTER)
+
+
+def test_update_snapshot_reloads_when_order_changes(stock_model):
+    log = SignalLog(stock_model)
+    reordered = list(reversed(BEFORE))
+    stock_model.update_rows(reordered)
+    assert log.events == ["reset"]
+    assert displayed(stock_model) == fresh(reordered)
+
+
+def test_reserved_columns_come_from_stock_levels(qapp):
+    table = StockTable(stock_rows(("Caneta", 5), ("Papel", 2)))
+    levels = StockLevels(table, {"Caneta": 2, "Papel": 3})
+    model = StockTableModel(format_currency, reservations=True)
+    model.set_snapshot(StockTableModel.snapshot(table.rows(), levels))
+    assert [row[:4] for row in displayed(model)] == [
+        ("Caneta", "5", "2", "3"),
+        ("Papel", "2", "3", "0"),  # disponível nunca fica negativo
+    ]
@@ -0,0 +1,64 @@
+# tests/test_text_index.py
+
+from storage.text_index import TextIndex, normalize
+
+ITEMS = ["Papel A4", "Papel Almaço", "Caneta Azul", "Lápis Nº 2", "Pasta Ação"]
+
+
+def test_normalize_removes_accents_and_case():
+    assert normalize("Papel ALMAÇO") == "papel almaco"
+    assert normalize("Lápis Nº 2") == "lapis no 2"
+
+
+def test_search_is_accent_and_case_insensitive():
+    index = TextIndex(ITEMS)
+    assert index.search("almaco") == {"Papel Almaço"}
+    assert index.search("ALMAÇO") == {"Papel Almaço"}
+    assert index.search("acao") == {"Pasta Ação"}
+    assert index.search("lapis") == {"Lápis Nº 2"}
+
+
+def test_long_terms_match_anywhere_through_trigrams():
+    index = TextIndex(ITEMS)
+    assert index.search("ape") == {"Papel A4", "Papel Almaço"}
+    assert index.search("neta") == {"Caneta Azul"}
+    # Os trigramas existem, mas não em sequência
+    assert index.search("pelp") == set()
+
+
+def test_short_terms_match_word_prefixes_only():
+    index = TextIndex(ITEMS)
+    assert index.search("a4") == {"Papel A4"}
+    assert index.search("a") == {"Papel A4", "Papel Almaço", "Caneta Azul", "Pasta Ação"}
+    assert index.search("2") == {"Lápis Nº 2"}
+    # "4" não começa nenhuma palavra de "Papel A4"
+    assert index.search("4") == set()
+    assert index.search("el") == set()
+
+
+def test_terms_are_combined_with_and():
+    index = TextIndex(ITEMS)
+    assert index.search("pap a4") == {"Papel A4"}
+    assert index.search("pa al") == {"Papel Almaço"}
+    # Cada termo é buscado separadamente: "el" não é início de palavra
+    assert index.search("el a") == set()
+
+
+def test_empty_query_returns_everything():
+    assert TextIndex(ITEMS).search("  ") == set(ITEMS)
+
+
+def test_add_and_remove_update_the_index():
+    index = TextIndex(ITEMS)
+    index.remove("Papel A4")
+    index.add("Envelope A4")
+    assert index.search("a4") == {"Envelope A4"}
+    assert index.search("pap") == {"Papel Almaço"}
+    assert "Papel A4" not in index and len(index) == len(ITEMS)
+
+    # Chave indexada por outro texto
+    index.add("CX-01", "Caixa de arquivo")
+    assert index.search("arquivo") == {"CX-01"}
+    index.remove("CX-01")
+    assert index.search("arquivo") == set()
+    index.remove("inexistente")
@@ -1,40 +1,32 @@
 # views\buy_window.py
 
 from PySide6.QtWidgets import (
-    QDialog, QGridLayout, QTableWidget, QTableWidgetItem,
+    QDialog, QGridLayout, QTableView,
     QHeaderView, QAbstractItemView, QPushButton, QMessageBox,
-    QLabel, QHBoxLayout
+    QLabel, QHBoxLayout, QComboBox
 )
 from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QBrush, QColor
 import json
-import os
-import sys
-import locale
 
-# Configurar localização para formato brasileiro
-locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-
-# Obter o diretório do script (igual ao anterior)
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# Diretório raiz do projeto (sobe um nível a partir do script)
-# PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-# REQUISICOES_JSON = os.path.join(PROJECT_ROOT, "requisicoes.json")
-# ESTOQUE_JSON = os.path.join(PROJECT_ROOT, "almoxarifado.json")
-# REQUISICOES_COMPRADAS_JSON = os.path.join(PROJECT_ROOT, "requisicoes_compradas.json")
-
-REQUISICOES_JSON = os.path.join(SCRIPT_DIR, "requisicoes.json")
-ESTOQUE_JSON = os.path.join(SCRIPT_DIR, "almoxarifado.json")
-REQUISICOES_COMPRADAS_JSON = os.path.join(SCRIPT_DIR, "requisicoes_compradas.json")
+from storage.allocation import allocate, POLICIES, PRIORITY, ALLOCATION_POLICY
+from storage.concurrency import ConflictError
+from storage.reservation import stock_levels
+from storage.json_store import (
+    get_store, REQUISICOES_JSON, ESTOQUE_ALMOX_JSON, REQUISICOES_COMPRADAS_JSON
+)
+from storage.ledger import new_event, COMPRA
+from views.money import format_currency
+from views.table_models import RequestListModel, PurchaseLineModel
+from views.workers import TaskRunner
 
 
-def format_currency(value):
-    """Formata um valor como moeda brasileira"""
-    return locale.currency(value, grouping=True, symbol=True)
+def aggregate_items(requests):
+    """Itens das requisições somados por nome, na ordem em que aparecem"""
+    totals = {}
+    for request in requests:
+        for item in request.get("itens", []):
+            totals[item["item"]] = totals.get(item["item"], 0) + item["quantidade"]
+    return [{"item": name, "quantidade": qty} for name, qty in totals.items()]
 
 
 class BuyWindow(QDialog):
@@ -46,31 +38,26 @@ class BuyWindow(QDialog):
         # Layout principal
         main_layout = QGridLayout(self)
 
-        # Tabela de requisições
-        self.requests_table = QTableWidget()
-        self.requests_table.setColumnCount(2)
-        self.requests_table.setHorizontalHeaderLabels(["ID Requisição", "Status"])
+        # Tabela de requisições (carregada por páginas conforme a rolagem)
+        self.requests_model = RequestListModel([
+            ("ID Requisição", lambda req: str(req["id"])),
+            ("Status", lambda req: req["status"]),
+        ], self)
+        self.requests_table = QTableView()
+        self.requests_table.setModel(self.requests_model)
         self.requests_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch) # type: ignore
         self.requests_table.setSelectionBehavior(QAbstractItemView.SelectRows) # type: ignore
-        self.requests_table.setSelectionMode(QAbstractItemView.SingleSelection) # type: ignore
-        self.requests_table.itemSelectionChanged.connect(self.load_request_items)
-        self.requests_table.setEditTriggers(QTableWidget.NoEditTriggers) # type: ignore
-
-        # Tabela de itens
-        self.items_table = QTableWidget()
-        self.items_table.setColumnCount(8)
-        headers = [
-            "Item",
-            "Quantidade Solicitada",
-            "Estoque Almoxarifado",
-            "Quantidade Disponível",
-            "Quantidade a Comprar",
-            "Preço Unitário",
-            "Valor Total",
-            "Status"
-        ]
-        self.items_table.setHorizontalHeaderLabels(headers)
+        # Várias requisições podem ser compradas juntas (Ctrl/Shift + clique)
+        self.requests_table.setSelectionMode(QAbstractItemView.ExtendedSelection) # type: ignore
+        self.requests_table.selectionModel().selectionChanged.connect(lambda *_: self.load_request_items())
+        self.requests_table.setEditTriggers(QAbstractItemView.NoEditTriggers) # type: ignore
+
+        # Tabela de itens (quantidade a comprar e preço unitário editáveis)
+        self.items_model = PurchaseLineModel(self)
+        self.items_table = QTableView()
+        self.items_table.setModel(self.items_model)
         self.items_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch) # type: ignore
+        self.items_table.setEditTriggers(QAbstractItemView.AllEditTriggers) # type: ignore
 
         # Adicionar tabelas ao layout
         main_layout.addWidget(self.requests_table, 0, 0, 1, 2)
@@ -79,9 +66,32 @@ class BuyWindow(QDialog):
         # Área de totais
         total_layout = QHBoxLayout()
 
+        # Como o estoque é dividido entre as requisições aprovadas que disputam o mesmo item
+        total_layout.addWidget(QLabel("Alocação do estoque:"))
+        self.policy_combo = QComboBox()
+        for policy, label in POLICIES.items():
+            self.policy_combo.addItem(label, policy)
+        self.policy_combo.setItemData(
+            self.policy_combo.findData(PRIORITY),
+            "Usa o campo \"prioridade\" das requisições, definido fora do programa; "
+            "sem ele, equivale à ordem de chegada.",
+            Qt.ToolTipRole  # type: ignore
+        )
+        self.policy_combo.setCurrentIndex(max(0, self.policy_combo.findData(ALLOCATION_POLICY)))
+        self.policy_combo.currentIndexChanged.connect(lambda _: self.update_allocation())
+        total_layout.addWidget(self.policy_combo)
+
+        self.shortfall_label = QLabel()
+        total_layout.addWidget(self.shortfall_label)
+
+        self.selection_label = QLabel("Nenhuma requisição selecionada")
+        total_layout.addWidget(self.selection_label)
+
         self.total_label = QLabel("Total da Compra: R$ 0,00")
         self.total_label.setStyleSheet("font-weight: bold; font-size: 14px;")
         total_layout.addWidget(self.total_label)
+        # O modelo mantém o total e avisa a cada edição
+        self.items_model.total_changed.connect(self.update_total)
 
         main_layout.addLayout(total_layout, 2, 0, 1, 2)
 
@@ -98,294 +108,153 @@ class BuyWindow(QDialog):
 
         main_layout.addLayout(btn_layout, 3, 0, 1, 2)
 
-        # Carregar dados
+        # Carregar dados (em segundo plano; a janela abre imediatamente)
+        self.stock = {}
+        self.levels = None
+        self.approved_requests = []
+        self.allocation = None
+        self.selected_requests = []
+        self.tasks = TaskRunner(self, busy_widget=self)
         self.load_requests()
         self.load_stock()
 
     def load_stock(self):
-        """Carrega o estoque do almoxarifado"""
-        self.stock = {}
-        try:
-            if os.path.exists(ESTOQUE_JSON):
-                with open(ESTOQUE_JSON, "r", encoding="utf-8") as f:
-                    stock_data = json.load(f)
-                    for item in stock_data:
-                        item_name = item.get('item', '')
-                        if item_name:
-                            self.stock[item_name] = {
-                                'quantidade': item.get('quantidade', 0),
-                                'valor_unitario': item.get('valor_unitario', 0.0)
-                            }
-        except Exception as e:
-            QMessageBox.warning(self, "Erro", f"Falha ao carregar estoque: {str(e)}")
+        """Carrega o estoque do almoxarifado (saldo por item e totais reservados)"""
+        self.tasks.run(
+            "stock", stock_levels, self.show_stock,
+            lambda e: QMessageBox.warning(self, "Erro", f"Falha ao carregar estoque: {str(e)}")
+        )
+
+    def show_stock(self, levels):
+        self.stock = levels.table
+        self.levels = levels
+        self.update_allocation()  # Atualiza a requisição já selecionada, se houver
 
     def load_requests(self):
         """Carrega requisições aprovadas"""
-        try:
-            with open(REQUISICOES_JSON, "r", encoding="utf-8") as f:
-                requests = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            requests = []
-
-        approved_requests = [req for req in requests if req.get("status") == "Aprovada"]
-        self.requests_table.setRowCount(len(approved_requests))
-        for row, req in enumerate(approved_requests):
-            self.requests_table.setItem(row, 0, QTableWidgetItem(str(req["id"])))
-            self.requests_table.setItem(row, 1, QTableWidgetItem(req["status"]))
+        def load():
+            try:
+                return get_store().requests_with_status("Aprovada")
+            except json.JSONDecodeError:
+                return []
+
+        self.tasks.run(
+            "requests", load, self.show_requests,
+            lambda e: QMessageBox.warning(self, "Erro", f"Falha ao carregar requisições: {str(e)}")
+        )
+
+    def show_requests(self, approved_requests):
+        # As linhas são entregues à tabela por páginas; a seleção não relê o arquivo
+        self.requests_model.set_requests(approved_requests)
+        self.approved_requests = approved_requests
+        self.update_allocation()  # A recarga limpa a seleção
+
+    def update_allocation(self):
+        """Distribui o estoque entre todas as requisições aprovadas pela política escolhida"""
+        # O que já está reservado para requisições compradas não entra na divisão
+        reserved = self.levels.reserved_items() if self.levels is not None else None
+        self.allocation = allocate(self.approved_requests, self.stock,
+                                   self.policy_combo.currentData(), reserved)
+        shortfall = self.allocation.shortfall
+        if shortfall:
+            self.shortfall_label.setText(
+                f"Falta comprar: {len(shortfall)} item(ns), {sum(shortfall.values())} unidade(s)")
+            self.shortfall_label.setToolTip(
+                "\n".join(f"{item}: {qty}" for item, qty in sorted(shortfall.items())))
+        else:
+            self.shortfall_label.setText("Estoque atende todas as requisições aprovadas")
+            self.shortfall_label.setToolTip("")
+        self.load_request_items()
 
     def load_request_items(self):
-        """Carrega itens da requisição selecionada com campos editáveis"""
-        selected_row = self.requests_table.currentRow()
-        if selected_row < 0:
-            return
-
-        req_id = int(self.requests_table.item(selected_row, 0).text())
-        self.current_req_id = req_id
-
-        try:
-            with open(REQUISICOES_JSON, "r", encoding="utf-8") as f:
-                requests = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            requests = []
-
-        selected_request = next((req for req in requests if req["id"] == req_id), None)
-        if not selected_request:
-            return
-
-        items = selected_request.get("itens", [])
-        self.items_table.setRowCount(len(items))
-
-        total_compra = 0.0
-
-        for row, item in enumerate(items):
-            item_name = item["item"]
-            qtd_solicitada = item["quantidade"]
-
-            # Obter informações do estoque
-            estoque_info = self.stock.get(item_name, {'quantidade': 0, 'valor_unitario': 0.0})
-            estoque_disponivel = estoque_info['quantidade']
-            qtd_disponivel = min(qtd_solicitada, estoque_disponivel)
-            qtd_comprar = max(0, qtd_solicitada - qtd_disponivel)
-
-            # Calcular status
-            if qtd_comprar == 0:
-                status = "Em estoque"
-                bg_color = QBrush(QColor(220, 255, 220))  # Verde claro
-            else:
-                status = "Necessita compra"
-                bg_color = QBrush(QColor(255, 220, 220))  # Vermelho claro
-
-            # Item (não editável)
-            item_cell = QTableWidgetItem(item_name)
-            item_cell.setFlags(item_cell.flags() & ~Qt.ItemIsEditable) # type: ignore
-            self.items_table.setItem(row, 0, item_cell)
-
-            # Quantidade Solicitada (não editável)
-            qtd_sol_cell = QTableWidgetItem(str(qtd_solicitada))
-            qtd_sol_cell.setFlags(qtd_sol_cell.flags() & ~Qt.ItemIsEditable) # type: ignore
-            self.items_table.setItem(row, 1, qtd_sol_cell)
-
-            # Estoque Almoxarifado (não editável)
-            estoque_cell = QTableWidgetItem(str(estoque_disponivel))
-            estoque_cell.setFlags(estoque_cell.flags() & ~Qt.ItemIsEditable) # type: ignore
-            self.items_table.setItem(row, 2, estoque_cell)
-
-            # Quantidade Disponível (não editável)
-            qtd_disp_cell = QTableWidgetItem(str(qtd_disponivel))
-            qtd_disp_cell.setFlags(qtd_disp_cell.flags() & ~Qt.ItemIsEditable) # type: ignore
-            self.items_table.setItem(row, 3, qtd_disp_cell)
-
-            # Quantidade a Comprar (editável)
-            qtd_comprar_cell = QTableWidgetItem(str(qtd_comprar))
-            qtd_comprar_cell.setData(Qt.UserRole, qtd_comprar)  # type: ignore
-            self.items_table.setItem(row, 4, qtd_comprar_cell)
-
-            # Preço Unitário (editável)
-            preco_unit = estoque_info.get('valor_unitario', 0.0)
-            preco_cell = QTableWidgetItem(format_currency(preco_unit))
-            self.items_table.setItem(row, 5, preco_cell)
-
-            # Valor Total (calculado)
-            valor_total = qtd_comprar * preco_unit
-            total_cell = QTableWidgetItem(format_currency(valor_total))
-            total_cell.setFlags(total_cell.flags() & ~Qt.ItemIsEditable) # type: ignore
-            self.items_table.setItem(row, 6, total_cell)
-
-            # Status (não editável)
-            status_cell = QTableWidgetItem(status)
-            status_cell.setFlags(status_cell.flags() & ~Qt.ItemIsEditable) # type: ignore
-            status_cell.setBackground(bg_color)
-            self.items_table.setItem(row, 7, status_cell)
-
-            total_compra += valor_total
-
-        # Conectar sinal para atualizar valores quando células forem editadas
-        self.items_table.cellChanged.connect(self.update_values)
-
-
-        # Atualizar total da compra
-        self.total_label.setText(f"Total da Compra: {format_currency(total_compra)}")
-        self.items_table.resizeColumnsToContents()
-
-        self.items_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # type: ignore
-
-    def update_values(self, row, column):
-        """Atualiza valores quando células são editadas"""
-        # Só nos interessa as colunas de quantidade a comprar (4) e preço unitário (5)
-        if column not in (4, 5):
-            return
-
-        # Obter valores atuais
-        try:
-            qtd_comprar_item = self.items_table.item(row, 4)
-            preco_item = self.items_table.item(row, 5)
-            total_item = self.items_table.item(row, 6)
-
-            # Converter valores
-            qtd_comprar = int(qtd_comprar_item.text())
-            preco_str = preco_item.text().replace("R$", "").replace(".", "").replace(",", ".").strip()
-            preco_unit = float(preco_str)
-
-            # Calcular novo total
-            novo_total = qtd_comprar * preco_unit
-
-            # Atualizar células
-            total_item.setText(format_currency(novo_total))
-            preco_item.setText(format_currency(preco_unit))  # Reformatar
-
-            # Atualizar total geral
-            self.update_total()
-
-        except (ValueError, TypeError, AttributeError):
-            pass
+        """Monta uma única folha de compra com os itens das requisições selecionadas"""
+        rows = sorted(index.row() for index in self.requests_table.selectionModel().selectedRows())
+        self.selected_requests = [
+            req for req in (self.requests_model.request(row) for row in rows) if req
+        ]
 
-    def update_total(self):
-        """Atualiza o total geral da compra"""
-        total_compra = 0.0
+        count = len(self.selected_requests)
+        if count == 0:
+            self.selection_label.setText("Nenhuma requisição selecionada")
+        elif count == 1:
+            self.selection_label.setText(f"Requisição {self.selected_requests[0]['id']}")
+        else:
+            self.selection_label.setText(f"{count} requisições selecionadas")
 
-        for row in range(self.items_table.rowCount()):
-            total_item = self.items_table.item(row, 6)
-            if total_item:
-                try:
-                    total_str = total_item.text().replace("R$", "").replace(".", "").replace(",", ".").strip()
-                    total_compra += float(total_str)
-                except ValueError:
-                    pass
+        # Disponível para a seleção é só a parte do estoque alocada a ela
+        allocated = None
+        if self.allocation is not None:
+            allocated = self.allocation.for_requests(req["id"] for req in self.selected_requests)
+        self.items_model.set_lines(PurchaseLineModel.build_lines(
+            aggregate_items(self.selected_requests), self.stock, allocated))
 
-        self.total_label.setText(f"Total da Compra: {format_currency(total_compra)}")
+    def update_total(self, total):
+        self.total_label.setText(f"Total da Compra: {format_currency(total)}")
 
     purchase_completed = Signal(int)  # Novo sinal
 
     def register_purchase(self):
         """Registra a compra e atualiza o estoque"""
-        if not hasattr(self, 'current_req_id'):
+        if not self.selected_requests:
             QMessageBox.warning(self, "Nenhuma requisição selecionada",
                                 "Selecione uma requisição antes de registrar a compra.")
             return
 
-        # Atualizar estoque com as compras
-        for row in range(self.items_table.rowCount()):
-            item_name = self.items_table.item(row, 0).text()
-
-            # Obter quantidade a comprar
-            qtd_comprar_item = self.items_table.item(row, 4)
-            qtd_comprar = int(qtd_comprar_item.text())
-
-            if qtd_comprar > 0:
-                # Obter preço unitário
-                preco_item = self.items_table.item(row, 5)
-                preco_str = preco_item.text().replace("R$", "").replace(".", "").replace(",", ".").strip()
-                preco_unit = float(preco_str)
-
-                # Atualizar estoque
-                if item_name in self.stock:
-                    self.stock[item_name]['quantidade'] += qtd_comprar
-                    # Atualizar preço médio ponderado
-                    estoque_atual = self.stock[item_name]['quantidade'] - qtd_comprar
-                    valor_atual = estoque_atual * self.stock[item_name]['valor_unitario']
-                    valor_compra = qtd_comprar * preco_unit
-                    novo_valor_unit = (valor_atual + valor_compra) / (estoque_atual + qtd_comprar)
-                    self.stock[item_name]['valor_unitario'] = novo_valor_unit
-                else:
-                    self.stock[item_name] = {
-                        'quantidade': qtd_comprar,
-                        'valor_unitario': preco_unit
-                    }
-
-        # Salvar estoque atualizado
-        self.save_stock()
-
-        # Atualizar status da requisição
-        self.update_request_status(self.current_req_id, "Comprada")
-        self.save_purchased_request(self.current_req_id)
+        req_ids = [req["id"] for req in self.selected_requests]
+        # Compra consolidada: cada item é uma única movimentação; a requisição
+        # só é anotada no evento quando a folha tem uma única requisição
+        req_id = req_ids[0] if len(req_ids) == 1 else None
+
+        # Registrar as compras como movimentações do almoxarifado
+        # O livro recalcula o preço médio ponderado ao aplicar a compra
+        events = [
+            new_event(COMPRA, ESTOQUE_ALMOX_JSON, item_name, qtd_comprar,
+                      valor_unitario=preco_unit, requisicao=req_id)
+            for item_name, qtd_comprar, preco_unit in self.items_model.purchases()
+        ]
+
+        # Estoque, status e avisos de compra são gravados juntos
+        if not self.save_purchase(self.selected_requests, events):
+            return
 
         # Emitir sinal ao finalizar compra
-        self.purchase_completed.emit(self.current_req_id)
+        for req_id in req_ids:
+            self.purchase_completed.emit(req_id)
 
         QMessageBox.information(self, "Compra registrada",
-                                "A compra foi registrada com sucesso! O estoque foi atualizado.")
+                                f"Compra de {len(req_ids)} requisição(ões) registrada com sucesso! "
+                                "O estoque foi atualizado.")
         self.close()
 
-    def save_stock(self):
-        """Salva o estoque atualizado no arquivo"""
+    def save_purchase(self, requests, events):
+        """Grava as movimentações, os novos status e os avisos de compra numa única transação"""
+        # Registros com a versão vista na tela: detecta compra simultânea por outro comprador
+        purchased = [dict(req, status="Comprada") for req in requests]
         try:
-            # Converter para formato de lista
-            stock_data = []
-            for item_name, info in self.stock.items():
-                stock_data.append({
-                    'item': item_name,
-                    'quantidade': info['quantidade'],
-                    'valor_unitario': info['valor_unitario'],
-                    'valor_total': info['quantidade'] * info['valor_unitario']
-                })
-
-            with open(ESTOQUE_JSON, "w", encoding="utf-8") as f:
-                json.dump(stock_data, f, indent=4, ensure_ascii=False)
-
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", f"Falha ao salvar estoque: {str(e)}")
-
-    def save_purchased_request(self, req_id):
-        """Salva a requisição comprada em um arquivo especial"""
-        try:
-            # Carregar requisições compradas existentes
-            if os.path.exists(REQUISICOES_COMPRADAS_JSON):
-                with open(REQUISICOES_COMPRADAS_JSON, "r", encoding="utf-8") as f:
-                    purchased_requests = json.load(f)
-            else:
-                purchased_requests = []
-
-            # Adicionar nova requisição se ainda não existir
-            if req_id not in [r["id"] for r in purchased_requests]:
-                purchased_requests.append({
-                    "id": req_id,
-                    "viewed": False  # Marcador para saber se já foi notificada
-                })
-
-                # Salvar no arquivo
-                with open(REQUISICOES_COMPRADAS_JSON, "w", encoding="utf-8") as f:
-                    json.dump(purchased_requests, f, indent=4, ensure_ascii=False)
-
-        except Exception as e:
-            print(f"Erro ao salvar requisição comprada: {e}")
-
-    def update_request_status(self, req_id, new_status):
-        """Atualiza o status de uma requisição"""
-        try:
-            with open(REQUISICOES_JSON, "r", encoding="utf-8") as f:
-                requests = json.load(f)
-
-            for req in requests:
-                if req["id"] == req_id:
-                    req["status"] = new_status
-                    break
-
-            with open(REQUISICOES_JSON, "w", encoding="utf-8") as f:
-                json.dump(requests, f, indent=4, ensure_ascii=False)
-
+            with get_store().transaction() as tx:
+                tx.record_movements(events)
+                tx.save_records(REQUISICOES_JSON, purchased)
+                for req in requests:
+                    self.save_purchased_request(tx, req["id"])
+            return True
+        except ConflictError as e:
+            ids = ", ".join(str(key) for key in e.keys)
+            QMessageBox.warning(self, "Conflito",
+                                f"Requisição(ões) {ids} alterada(s) por outro usuário. "
+                                "Nada foi registrado.")
+            self.load_requests()
+            return False
         except Exception as e:
-            QMessageBox.critical(self, "Erro",
-                                 f"Falha ao atualizar status da requisição: {str(e)}")
+            QMessageBox.critical(self, "Erro", f"Falha ao registrar compra: {str(e)}")
+            return False
+
+    def save_purchased_request(self, tx, req_id):
+        """Inclui a requisição comprada no arquivo de avisos, dentro da transação"""
+        # Adicionar nova requisição se ainda não existir
+        tx.add_record(REQUISICOES_COMPRADAS_JSON, {
+            "id": req_id,
+            "viewed": False  # Marcador para saber se já foi notificada
+        })
 
 
 if __name__ == "__main__":
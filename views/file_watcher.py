@@ -0,0 +1,128 @@
+# views\file_watcher.py
+
+import os
+
+from PySide6.QtCore import QObject, QTimer, QFileSystemWatcher, Signal
+
+from storage.json_store import get_store, JsonStore, ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON
+from storage.ledger import LEDGER_FILE, CHECKPOINT_FILE
+from views.workers import TaskRunner
+
+# Tempo sem novas alterações antes de avisar as janelas (agrupa rajadas de gravações)
+DEBOUNCE_MS = 300
+# Intervalo da verificação periódica; cobre compartilhamentos de rede, onde o
+# sistema nem sempre avisa sobre alterações feitas por outras estações (0 desliga)
+POLL_INTERVAL_MS = int(os.environ.get("REQUISICAO_POLL_MS", "1000"))
+
+# Os saldos de estoque são gravados no livro de movimentações
+_STOCK_SOURCES = (LEDGER_FILE, CHECKPOINT_FILE)
+
+
+class DataWatcher(QObject):
+    """Observa os dados e emite ``changed`` com os nomes que mudaram.
+
+    Com o JsonStore usa o QFileSystemWatcher (aviso imediato) e, como
+    garantia, compara periodicamente a assinatura (mtime, tamanho, inode)
+    dos arquivos; com os demais repositórios compara as versões. As
+    consultas rodam em segundo plano (um serviço lento ou fora do ar não
+    trava a interface) e ``changed`` é emitido na thread da interface.
+    Várias alterações seguidas resultam num único ``changed`` depois de
+    ``DEBOUNCE_MS`` sem novidades.
+    """
+
+    changed = Signal(set)
+
+    def __init__(self, names, parent=None):
+        super().__init__(parent)
+        self.names = set(names)
+        self._pending = set()
+        self._state = None     # definido pela primeira consulta
+        self._recheck = False  # pedido de verificação durante uma consulta
+        self.tasks = TaskRunner(self)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._emit)
+
+        self._fs_watcher = None
+        store = get_store()
+        if isinstance(store, JsonStore):
+            self._fs_watcher = QFileSystemWatcher(self)
+            # A pasta também é observada: a gravação atômica troca o arquivo
+            # (novo inode) e ele deixa de ser observado
+            self._fs_watcher.addPath(store.data_dir)
+            self._fs_watcher.fileChanged.connect(self._on_fs_event)
+            self._fs_watcher.directoryChanged.connect(self._on_fs_event)
+            self._watch_files()
+
+        self.check()  # estado inicial, sem aviso
+
+        self._poll = QTimer(self)
+        self._poll.timeout.connect(self.check)
+        if POLL_INTERVAL_MS > 0:
+            self._poll.start(POLL_INTERVAL_MS)
+
+    def _sources(self, name):
+        """Arquivos cujo conteúdo determina ``name``"""
+        if name in (ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON):
+            return _STOCK_SOURCES + (name,)
+        return (name,)
+
+    def _watch_files(self):
+        store = get_store()
+        paths = {store.path(src) for name in self.names for src in self._sources(name)}
+        missing = [p for p in paths if os.path.exists(p) and p not in self._fs_watcher.files()]
+        if missing:
+            self._fs_watcher.addPaths(missing)
+
+    def _probe(self, name):
+        store = get_store()
+        try:
+            if isinstance(store, JsonStore):
+                return tuple(store.signature(src) for src in self._sources(name))
+            if name in (ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON):
+                return store.stock_version(name)
+            return store.version(name)
+        except Exception:
+            return None  # Serviço ou pasta indisponível: tenta de novo no próximo ciclo
+
+    def _on_fs_event(self, path):
+        if self._fs_watcher is not None:
+            self._watch_files()
+        self.check()
+
+    def check(self):
+        """Consulta o estado atual em segundo plano (uma consulta por vez)"""
+        if self.tasks.is_busy():
+            self._recheck = True  # repete quando a consulta em andamento terminar
+            return
+        names = tuple(self.names)
+        self.tasks.run("probe", lambda: {name: self._probe(name) for name in names},
+                       self._on_probe)
+
+    def _on_probe(self, states):
+        """Compara o estado consultado com o último conhecido e agenda o aviso"""
+        if self._state is None:
+            self._state = states
+        else:
+            for name, state in states.items():
+                if state != self._state.get(name):
+                    self._state[name] = state
+                    self._pending.add(name)
+            if self._pending:
+                self._debounce.start()  # reinicia a contagem a cada nova alteração
+
+        if self._recheck:
+            self._recheck = False
+            self.check()
+
+    def _emit(self):
+        names, self._pending = self._pending, set()
+        if names:
+            self.changed.emit(names)
+
+    def stop(self):
+        self._poll.stop()
+        self._debounce.stop()
+        self.tasks.cancel_all()
@@ -1,21 +1,10 @@
 # views/login_window.py
-import json
-import os
-import sys
 from PySide6.QtWidgets import (
     QDialog, QGridLayout, QLineEdit,
     QPushButton, QMessageBox, QLabel
 )
 
-# Obter diretório do script
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-# Diretório raiz do projeto (sobe um nível a partir do script)
-#PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-
-USERS_JSON = os.path.join(SCRIPT_DIR, "users.json")
+from storage.json_store import get_store, USERS_JSON
 
 class LoginWindow(QDialog):
     def __init__(self):
@@ -52,8 +41,7 @@ class LoginWindow(QDialog):
 
     def verify_login(self):
         try:
-            with open(USERS_JSON, "r", encoding="utf-8") as f:
-                users = json.load(f)
+            users = get_store().read(USERS_JSON)
         except FileNotFoundError:
             QMessageBox.critical(self, "Erro", "Arquivo de usuários não encontrado.")
             return
@@ -1,51 +1,24 @@
 # views\main_window.py
 
-import json, sys, os, locale
+import json
 from PySide6.QtWidgets import (
     QMainWindow, QDockWidget, QAbstractItemView, QMessageBox,
-    QTableWidget, QTableWidgetItem, QHeaderView, QDialog
+    QTableView, QHeaderView, QDialog, QWidget, QVBoxLayout, QLineEdit
 )
 from PySide6.QtGui import QAction
 from PySide6.QtCore import Qt, Signal
 
-from views.buy_window import BuyWindow
-from views.request_window import RequestWindow
-from views.stock_off_window import StockOffWindow
-from views.movement import MovementWindow
-from views.login_window import LoginWindow
-from views.report_window import ReportWindow
-
-# Configure Brazilian locale for currency formatting
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except locale.Error:
-    locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil.1252')  # Fallback for Windows
-
-
-# Helper function to format currency
-def format_currency(value):
-    """Formata um valor como moeda brasileira"""
-    try:
-        return locale.currency(value, grouping=True, symbol=True)
-    except (TypeError, ValueError):
-        return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-
-# Diretório onde o script está
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# Diretório raiz do projeto (sobe um nível a partir do script)
-# PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-
-# Caminhos absolutos para os arquivos na raiz do projeto
-# ESTOQUE_ALMOX_JSON = os.path.join(PROJECT_ROOT, "almoxarifado.json")
-# ESTOQUE_SETOR_JSON = os.path.join(PROJECT_ROOT, "setor.json")
-ESTOQUE_ALMOX_JSON = os.path.join(SCRIPT_DIR, "almoxarifado.json")
-ESTOQUE_SETOR_JSON = os.path.join(SCRIPT_DIR, "setor.json")
+from views.money import format_currency
+from views.table_models import StockTableModel
+from views.file_watcher import DataWatcher
+from views.workers import TaskRunner
+from storage.json_store import (
+    get_store, ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON, REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON
+)
+from storage.reservation import stock_levels
 
+# As janelas de operação (compra, requisições, baixa, movimentação, relatório)
+# são importadas ao serem abertas pela primeira vez, e não na inicialização
 
 
 class MainWindow(QMainWindow):
@@ -56,6 +29,9 @@ class MainWindow(QMainWindow):
         self.role = role
         self.username = username
         self.name = name
+        self.showing_notifications = False
+        # Leituras de dados fora da thread da interface
+        self.tasks = TaskRunner(self, busy_widget=self)
         self.setup_ui()
         self.configure_by_role()
 
@@ -67,12 +43,30 @@ class MainWindow(QMainWindow):
         super().showEvent(event)
         self.check_purchase_notifications()
 
+    def on_data_changed(self, names):
+        """Atualiza as janelas abertas com os dados alterados (avisado pelo DataWatcher)"""
+        if names & {ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON, REQUISICOES_JSON}:
+            self.refresh_stocks()
+        if REQUISICOES_COMPRADAS_JSON in names:
+            self.check_purchase_notifications()
+
     def check_purchase_notifications(self):
         """Verifica e mostra notificações de compras pendentes"""
         # Apenas para funcionários (roles 1 e 2)
         if self.role not in (1, 2):
             return
 
+        # Um aviso por vez (novas alterações podem chegar com o pop-up aberto)
+        if self.showing_notifications:
+            return
+        self.showing_notifications = True
+        try:
+            self.show_purchase_notifications()
+        finally:
+            self.showing_notifications = False
+
+    def show_purchase_notifications(self):
+        """Mostra as requisições compradas ainda não vistas e marca-as como vistas"""
         # Carregar requisições compradas não visualizadas
         purchased_requests = self.load_purchased_requests()
         if not purchased_requests:
@@ -100,12 +94,7 @@ class MainWindow(QMainWindow):
     def load_purchased_requests(self):
         """Carrega requisições compradas do arquivo"""
         try:
-            # Caminho para o arquivo de requisições compradas
-            purchased_file = os.path.join(SCRIPT_DIR, "requisicoes_compradas.json")
-
-            if os.path.exists(purchased_file):
-                with open(purchased_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            return get_store().read(REQUISICOES_COMPRADAS_JSON, default=[])
         except Exception as e:
             print(f"Erro ao carregar requisições compradas: {e}")
         return []
@@ -113,20 +102,12 @@ class MainWindow(QMainWindow):
     def mark_requests_as_viewed(self, req_ids):
         """Marca as requisições como visualizadas"""
         try:
-            purchased_file = os.path.join(SCRIPT_DIR, "requisicoes_compradas.json")
-
-            if os.path.exists(purchased_file):
-                with open(purchased_file, "r", encoding="utf-8") as f:
-                    purchased_requests = json.load(f)
-
-                # Atualizar o status de visualização
-                for req in purchased_requests:
-                    if str(req["id"]) in req_ids:
-                        req["viewed"] = True
-
-                # Salvar de volta
-                with open(purchased_file, "w", encoding="utf-8") as f:
-                    json.dump(purchased_requests, f, indent=4, ensure_ascii=False)
+            store = get_store()
+            if store.exists(REQUISICOES_COMPRADAS_JSON):
+                # Atualizar o status de visualização (com o arquivo bloqueado)
+                with store.transaction() as tx:
+                    tx.update_records(REQUISICOES_COMPRADAS_JSON,
+                                      [int(req_id) for req_id in req_ids], {"viewed": True})
 
         except Exception as e:
             print(f"Erro ao marcar requisições como visualizadas: {e}")
@@ -145,6 +126,13 @@ class MainWindow(QMainWindow):
         self.status_bar = self.statusBar()
         self.status_bar.showMessage(f"Bem-vindo, {self.name}!")
 
+        # Alterações feitas por outras estações chegam sem ação do usuário
+        self.data_watcher = DataWatcher(
+            [ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON, REQUISICOES_JSON, REQUISICOES_COMPRADAS_JSON],
+            self
+        )
+        self.data_watcher.changed.connect(self.on_data_changed)
+
     def create_menus(self):
         menu_bar = self.menuBar()
 
@@ -188,11 +176,13 @@ class MainWindow(QMainWindow):
         return action
 
     def setup_docks(self):
+        # Versão do estoque exibida em cada dock (evita recarregar sem mudanças)
+        self.stock_versions = {}
+
         # Dock Almoxarifado
         self.dock_wherehouse = QDockWidget("Estoque do Almoxarifado", self)
-        self.table_wherehouse = QTableWidget()
-        self.table_wherehouse.setEditTriggers(QAbstractItemView.NoEditTriggers)  # type: ignore
-        self.dock_wherehouse.setWidget(self.table_wherehouse)
+        self.table_wherehouse = self.create_stock_view(reservations=True)
+        self.dock_wherehouse.setWidget(self.create_stock_panel(self.table_wherehouse))
         self.addDockWidget(Qt.RightDockWidgetArea, self.dock_wherehouse)  # type: ignore
         self.dock_wherehouse.setVisible(False)
         self.table_wherehouse.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # type: ignore
@@ -202,16 +192,39 @@ class MainWindow(QMainWindow):
 
         # Dock Setor
         self.dock_sector = QDockWidget("Estoque do Setor", self)
-        self.table_sector = QTableWidget()
-        self.table_sector.setEditTriggers(QAbstractItemView.NoEditTriggers)  # type: ignore
+        self.table_sector = self.create_stock_view()
         self.table_sector.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # type: ignore
-        self.dock_sector.setWidget(self.table_sector)
+        self.dock_sector.setWidget(self.create_stock_panel(self.table_sector))
         self.addDockWidget(Qt.RightDockWidgetArea, self.dock_sector)  # type: ignore
         self.dock_sector.setVisible(False)
         self.dock_sector.visibilityChanged.connect(
             lambda visible: self.stock_sector_action.setChecked(visible)
         )
 
+    def create_stock_view(self, reservations=False):
+        """Tabela de estoque virtualizada: só as linhas visíveis são formatadas"""
+        view = QTableView()
+        view.setModel(StockTableModel(format_currency, view, reservations))
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)  # type: ignore
+        # Altura fixa: a view não precisa medir cada linha
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # type: ignore
+        return view
+
+    def create_stock_panel(self, view):
+        """Campo de filtro por nome do item acima da tabela de estoque"""
+        panel = QWidget()
+        layout = QVBoxLayout(panel)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        filter_input = QLineEdit()
+        filter_input.setPlaceholderText("Filtrar itens...")
+        filter_input.setClearButtonEnabled(True)
+        # Busca no índice do modelo a cada tecla (sem acentos/maiúsculas)
+        filter_input.textChanged.connect(view.model().set_filter)
+        layout.addWidget(filter_input)
+        layout.addWidget(view)
+        return panel
+
     def show_about(self):
         QMessageBox.information(self, "Sobre",
                                 "Sistema de Estoque v1.0\nDesenvolvido por Joaquim 😎")
@@ -241,10 +254,10 @@ class MainWindow(QMainWindow):
         }
 
         action_windows = {
-            "request": lambda: RequestWindow(parent=self, role=self.role).show(),
-            "stock_off": lambda: StockOffWindow(self).exec(),
-            "buy": lambda: self.open_buy_window(),
-            "movement": lambda: MovementWindow(self, self.role).exec()
+            "request": self.open_request_window,
+            "stock_off": self.open_stock_off_window,
+            "buy": self.open_buy_window,
+            "movement": self.open_movement_window
         }
 
         if self.role in permissions[action]:
@@ -256,8 +269,21 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Permissão negada",
                                 f"Você não pode acessar {action_name}.")
 
+    def open_request_window(self):
+        from views.request_window import RequestWindow
+        RequestWindow(parent=self, role=self.role).show()
+
+    def open_stock_off_window(self):
+        from views.stock_off_window import StockOffWindow
+        StockOffWindow(self).exec()
+
+    def open_movement_window(self):
+        from views.movement import MovementWindow
+        MovementWindow(self, self.role).exec()
+
     def open_buy_window(self):
         """Abre janela de compra e conecta sinais"""
+        from views.buy_window import BuyWindow
         buy_window = BuyWindow(self)
         buy_window.purchase_completed.connect(self.notify_purchase)
         buy_window.exec()
@@ -284,6 +310,7 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage(notification_text)
 
     def show_report_window(self):
+        from views.report_window import ReportWindow
         report_window = ReportWindow(self)
         report_window.exec()
 
@@ -297,50 +324,43 @@ class MainWindow(QMainWindow):
         self.notifications = []
 
     def load_data(self, filename, widget):
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Limpar e configurar tabela
-            widget.clear()
-            widget.setColumnCount(4)
-            headers = ["Item", "Quantidade", "Valor Unitário", "Valor Total"]
-            widget.setHorizontalHeaderLabels(headers)
-            widget.setRowCount(len(data))
-
-            # Preencher dados com formatação de moeda
-            for row, item in enumerate(data):
-                # Item
-                widget.setItem(row, 0, QTableWidgetItem(str(item.get('item', ''))))
-
-                # Quantidade
-                qtd = item.get('quantidade', 0)
-                widget.setItem(row, 1, QTableWidgetItem(str(qtd)))
-
-                # Valor Unitário (formatado como moeda)
-                unit_value = item.get('valor_unitario', 0.0)
-                unit_value_str = format_currency(unit_value)
-                widget.setItem(row, 2, QTableWidgetItem(unit_value_str))
-
-                # Valor Total (formatado como moeda)
-                total_value = item.get('valor_total', 0.0)
-                # Se não existir, calcula: quantidade * valor unitário
-                if total_value == 0 and qtd != 0 and unit_value != 0:
-                    total_value = qtd * unit_value
-                total_value_str = format_currency(total_value)
-                widget.setItem(row, 3, QTableWidgetItem(total_value_str))
-
-            # Ajustar colunas
-            widget.resizeColumnsToContents()
-
-        except FileNotFoundError:
+        """Carrega o estoque em segundo plano e atualiza o dock ao terminar"""
+        known_version = self.stock_versions.get(filename)
+
+        def load():
+            store = get_store()
+            if filename == ESTOQUE_ALMOX_JSON:
+                # As reservas mudam com o status das requisições (lidas antes
+                # da versão, que só avança quando a lista é relida)
+                levels = stock_levels(store)
+                version = (store.stock_version(filename), store.version(REQUISICOES_JSON))
+                if version == known_version:
+                    return version, None
+                return version, StockTableModel.snapshot(levels.table.rows(), levels)
+            version = store.stock_version(filename)
+            if version == known_version:
+                return version, None  # Nada mudou desde a última exibição
+            return version, StockTableModel.snapshot(store.stock(filename))
+
+        def show(result):
+            version, snapshot = result
+            if snapshot is not None:
+                # O modelo compara com o que já exibe e atualiza só as diferenças
+                widget.model().update_snapshot(snapshot)
+            self.stock_versions[filename] = version
+
+        # Um novo carregamento do mesmo estoque cancela o anterior
+        self.tasks.run(filename, load, show, lambda error: self.show_load_error(filename, error))
+
+    def show_load_error(self, filename, error):
+        if isinstance(error, FileNotFoundError):
             QMessageBox.warning(self, "Arquivo não encontrado",
-                                f"O arquivo {filename} não foi encontrado.")
-        except json.JSONDecodeError:
+                                f"O arquivo {get_store().path(filename)} não foi encontrado.")
+        elif isinstance(error, json.JSONDecodeError):
             QMessageBox.warning(self, "Erro de leitura",
-                                f"O arquivo {filename} está corrompido ou em formato inválido.")
-        except Exception as e:
-            QMessageBox.warning(self, "Erro ao carregar", f"{str(e)}")
+                                f"O arquivo {get_store().path(filename)} está corrompido ou em formato inválido.")
+        else:
+            QMessageBox.warning(self, "Erro ao carregar", f"{str(error)}")
 
     def refresh_stocks(self):
         """Refresh visible stock docks when child windows close"""
@@ -350,12 +370,14 @@ class MainWindow(QMainWindow):
             self.load_data(ESTOQUE_SETOR_JSON, self.table_sector)
 
     def closeEvent(self, event):
-        """Refresh stocks when main window closes"""
-        self.refresh_stocks()
+        """Stop background loading and watching when main window closes"""
+        self.data_watcher.stop()
+        self.tasks.cancel_all()
         super().closeEvent(event)
 
 if __name__ == '__main__':
     from PySide6.QtWidgets import QApplication
+    from views.login_window import LoginWindow
 
     app = QApplication([])
 
@@ -0,0 +1,59 @@
+# views\money.py
+
+import math
+from functools import lru_cache
+
+# Valores formatados/convertidos mantidos em memória (os mais usados)
+MONEY_CACHE_SIZE = 4096
+
+
+def format_currency(value):
+    """Formata um valor como moeda brasileira ("R$ 1.234,56").
+
+    Não depende do locale do sistema. Aceita números ou textos já
+    formatados; valores inválidos resultam em "R$ 0,00".
+    """
+    if isinstance(value, str):
+        try:
+            value = parse_currency(value)
+        except ValueError:
+            value = 0.0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        value = 0.0
+    return _format(value if math.isfinite(value) else 0.0)
+
+
+@lru_cache(maxsize=MONEY_CACHE_SIZE)
+def _format(value):
+    # -0,00 aparece como R$ 0,00
+    if round(value, 2) == 0:
+        value = 0.0
+    text = f"{abs(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"-R$ {text}" if value < 0 else f"R$ {text}"
+
+
+def parse_currency(text):
+    """Converte "R$ 1.234,56", "1234,56" ou "12.50" em float.
+
+    Com vírgula, os pontos são separadores de milhar; sem vírgula, um único
+    ponto seguido de uma ou duas casas é o separador decimal. Levanta
+    ValueError se o texto não for um valor (inclusive "inf" e "nan").
+    """
+    return _parse(str(text))
+
+
+@lru_cache(maxsize=MONEY_CACHE_SIZE)
+def _parse(text):
+    number = text.replace("R$", "").replace("\xa0", "").replace(" ", "").strip()
+    if "," in number:
+        number = number.replace(".", "").replace(",", ".")
+    else:
+        decimals = number.rpartition(".")[2]
+        if number.count(".") > 1 or len(decimals) == 3:
+            number = number.replace(".", "")
+    value = float(number)
+    if not math.isfinite(value):
+        raise ValueError(f"Valor inválido: {text!r}")
+    return value
@@ -1,32 +1,42 @@
 # views\movement.py
 
 from PySide6.QtWidgets import (
-    QDialog, QTableWidget, QTableWidgetItem, QVBoxLayout,
+    QDialog, QTableView, QVBoxLayout,
     QHBoxLayout, QPushButton, QLabel, QMessageBox, QHeaderView,
     QAbstractItemView
 )
 
+import copy
 import json
-import os
-import sys
 
-# Diretório onde o script está
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+from storage.concurrency import ConflictError, InsufficientStockError
+from storage.json_store import (
+    get_store, REQUISICOES_JSON, ESTOQUE_ALMOX_JSON, ESTOQUE_SETOR_JSON
+)
+from storage.ledger import new_event, ENVIO, RECEBIMENTO
+from views.table_models import RequestListModel
+from views.workers import TaskRunner
+
+# Times a batch is re-validated when another workstation takes the stock first
+MAX_STOCK_RETRIES = 3
+
+
+def items_text(request):
+    """Multi-line item list of a request (built only for visible rows)"""
+    return "\n".join(f"{item['item']} ({item['quantidade']})" for item in request["itens"])
+
 
-# Diretório raiz do projeto (sobe um nível a partir do script)
-#PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+def total_quantity(request):
+    return str(sum(item["quantidade"] for item in request["itens"]))
 
-# Caminhos absolutos para os arquivos na raiz do projeto
-# REQUISICOES_JSON = os.path.join(PROJECT_ROOT, "requisicoes.json")
-# ESTOQUE_ALMOX_JSON = os.path.join(PROJECT_ROOT, "almoxarifado.json")
-# ESTOQUE_SETOR_JSON = os.path.join(PROJECT_ROOT, "setor.json")
 
-REQUISICOES_JSON = os.path.join(SCRIPT_DIR, "requisicoes.json")
-ESTOQUE_ALMOX_JSON = os.path.join(SCRIPT_DIR, "almoxarifado.json")
-ESTOQUE_SETOR_JSON = os.path.join(SCRIPT_DIR, "setor.json")
+REQUEST_COLUMNS = [
+    ("ID", lambda req: str(req["id"])),
+    ("Itens", items_text),
+    ("Quantidade", total_quantity),
+    ("Status", lambda req: req["status"]),
+]
+
 
 class MovementWindow(QDialog):
     def __init__(self, parent=None, role=None):
@@ -39,28 +49,29 @@ class MovementWindow(QDialog):
     def setup_ui(self):
         layout = QVBoxLayout(self)
 
-        # Table for requests
-        self.requests_table = QTableWidget()
-        self.requests_table.setColumnCount(4)
-        headers = ["ID", "Itens", "Quantidade", "Status"]
-        self.requests_table.setHorizontalHeaderLabels(headers)
+        # Table for requests (pages are fetched as the user scrolls)
+        self.selected_requests = []
+        self.requests_model = RequestListModel(REQUEST_COLUMNS, self)
+        self.requests_table = QTableView()
+        self.requests_table.setModel(self.requests_model)
         self.requests_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # type: ignore
         self.requests_table.setSelectionBehavior(QAbstractItemView.SelectRows)  # type: ignore
-        self.requests_table.setSelectionMode(QAbstractItemView.SingleSelection)  # type: ignore
-        self.requests_table.setEditTriggers(QTableWidget.NoEditTriggers)  # type: ignore
-        self.requests_table.itemSelectionChanged.connect(self.update_buttons)
+        # Several requests can be sent/received in one batch (Ctrl/Shift + click)
+        self.requests_table.setSelectionMode(QAbstractItemView.ExtendedSelection)  # type: ignore
+        self.requests_table.setEditTriggers(QAbstractItemView.NoEditTriggers)  # type: ignore
+        self.requests_table.selectionModel().selectionChanged.connect(lambda *_: self.update_buttons())
         layout.addWidget(self.requests_table)
 
         # Buttons
         btn_layout = QHBoxLayout()
 
         self.send_button = QPushButton("Enviar Requisição")
-        self.send_button.clicked.connect(self.send_request)
+        self.send_button.clicked.connect(self.send_requests)
         self.send_button.setEnabled(False)
         btn_layout.addWidget(self.send_button)
 
         self.receive_button = QPushButton("Receber Requisição")
-        self.receive_button.clicked.connect(self.receive_request)
+        self.receive_button.clicked.connect(self.receive_requests)
         self.receive_button.setEnabled(False)
         btn_layout.addWidget(self.receive_button)
 
@@ -74,164 +85,188 @@ class MovementWindow(QDialog):
         self.status_label = QLabel("Selecione uma requisição para movimentar")
         layout.addWidget(self.status_label)
 
-        # Load requests
+        # Load requests in the background (the dialog opens right away)
+        self.tasks = TaskRunner(self, busy_widget=self)
         self.load_requests()
 
     def load_requests(self):
-        try:
-            with open(REQUISICOES_JSON, "r", encoding="utf-8") as f:
-                self.requests = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.requests = []
-            return
-
         # Filter requests based on role
         if self.role == 3:  # Buyer - can send "Comprada" requests
-            filtered_requests = [req for req in self.requests if req.get("status") == "Comprada"]
+            statuses = ("Comprada",)
         elif self.role in (1, 2):  # Employee/Manager - can receive "Enviada" requests
-            filtered_requests = [req for req in self.requests if req.get("status") == "Enviada"]
+            statuses = ("Enviada",)
         else:  # Admin - can see both
-            filtered_requests = [req for req in self.requests if req.get("status") in ("Comprada", "Enviada")]
-
-        self.requests_table.setRowCount(len(filtered_requests))
-
-        for row, req in enumerate(filtered_requests):
-            self.requests_table.setItem(row, 0, QTableWidgetItem(str(req["id"])))
-
-            # Format items list
-            items_text = "\n".join([f"{item['item']} ({item['quantidade']})" for item in req["itens"]])
-            self.requests_table.setItem(row, 1, QTableWidgetItem(items_text))
-
-            # Total quantity
-            total_qty = sum(item["quantidade"] for item in req["itens"])
-            self.requests_table.setItem(row, 2, QTableWidgetItem(str(total_qty)))
-
-            # Status
-            self.requests_table.setItem(row, 3, QTableWidgetItem(req["status"]))
+            statuses = ("Comprada", "Enviada")
+
+        def load():
+            # Status index: only the matching requests are visited
+            try:
+                return get_store().requests_with_status(*statuses)
+            except json.JSONDecodeError:
+                return None
+
+        self.tasks.run(
+            "requests", load, self.show_requests,
+            lambda e: QMessageBox.warning(self, "Erro", f"Falha ao carregar requisições: {str(e)}")
+        )
+
+    def show_requests(self, requests):
+        if requests is None:
+            return
+        # Rows and their item lists are only built when they become visible
+        self.requests_model.set_requests(requests)
+        self.update_buttons()
 
     # ADDED MISSING FUNCTION
     def update_buttons(self):
-        """Update button states based on selected request"""
-        selected_row = self.requests_table.currentRow()
-        if selected_row < 0:
+        """Update button states based on the selected requests"""
+        rows = sorted(index.row() for index in self.requests_table.selectionModel().selectedRows())
+        requests = [req for req in (self.requests_model.request(row) for row in rows) if req]
+        # Editable copies of the selected requests only (the list is shared with the store)
+        self.selected_requests = copy.deepcopy(requests)
+        if not requests:
             self.send_button.setEnabled(False)
             self.receive_button.setEnabled(False)
             self.status_label.setText("Selecione uma requisição para movimentar")
             return
 
-        status = self.requests_table.item(selected_row, 3).text()
-        self.selected_id = int(self.requests_table.item(selected_row, 0).text())
-
         # Enable buttons based on status and role
-        can_send = status == "Comprada" and self.role in (0, 3)  # Admin or Buyer
-        can_receive = status == "Enviada" and self.role in (0, 1, 2)  # Admin, Employee or Manager
+        can_send = self.role in (0, 3) and any(r["status"] == "Comprada" for r in requests)  # Admin or Buyer
+        can_receive = (self.role in (0, 1, 2)  # Admin, Employee or Manager
+                       and any(r["status"] == "Enviada" for r in requests))
 
         self.send_button.setEnabled(can_send)
         self.receive_button.setEnabled(can_receive)
 
-        self.status_label.setText(f"Requisição {self.selected_id} selecionada - Status: {status}")
-
-    def send_request(self):
-        """Send request from warehouse to sector"""
-        # Find the request
-        request = next((req for req in self.requests if req["id"] == self.selected_id), None)
-        if not request:
+        if len(requests) == 1:
+            self.status_label.setText(
+                f"Requisição {requests[0]['id']} selecionada - Status: {requests[0]['status']}")
+        else:
+            self.status_label.setText(f"{len(requests)} requisições selecionadas")
+
+    def send_requests(self):
+        """Send the selected "Comprada" requests from warehouse to sector"""
+        self.move_requests("Comprada", "Enviada", "out", "enviada(s)")
+
+    def receive_requests(self):
+        """Receive the selected "Enviada" requests in the sector"""
+        self.move_requests("Enviada", "Finalizada", "in", "recebida(s)")
+
+    def move_requests(self, status, new_status, direction, done_text):
+        """Validate the whole batch up front, then write it in a single transaction.
+
+        Requests that cannot be moved (not enough stock, changed by another
+        user) are left out and reported one by one; the others are still moved.
+        The warehouse balance is checked again inside the commit; if another
+        workstation used it meanwhile, the batch is validated again.
+        """
+        batch = [req for req in self.selected_requests if req["status"] == status]
+        if not batch:
             QMessageBox.warning(self, "Erro", "Requisição não encontrada!")
             return
 
-        # Update stock
-        if not self.update_stocks(request, direction="out"):
+        conflicts = {}  # request id -> reason
+        failures = {}
+        moved = 0
+        stock_retries = 0
+        try:
+            store = get_store()
+            while batch:
+                # Build all movements against one stock snapshot (nothing is written yet)
+                warehouse_stock = store.stock_table(ESTOQUE_ALMOX_JSON) if direction == "out" else None
+                pending = {}  # quantities already taken by earlier requests of this batch
+                events, valid = [], []
+                failures = dict(conflicts)
+                for request in sorted(batch, key=lambda req: req["id"]):
+                    request_events, error = stock_movements(request, direction, warehouse_stock, pending)
+                    if error:
+                        failures[request["id"]] = error
+                    else:
+                        events.extend(request_events)
+                        valid.append(request)
+
+                try:
+                    self.commit_movements(valid, new_status, events)
+                    moved = len(valid)
+                    break
+                except InsufficientStockError:
+                    # The snapshot was stale: rebuild the movements from the current stock
+                    stock_retries += 1
+                    if stock_retries > MAX_STOCK_RETRIES:
+                        raise
+                    store.invalidate()
+                except ConflictError as e:
+                    # Drop the requests changed by another user and retry the rest
+                    if not set(e.keys) & {req["id"] for req in valid}:
+                        raise
+                    for req_id in e.keys:
+                        conflicts[req_id] = "movimentada por outro usuário"
+                    batch = [req for req in batch if req["id"] not in conflicts]
+                    store.invalidate()
+        except Exception as e:
+            QMessageBox.critical(self, "Erro", f"Falha ao salvar movimentação: {str(e)}")
+            self.load_requests()
             return
 
-        # Update request status
-        request["status"] = "Enviada"
-        self.save_requests()
-
-        QMessageBox.information(self, "Sucesso", "Requisição enviada com sucesso!")
+        if failures:
+            details = "\n".join(f"Requisição {req_id}: {reason}"
+                                 for req_id, reason in sorted(failures.items()))
+            QMessageBox.warning(self, "Movimentação parcial",
+                                f"{moved} requisição(ões) {done_text}.\n"
+                                f"Não movimentadas:\n{details}")
+        else:
+            QMessageBox.information(self, "Sucesso", f"{moved} requisição(ões) {done_text} com sucesso!")
+        # A single reload for the whole batch
         self.load_requests()
 
-    def receive_request(self):
-        """Receive request in sector"""
-        # Find the request
-        request = next((req for req in self.requests if req["id"] == self.selected_id), None)
-        if not request:
-            QMessageBox.warning(self, "Erro", "Requisição não encontrada!")
+    def commit_movements(self, requests, new_status, events):
+        """Append stock movements and save the new request statuses in one transaction"""
+        if not requests:
             return
-
-        # Update stock
-        if not self.update_stocks(request, direction="in"):
-            return
-
-        # Update request status
-        request["status"] = "Finalizada"
-        self.save_requests()
-
-        QMessageBox.information(self, "Sucesso", "Requisição recebida com sucesso!")
-        self.load_requests()
-
-    def update_stocks(self, request, direction):
-        """Update warehouse and sector stocks"""
-        try:
-            # Load warehouse stock
-            with open(ESTOQUE_ALMOX_JSON, "r", encoding="utf-8") as f:
-                warehouse_stock = json.load(f)
-
-            # Load sector stock
-            with open(ESTOQUE_SETOR_JSON, "r", encoding="utf-8") as f:
-                sector_stock = json.load(f)
-
-            # Process each item
-            for item in request["itens"]:
-                item_name = item["item"]
-                qty = item["quantidade"]
-
-                if direction == "out":  # Sending from warehouse to sector
-                    # Update warehouse stock
-                    warehouse_item = next((i for i in warehouse_stock if i["item"] == item_name), None)
-                    if not warehouse_item or warehouse_item["quantidade"] < qty:
-                        QMessageBox.warning(self, "Erro",
-                                            f"Estoque insuficiente de {item_name} no almoxarifado!")
-                        return False
-                    warehouse_item["quantidade"] -= qty
-                    warehouse_item["valor_total"] = warehouse_item["quantidade"] * warehouse_item["valor_unitario"]
-
-                    # Update sector stock
-                    sector_item = next((i for i in sector_stock if i["item"] == item_name), None)
-                    if not sector_item:
-                        sector_stock.append({
-                            "item": item_name,
-                            "quantidade": qty,
-                            "valor_unitario": warehouse_item["valor_unitario"],
-                            "valor_total": qty * warehouse_item["valor_unitario"]
-                        })
-                    else:
-                        sector_item["quantidade"] += qty
-                        sector_item["valor_total"] = sector_item["quantidade"] * sector_item["valor_unitario"]
-
-                else:  # Receiving in sector (already sent, so just confirm)
-                    # Stock was already added during sending, no need to change
-                    pass
-
-            # Save updated stocks
-            with open(ESTOQUE_ALMOX_JSON, "w", encoding="utf-8") as f:
-                json.dump(warehouse_stock, f, indent=4, ensure_ascii=False)
-
-            with open(ESTOQUE_SETOR_JSON, "w", encoding="utf-8") as f:
-                json.dump(sector_stock, f, indent=4, ensure_ascii=False)
-
-            return True
-
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", f"Falha ao atualizar estoques: {str(e)}")
-            return False
-
-    def save_requests(self):
-        """Save updated requests"""
-        try:
-            with open(REQUISICOES_JSON, "w", encoding="utf-8") as f:
-                json.dump(self.requests, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", f"Falha ao salvar requisições: {str(e)}")
+        updated = [dict(request, status=new_status) for request in requests]
+        with get_store().transaction() as tx:
+            tx.record_movements(events)
+            # Warehouse debits are re-checked against the locked ledger
+            tx.require_stock(events)
+            # Only these requests are merged back (version-checked against the file)
+            tx.save_records(REQUISICOES_JSON, updated)
+
+
+def stock_movements(request, direction, warehouse_stock, pending):
+    """Warehouse/sector stock movements for a request, as (events, error message).
+
+    ``pending`` holds the quantities already taken from the warehouse by
+    earlier requests of the same batch; it is only updated when the whole
+    request fits in the remaining stock.
+    """
+    events = []
+    if direction == "out":  # Sending from warehouse to sector
+        taken = {}
+        for item in request["itens"]:
+            item_name = item["item"]
+            qty = item["quantidade"]
+
+            # Validate warehouse stock
+            warehouse_item = warehouse_stock.get(item_name)
+            already_taken = pending.get(item_name, 0) + taken.get(item_name, 0)
+            if not warehouse_item or warehouse_item["quantidade"] - already_taken < qty:
+                return None, f"estoque insuficiente de {item_name} no almoxarifado"
+            taken[item_name] = taken.get(item_name, 0) + qty
+
+            # Debit warehouse, credit sector (new sector items take the warehouse price)
+            unit_value = warehouse_item["valor_unitario"]
+            events.append(new_event(ENVIO, ESTOQUE_ALMOX_JSON, item_name, -qty,
+                                    valor_unitario=unit_value, requisicao=request["id"]))
+            events.append(new_event(ENVIO, ESTOQUE_SETOR_JSON, item_name, qty,
+                                    valor_unitario=unit_value, requisicao=request["id"]))
+        for item_name, qty in taken.items():
+            pending[item_name] = pending.get(item_name, 0) + qty
+
+    else:  # Receiving in sector (already sent, so just record it in the history)
+        for item in request["itens"]:
+            events.append(new_event(RECEBIMENTO, ESTOQUE_SETOR_JSON, item["item"],
+                                    item["quantidade"], requisicao=request["id"]))
+    return events, None
 
 
 if __name__ == "__main__":
@@ -5,26 +5,11 @@ from PySide6.QtWidgets import (
     QFrame, QScrollArea, QSizePolicy
 )
 from PySide6.QtGui import QTextDocument
-from PySide6.QtPrintSupport import QPrinter, QPrintDialog
 from PySide6.QtCore import Qt
-import json
-import os
-import sys
 from datetime import datetime
 
-# Obter diretório do script
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-# Diretório raiz do projeto (sobe um nível a partir do script)
-# PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-
-# REQUISICOES_JSON = os.path.join(PROJECT_ROOT, "requisicoes.json")
-# USERS_JSON = os.path.join(PROJECT_ROOT, "users.json")
-
-REQUISICOES_JSON = os.path.join(SCRIPT_DIR, "requisicoes.json")
-USERS_JSON = os.path.join(SCRIPT_DIR, "users.json")
+from storage.json_store import get_store, REQUISICOES_JSON, USERS_JSON
+from views.workers import TaskRunner
 
 
 class ReportWindow(QDialog):
@@ -32,6 +17,7 @@ class ReportWindow(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Gerar Relatório")
         self.setFixedSize(500, 350)  # Tamanho reduzido sem a pré-visualização
+        self.tasks = TaskRunner(self, busy_widget=self)
         self.setup_ui()
 
     def setup_ui(self):
@@ -76,6 +62,8 @@ class ReportWindow(QDialog):
         btn_layout = QHBoxLayout()
         generate_btn = QPushButton("Gerar Relatório")
         generate_btn.clicked.connect(self.generate_report)
+        # Desabilitado enquanto o relatório é montado em segundo plano
+        self.tasks.busy_changed.connect(lambda busy: generate_btn.setEnabled(not busy))
         close_btn = QPushButton("Fechar")
         close_btn.clicked.connect(self.close)
 
@@ -88,10 +76,8 @@ class ReportWindow(QDialog):
 
     def load_users(self):
         try:
-            with open(USERS_JSON, 'r', encoding='utf-8') as f:
-                users = json.load(f)
-                for user in users:
-                    self.user_combo.addItem(user['username'], user['username'])
+            for user in get_store().read(USERS_JSON):
+                self.user_combo.addItem(user['username'], user['username'])
         except Exception as e:
             print(f"Erro ao carregar usuários: {e}")
 
@@ -103,21 +89,22 @@ class ReportWindow(QDialog):
         )
         selected_user = self.user_combo.currentData()
 
-        # Carregar requisições
-        try:
-            with open(REQUISICOES_JSON, 'r', encoding='utf-8') as f:
-                requests = json.load(f)
-        except Exception as e:
-            print(f"Erro ao carregar requisições: {e}")
-            return
+        def build():
+            # Carregar requisições (com filtro, apenas as do status pelo índice)
+            if selected_status != "Todas":
+                requests = get_store().requests_with_status(selected_status)
+            else:
+                requests = get_store().read(REQUISICOES_JSON)
 
-        # Aplicar filtros
-        if selected_status != "Todas":
-            requests = [req for req in requests if req.get("status") == selected_status]
+            # Gerar relatório (apenas texto: pode ser montado fora da thread da interface)
+            return self.create_report_html(requests, selected_status, selected_user)
 
-        # Gerar relatório
-        report_html = self.create_report_html(requests, selected_status, selected_user)
+        self.tasks.run(
+            "report", build, self.show_report,
+            lambda e: print(f"Erro ao carregar requisições: {e}")
+        )
 
+    def show_report(self, report_html):
         # Abrir janela de visualização do relatório
         self.preview_window = ReportPreviewWindow(report_html, self)
         self.preview_window.show()
@@ -250,6 +237,9 @@ class ReportPreviewWindow(QDialog):
         layout.addWidget(scroll_area)
 
     def print_report(self, html_content):
+        # O suporte a impressão é pesado: carregado só na primeira impressão
+        from PySide6.QtPrintSupport import QPrinter, QPrintDialog
+
         printer = QPrinter(QPrinter.HighResolution)  # type: ignore
         printer.setPageSize(QPrinter.A4)  # type: ignore
         printer.setPageOrientation(QPrinter.Portrait)  # type: ignore
@@ -3,27 +3,22 @@
 from PySide6.QtWidgets import (
     QMainWindow, QApplication, QToolBar, QLineEdit, QTableWidget,
     QTableWidgetItem, QMessageBox, QGridLayout, QWidget, QLabel,
-    QPushButton, QVBoxLayout, QHeaderView
+    QPushButton, QVBoxLayout, QHeaderView, QListWidget, QListWidgetItem
 )
 from PySide6.QtGui import QAction
 from PySide6.QtCore import Qt, QEvent
 import sys
 import json
-import os
 
-# Diretório onde o script está
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+from storage.concurrency import ConflictError
+from storage.id_sequence import get_sequence
+from storage.item_codes import load_item_codes
+from storage.json_store import get_store, REQUISICOES_JSON, ESTOQUE_ALMOX_JSON
+from storage.request_search import RequestSearch, request_item_names
+from views.workers import TaskRunner
 
-# Diretório raiz do projeto (sobe um nível a partir do script)
-# PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-
-# Caminhos absolutos para os arquivos na raiz do projeto
-# REQUISICOES_JSON = os.path.join(PROJECT_ROOT, "requisicoes.json")
-
-REQUISICOES_JSON = os.path.join(SCRIPT_DIR, "requisicoes.json")
+# Resultados exibidos por busca (os mais relevantes)
+SEARCH_RESULT_LIMIT = 200
 
 
 class RequestWindow(QMainWindow):
@@ -35,9 +30,15 @@ class RequestWindow(QMainWindow):
 
         self.request_id = None
         self.current_state = "idle"
-        self.requests = self.load_requests()
+        self.requests = []
+        self.search_index = RequestSearch()
 
         self.id_input = QLineEdit()
+        self.search_input = QLineEdit()
+        self.search_results = QListWidget()
+        self.scan_input = QLineEdit()
+        self.item_codes = None
+        self.scan_rows = {}  # item -> linha da tabela preenchida pela leitura
         self.status = QLineEdit()
         self.table = QTableWidget(0, 2)
         self.approve_button = QPushButton("Aprovar Requisição")
@@ -46,6 +47,11 @@ class RequestWindow(QMainWindow):
         self.init_ui()
         self.installEventFilter(self)  # Instalar filtro de eventos
 
+        # O índice completo é montado uma vez, em segundo plano; depois cada
+        # gravação só atualiza a requisição salva
+        self.tasks = TaskRunner(self, busy_widget=self)
+        self.reload_requests()
+
     def init_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -70,6 +76,25 @@ class RequestWindow(QMainWindow):
 
         main_layout.addLayout(form_layout)
 
+        # Modo leitura: cada código lido soma 1 na quantidade do item
+        self.scan_input.setPlaceholderText("Leia o código de barras (Enter confirma)")
+        self.scan_input.returnPressed.connect(self.handle_scan)
+        self.scan_input.setVisible(False)
+        main_layout.addWidget(self.scan_input)
+
+        # Busca por itens, status e faixa de IDs
+        self.search_input.setPlaceholderText(
+            "Buscar requisições (ex.: caneta aprovada, 10-20, #15)")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.update_search_results)
+        main_layout.addWidget(self.search_input)
+
+        self.search_results.setMaximumHeight(150)
+        self.search_results.setVisible(False)
+        self.search_results.itemActivated.connect(self.open_search_result)
+        self.search_results.itemClicked.connect(self.open_search_result)
+        main_layout.addWidget(self.search_results)
+
         # Tabela de itens
         self.table.setHorizontalHeaderLabels(["Item", "Quantidade"])  # Changed header
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch) # type: ignore
@@ -89,7 +114,7 @@ class RequestWindow(QMainWindow):
             ("Criar", self.new_request),
             ("Salvar", self.save_request),
             ("Pesquisar", self.perform_search),
-            ("Limpar", self.clear_interface),
+            ("Limpar", self.refresh_interface),
             ("Sair", self.close)
         ]
 
@@ -98,11 +123,16 @@ class RequestWindow(QMainWindow):
             action.triggered.connect(slot)
             self.toolbar.addAction(action)
 
+        self.scan_action = QAction("Leitura", self)
+        self.scan_action.setCheckable(True)
+        self.scan_action.toggled.connect(self.toggle_scan_mode)
+        self.toolbar.addAction(self.scan_action)
+
     def eventFilter(self, obj, event):
         """Captura eventos de teclado para adicionar/remover linhas"""
         if event.type() == QEvent.KeyPress: # type: ignore
-            # Enter adiciona nova linha
-            if event.key() in (Qt.Key_Return, Qt.Key_Enter): # type: ignore
+            # Enter adiciona nova linha (no modo leitura ele só confirma o código)
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter) and not self.scan_input.hasFocus(): # type: ignore
                 self.add_row()
                 return True
             # Ctrl+Delete remove linha
@@ -113,10 +143,14 @@ class RequestWindow(QMainWindow):
 
     def new_request(self):
         """Inicia a criação de uma nova requisição"""
+        request_id = self.get_new_id()
+        if request_id is None:
+            return
         self.current_state = "creating"
         self.table.setRowCount(0)
+        self.scan_rows = {}
         self.table.setEditTriggers(QTableWidget.AllEditTriggers) # type: ignore
-        self.request_id = self.get_new_id()
+        self.request_id = request_id
         self.id_input.setText(str(self.request_id))
         self.id_input.setReadOnly(True)
         self.status.setText("Pendente")
@@ -131,6 +165,74 @@ class RequestWindow(QMainWindow):
         # Focar na célula do nome da nova linha
         self.table.setCurrentCell(row, 0)
 
+    def toggle_scan_mode(self, enabled):
+        self.scan_input.setVisible(enabled)
+        if not enabled:
+            return
+        # O catálogo é carregado uma vez por ativação; a leitura só consulta o índice
+        try:
+            self.item_codes = load_item_codes(ESTOQUE_ALMOX_JSON)
+        except Exception as e:
+            QMessageBox.warning(self, "Erro", f"Falha ao carregar os códigos dos itens: {str(e)}")
+            self.scan_action.setChecked(False)
+            return
+        if self.current_state == "idle":
+            self.new_request()
+        self.scan_input.setFocus()
+
+    def handle_scan(self):
+        """Soma 1 na quantidade do item lido, sem diálogos (o leitor não espera)"""
+        code = self.scan_input.text()
+        self.scan_input.clear()
+        if not code.strip():
+            return
+        if self.current_state != "creating":
+            self.statusBar().showMessage("Crie uma requisição antes de ler os itens", 3000)
+            return
+
+        item = self.item_codes.resolve(code) if self.item_codes is not None else None
+        if item is None:
+            QApplication.beep()
+            self.statusBar().showMessage(f"Código {code.strip()} não encontrado", 3000)
+            return
+
+        row = self.scan_row(item)
+        qtd_item = self.table.item(row, 1)
+        try:
+            quantity = int(qtd_item.text()) + 1
+        except ValueError:
+            quantity = 1
+        # Só a célula da quantidade muda: a tabela não é refeita a cada leitura
+        qtd_item.setText(str(quantity))
+        self.statusBar().showMessage(f"{item}: {quantity}", 3000)
+
+    def scan_row(self, item):
+        """Linha do item na tabela, criada (ou reaproveitada, se vazia) na primeira leitura"""
+        row = self.scan_rows.get(item)
+        name_item = self.table.item(row, 0) if row is not None else None
+        if name_item is not None and name_item.text() == item:
+            return row
+
+        # A tabela foi editada à mão: procura o item ou uma linha vazia no fim
+        self.scan_rows = {}
+        for pos in range(self.table.rowCount()):
+            cell = self.table.item(pos, 0)
+            if cell is not None and cell.text().strip():
+                self.scan_rows.setdefault(cell.text().strip(), pos)
+        if item in self.scan_rows:
+            return self.scan_rows[item]
+
+        row = self.table.rowCount() - 1
+        last = self.table.item(row, 0) if row >= 0 else None
+        if last is None or last.text().strip():
+            row += 1
+            self.table.insertRow(row)
+        self.table.setItem(row, 0, QTableWidgetItem(item))
+        self.table.setItem(row, 1, QTableWidgetItem("0"))
+        self.table.scrollToItem(self.table.item(row, 0))
+        self.scan_rows[item] = row
+        return row
+
     def remove_row(self):
         """Remove a linha selecionada da tabela"""
         current_row = self.table.currentRow()
@@ -141,7 +243,7 @@ class RequestWindow(QMainWindow):
     def save_request(self):
         if not self.request_id:
             QMessageBox.warning(self, "Erro", "ID inválido.")
-            return
+            return False
 
         itens = []
         for row in range(self.table.rowCount()):
@@ -150,35 +252,43 @@ class RequestWindow(QMainWindow):
             if name and qtd:
                 if not name.text().strip():
                     QMessageBox.warning(self, "Erro", f"Item vazio na linha {row + 1}.")  # Changed text
-                    return
+                    return False
                 try:
                     qtd_value = int(qtd.text())
                 except ValueError:
                     QMessageBox.warning(self, "Erro", f"Quantidade inválida na linha {row + 1}.")
-                    return
+                    return False
                 # Changed key to "item" for standardization
                 itens.append({"item": name.text(), "quantidade": qtd_value})
 
+        existing = self.search_index.get(self.request_id)
         new_request = {
             "id": self.request_id,
             "itens": itens,
-            "status": self.status.text()
+            "status": self.status.text(),
+            # Versão carregada, conferida no momento da gravação
+            "versao": existing.get("versao", 0) if existing else 0
         }
 
-        existing_index = -1
-        for i, req in enumerate(self.requests):
-            if req["id"] == self.request_id:
-                existing_index = i
-                break
-
-        if existing_index >= 0:
-            self.requests[existing_index] = new_request
+        # Grava apenas esta requisição, sem sobrescrever as dos outros usuários
+        try:
+            get_store().save_records(REQUISICOES_JSON, [new_request])
+        except ConflictError:
+            QMessageBox.warning(self, "Conflito",
+                                f"A requisição {self.request_id} foi alterada por outro usuário. "
+                                "Os dados foram recarregados; repita a operação.")
+            self.refresh_interface()
+            return False
+
+        if self.tasks.is_busy():
+            # A carga em andamento pode ter lido o arquivo antes desta gravação
+            self.reload_requests()
         else:
-            self.requests.append(new_request)
-
-        self.save_requests()
+            # save_records já incrementou a versão: o índice fica igual ao arquivo
+            self.search_index.update(new_request)
         QMessageBox.information(self, "Sucesso", "Requisição salva com sucesso.")
         self.clear_interface()
+        return True
 
     def approve_request(self):
         """Aprova a requisição atual (apenas para Gerente do Setor)"""
@@ -188,9 +298,9 @@ class RequestWindow(QMainWindow):
             return
 
         self.status.setText("Aprovada")
-        self.save_request()
-        QMessageBox.information(self, "Aprovação",
-                                "Requisição aprovada com sucesso!")
+        if self.save_request():
+            QMessageBox.information(self, "Aprovação",
+                                    "Requisição aprovada com sucesso!")
 
     def repprove_request(self):
         """Reprova a requisição atual (apenas para Gerente do Setor)"""
@@ -200,34 +310,60 @@ class RequestWindow(QMainWindow):
             return
 
         self.status.setText("Reprovada")
-        self.save_request()
-        QMessageBox.information(self, "Reprovação",
+        if self.save_request():
+            QMessageBox.information(self, "Reprovação",
                                     "Requisição reprovada com sucesso!")
 
     def get_new_id(self):
-        if not self.requests:
-            return 1
-        return max(r["id"] for r in self.requests) + 1
+        """Próximo ID da sequência persistida (nunca repetido entre estações)"""
+        try:
+            return get_sequence(REQUISICOES_JSON).next_id()
+        except Exception as e:
+            QMessageBox.critical(self, "Erro", f"Falha ao gerar o ID da requisição: {str(e)}")
+            return None
 
     def perform_search(self):
-        """Executa a busca usando o ID digitado no campo id_input"""
-        text = self.id_input.text().strip()
+        """Abre a requisição do ID digitado ou busca o texto digitado"""
+        text = self.id_input.text().strip() or self.search_input.text().strip()
         if not text:
-            QMessageBox.warning(self, "Campo vazio", "Digite um ID para buscar")
+            QMessageBox.warning(self, "Campo vazio", "Digite um ID ou um termo para buscar")
             return
 
         try:
             req_id = int(text)
-            self.search_request(req_id)
         except ValueError:
-            QMessageBox.warning(self, "ID inválido", "O ID deve ser um número inteiro")
+            # Texto livre: mostra os resultados da busca
+            self.search_input.setText(text)
+            self.search_input.setFocus()
+            return
+        self.search_request(req_id)
+
+    def update_search_results(self, text):
+        """Lista as requisições que atendem ao texto digitado (a cada tecla)"""
+        self.search_results.clear()
+        if not text.strip():
+            self.search_results.setVisible(False)
+            return
+
+        for request in self.search_index.search(text, limit=SEARCH_RESULT_LIMIT):
+            items = ", ".join(request_item_names(request))
+            entry = QListWidgetItem(f"#{request['id']} - {request.get('status', '')} - {items}")
+            entry.setData(Qt.UserRole, request["id"])  # type: ignore
+            self.search_results.addItem(entry)
+        if not self.search_results.count():
+            self.search_results.addItem("Nenhuma requisição encontrada")
+        self.search_results.setVisible(True)
+
+    def open_search_result(self, entry):
+        req_id = entry.data(Qt.UserRole)  # type: ignore
+        if req_id is not None and self.current_state != "creating":
+            self.search_request(req_id)
 
     def search_request(self, req_id):
-        found_request = None
-        for request in self.requests:
-            if request["id"] == req_id:
-                found_request = request
-                break
+        if self.tasks.is_busy():
+            self.statusBar().showMessage("Carregando requisições, aguarde...", 3000)
+            return
+        found_request = self.search_index.get(req_id)
 
         if not found_request:
             QMessageBox.information(self, "Requisição não encontrada!",
@@ -265,30 +401,45 @@ class RequestWindow(QMainWindow):
         self.status.clear()
         self.table.setRowCount(0)
         self.table.setEditTriggers(QTableWidget.NoEditTriggers) # type: ignore
+        self.scan_rows = {}
         self.current_state = "idle"
-        self.requests = self.load_requests()
+        self.update_search_results(self.search_input.text())
+
+    def refresh_interface(self):
+        """Reseta a interface e recarrega as requisições (inclusive as de outras estações)"""
+        self.clear_interface()
+        self.reload_requests()
+
+    def reload_requests(self):
+        """Recarrega as requisições e refaz o índice de busca em segundo plano"""
+        def load():
+            requests = self.load_requests()
+            return requests, RequestSearch(requests)
+
+        self.tasks.run(
+            "requests", load, self.show_requests,
+            lambda e: QMessageBox.warning(self, "Erro", f"Falha ao carregar requisições: {str(e)}")
+        )
+
+    def show_requests(self, result):
+        self.requests, self.search_index = result
+        self.update_search_results(self.search_input.text())
 
     def load_requests(self):
         """Carrega requisições do arquivo, cria se não existir"""
-        if not os.path.exists(REQUISICOES_JSON):
-            with open(REQUISICOES_JSON, "w", encoding="utf-8") as f:
-                json.dump([], f, indent=4, ensure_ascii=False)
+        store = get_store()
+        if not store.exists(REQUISICOES_JSON):
+            store.write(REQUISICOES_JSON, [])
             return []
 
         try:
-            with open(REQUISICOES_JSON, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return store.read_copy(REQUISICOES_JSON)
         except json.JSONDecodeError:
             return []
         except Exception as e:
             print(f"Erro ao carregar arquivo: {e}")
             return []
 
-    def save_requests(self):
-        """Salva as requisições no arquivo"""
-        with open(REQUISICOES_JSON, "w", encoding="utf-8") as f:
-            json.dump(self.requests, f, indent=4, ensure_ascii=False)
-
     def closeEvent(self, event):
         """Atualiza a lista de requisições ao fechar a janela"""
         self.requests = self.load_requests()
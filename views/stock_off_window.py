@@ -1,49 +1,49 @@
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem,
+    QDialog, QVBoxLayout, QTableView, QLineEdit,
     QHeaderView, QAbstractItemView, QPushButton, QMessageBox,
-    QInputDialog, QHBoxLayout, QLabel
+    QInputDialog, QHBoxLayout, QLabel, QApplication
 )
-from PySide6.QtCore import Qt
-import json, sys, os, locale
-
-# Configure Brazilian locale for currency formatting
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except locale.Error:
-    locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil.1252')  # Fallback for Windows
-
-
-# Helper function to format currency
-def format_currency(value):
-    """Formata um valor como moeda brasileira"""
-    try:
-        # Se o valor já é string, converte para float
-        if isinstance(value, str):
-            # Remove símbolos e formatação existente
-            value = value.replace('R$', '').replace('.', '').replace(',', '.').strip()
-            value = float(value)
-        return locale.currency(value, grouping=True, symbol=True)
-    except (TypeError, ValueError):
-        # Fallback para formatação manual
+import json
+
+from storage.concurrency import InsufficientStockError
+from storage.item_codes import load_item_codes
+from storage.json_store import get_store, ESTOQUE_SETOR_JSON
+from storage.ledger import new_event, BAIXA
+from storage.text_index import normalize
+from views.money import format_currency
+from views.table_models import StockOffModel
+
+
+def parse_write_off_list(text, stock):
+    """Lê uma lista "item;quantidade" (uma por linha) e confere cada item no estoque.
+
+    Aceita ``;`` ou tabulação (colagem de planilha) como separador. O nome
+    é procurado primeiro exatamente e depois sem acentos/maiúsculas. Devolve
+    ({item: quantidade somada}, [mensagens de erro por linha]).
+    """
+    by_name = {normalize(record["item"]): record["item"] for record in stock}
+    quantities, errors = {}, []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        name, sep, qty_text = line.replace("\t", ";").rpartition(";")
+        name = name.strip()
         try:
-            value = float(value)
-            return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        except:
-            return "R$ 0,00"
+            qty = int(qty_text.strip())
+        except ValueError:
+            qty = 0
+        if not sep or not name or qty < 1:
+            errors.append(f"Linha {number}: use o formato item;quantidade (\"{line}\")")
+            continue
+        item = name if name in stock else by_name.get(normalize(name))
+        if item is None:
+            errors.append(f"Linha {number}: item \"{name}\" não existe no estoque")
+            continue
+        quantities[item] = quantities.get(item, 0) + qty
+    return quantities, errors
 
 
-# Obter o diretório do script
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# Diretório raiz do projeto (sobe um nível a partir do script)
-# PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-# ESTOQUE_SETOR_JSON = os.path.join(PROJECT_ROOT, "setor.json")
-
-ESTOQUE_SETOR_JSON = os.path.join(SCRIPT_DIR, "setor.json")
-
 class StockOffWindow(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -56,25 +56,59 @@ class StockOffWindow(QDialog):
         layout = QVBoxLayout(self)
 
         # Título
-        title = QLabel("Estoque do Setor - Selecione os itens para dar baixa")
+        title = QLabel("Estoque do Setor - Informe na coluna Baixar as quantidades a dar baixa")
         title.setStyleSheet("font-weight: bold; font-size: 14px;")
         layout.addWidget(title)
 
+        # Filtro por nome do item
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filtrar itens...")
+        self.filter_input.setClearButtonEnabled(True)
+        layout.addWidget(self.filter_input)
+
+        # Modo leitura: cada código lido soma 1 na coluna Baixar do item
+        scan_layout = QHBoxLayout()
+        self.scan_input = QLineEdit()
+        self.scan_input.setPlaceholderText("Leia o código de barras (Enter confirma)")
+        self.scan_input.returnPressed.connect(self.handle_scan)
+        self.scan_input.setVisible(False)
+        scan_layout.addWidget(self.scan_input)
+        self.scan_status = QLabel()
+        self.scan_status.setVisible(False)
+        scan_layout.addWidget(self.scan_status)
+        layout.addLayout(scan_layout)
+        self.item_codes = None
+
         # Tabela de estoque
-        self.stock_table = QTableWidget()
-        self.stock_table.setColumnCount(4)
-        headers = ["Item", "Quantidade", "Valor Unitário", "Valor Total"]
-        self.stock_table.setHorizontalHeaderLabels(headers)
+        self.stock_table = QTableView()
+        self.stock_model = StockOffModel(format_currency, self.stock_table)
+        self.stock_table.setModel(self.stock_model)
         self.stock_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # type: ignore
+        self.stock_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # type: ignore
         self.stock_table.setSelectionBehavior(QAbstractItemView.SelectRows)  # type: ignore
-        self.stock_table.setSelectionMode(QAbstractItemView.MultiSelection)  # type: ignore
-        self.stock_table.setEditTriggers(QTableWidget.NoEditTriggers)  # type: ignore
+        self.stock_table.setSelectionMode(QAbstractItemView.ExtendedSelection)  # type: ignore
+        # Só a coluna Baixar é editável: basta digitar a quantidade na linha
+        self.stock_table.setEditTriggers(QAbstractItemView.AllEditTriggers)  # type: ignore
         layout.addWidget(self.stock_table)
+        self.filter_input.textChanged.connect(self.stock_model.set_filter)
 
         # Botões
         btn_layout = QHBoxLayout()
 
-        self.stock_off_button = QPushButton("Dar Baixa nos Itens Selecionados")
+        self.scan_button = QPushButton("Modo Leitura")
+        self.scan_button.setCheckable(True)
+        self.scan_button.toggled.connect(self.toggle_scan_mode)
+        btn_layout.addWidget(self.scan_button)
+
+        paste_button = QPushButton("Colar Lista (item;quantidade)")
+        paste_button.clicked.connect(self.paste_write_off_list)
+        btn_layout.addWidget(paste_button)
+
+        clear_button = QPushButton("Limpar Quantidades")
+        clear_button.clicked.connect(self.stock_model.clear_write_offs)
+        btn_layout.addWidget(clear_button)
+
+        self.stock_off_button = QPushButton("Dar Baixa")
         self.stock_off_button.clicked.connect(self.perform_stock_off)
         btn_layout.addWidget(self.stock_off_button)
 
@@ -85,10 +119,9 @@ class StockOffWindow(QDialog):
         layout.addLayout(btn_layout)
 
     def load_stock(self):
-        """Carrega o estoque do setor do arquivo JSON"""
+        """Carrega o estoque do setor (ponto de controle + livro de movimentações)"""
         try:
-            with open(ESTOQUE_SETOR_JSON, 'r', encoding='utf-8') as f:
-                self.stock_data = json.load(f)
+            self.stock_data = get_store().stock(ESTOQUE_SETOR_JSON)
         except FileNotFoundError:
             self.stock_data = []
             QMessageBox.warning(self, "Erro", "Arquivo de estoque do setor não encontrado!")
@@ -98,111 +131,110 @@ class StockOffWindow(QDialog):
             QMessageBox.warning(self, "Erro", "Arquivo de estoque do setor está corrompido!")
             return
 
-        # Configurar tabela
-        self.stock_table.setRowCount(len(self.stock_data))
-
-        for row, item in enumerate(self.stock_data):
-            # Item
-            self.stock_table.setItem(row, 0, QTableWidgetItem(str(item.get('item', ''))))
-
-            # Quantidade
-            qtd = item.get('quantidade', 0)
-            self.stock_table.setItem(row, 1, QTableWidgetItem(str(qtd)))
-
-            # Valor Unitário (formatado como moeda)
-            unit_value = item.get('valor_unitario', 0.0)
-            unit_value_str = format_currency(unit_value)
-            unit_item = QTableWidgetItem(unit_value_str)
-            unit_item.setData(Qt.UserRole, unit_value)  # type: ignore
-            self.stock_table.setItem(row, 2, unit_item)
-
-            # Valor Total (formatado como moeda)
-            total_value = item.get('valor_total', 0.0)
-            # Se não existir, calcula: quantidade * valor unitário
-            if total_value == 0 and qtd != 0 and unit_value != 0:
-                total_value = qtd * unit_value
-            total_value_str = format_currency(total_value)
-            total_item = QTableWidgetItem(total_value_str)
-            total_item.setData(Qt.UserRole, total_value)  # type: ignore
-            self.stock_table.setItem(row, 3, total_item)
-
-    def perform_stock_off(self):
-        """Realiza a baixa nos itens selecionados"""
-        selected_rows = self.stock_table.selectionModel().selectedRows()
-        if not selected_rows:
-            QMessageBox.warning(self, "Nenhum item selecionado",
-                                "Selecione pelo menos um item para dar baixa.")
+        # Só as linhas cujo saldo mudou são atualizadas na tabela
+        self.stock_model.update_rows(self.stock_data)
+        self.item_codes = None  # Refeito na próxima leitura
+
+    def toggle_scan_mode(self, enabled):
+        self.scan_input.setVisible(enabled)
+        self.scan_status.setVisible(enabled)
+        if enabled:
+            self.scan_status.setText("")
+            self.scan_input.setFocus()
+
+    def handle_scan(self):
+        """Soma 1 na baixa do item lido, sem diálogos (o leitor não espera)"""
+        code = self.scan_input.text()
+        self.scan_input.clear()
+        if not code.strip():
             return
+        if self.item_codes is None:
+            self.item_codes = load_item_codes(ESTOQUE_SETOR_JSON)
 
-        items_to_update = []
-
-        for row_index in [row.row() for row in selected_rows]:
-            item_name = self.stock_table.item(row_index, 0).text()
-            current_qty = int(self.stock_table.item(row_index, 1).text())
-
-            # Obter quantidade a baixar
-            qty, ok = QInputDialog.getInt(
-                self,
-                f"Baixa de {item_name}",
-                f"Quantidade a baixar (disponível: {current_qty}):",
-                1,  # Valor padrão
-                1,  # Mínimo
-                current_qty,  # Máximo
-                1  # Step
-            )
-
-            if not ok:
-                continue  # Usuário cancelou
-
-            # Validar quantidade
-            if qty < 1:
-                QMessageBox.warning(self, "Valor inválido",
-                                    f"A quantidade para {item_name} deve ser pelo menos 1.")
-                continue
-
-            if qty > current_qty:
-                QMessageBox.warning(self, "Estoque insuficiente",
-                                    f"Quantidade solicitada ({qty}) maior que disponível ({current_qty}) para {item_name}.")
-                continue
+        item = self.item_codes.resolve(code)
+        if item is None:
+            QApplication.beep()
+            self.scan_status.setText(f"Código {code.strip()} não encontrado")
+            return
+        total = self.stock_model.add_write_off(item)
+        self.scan_status.setText(f"{item}: {total}")
+
+    def paste_write_off_list(self):
+        """Preenche a coluna Baixar a partir de uma lista colada"""
+        text, ok = QInputDialog.getMultiLineText(
+            self, "Colar lista", "Uma linha por item, no formato item;quantidade:"
+        )
+        if not ok or not text.strip():
+            return
 
-            items_to_update.append({
-                "row": row_index,
-                "name": item_name,
-                "qty_to_remove": qty,
-                "current_qty": current_qty
-            })
+        quantities, errors = parse_write_off_list(text, get_store().stock_table(ESTOQUE_SETOR_JSON))
+        if errors:
+            QMessageBox.warning(self, "Lista com erros",
+                                "As linhas abaixo foram ignoradas:\n" + "\n".join(errors))
+        merged = self.stock_model.write_offs()
+        for item, qty in quantities.items():
+            merged[item] = qty
+        self.stock_model.set_write_offs(merged)
 
-        if not items_to_update:
-            return  # Nenhum item atualizado
+    def perform_stock_off(self):
+        """Dá baixa de uma vez em todos os itens com quantidade na coluna Baixar"""
+        write_offs = self.stock_model.write_offs()
+        if not write_offs:
+            QMessageBox.warning(self, "Nenhum item informado",
+                                "Informe a quantidade a baixar na coluna Baixar ou cole uma lista.")
+            return
 
         # Atualizar estoque
-        self.update_stock(items_to_update)
+        if not self.update_stock(write_offs):
+            self.load_stock()
+            return
 
+        self.stock_model.clear_write_offs()
         QMessageBox.information(self, "Baixa realizada",
-                                "Baixa de estoque realizada com sucesso!")
-        self.load_stock()  # Recarregar tabela
-
-    def update_stock(self, items_to_update):
-        """Atualiza o estoque com as baixas solicitadas"""
-        # Atualizar os dados em memória
-        for item_info in items_to_update:
-            for stock_item in self.stock_data:
-                if stock_item["item"] == item_info["name"]:
-                    new_qty = stock_item["quantidade"] - item_info["qty_to_remove"]
-                    stock_item["quantidade"] = new_qty
-
-                    # Atualizar valor total
-                    if "valor_unitario" in stock_item:
-                        stock_item["valor_total"] = new_qty * stock_item["valor_unitario"]
-                    break
-
-        # Salvar no arquivo
+                                f"Baixa de {len(write_offs)} item(ns) realizada com sucesso!")
+        self.load_stock()  # Atualiza só as linhas alteradas
+
+    def update_stock(self, write_offs):
+        """Valida o lote inteiro numa passada e grava todas as baixas de uma vez"""
         try:
-            with open(ESTOQUE_SETOR_JSON, 'w', encoding='utf-8') as f:
-                json.dump(self.stock_data, f, indent=4, ensure_ascii=False)
+            store = get_store()
+            # Saldo atual indexado por item: cada linha é conferida em O(1)
+            stock = store.stock_table(ESTOQUE_SETOR_JSON)
+            errors = []
+            for item, qty in write_offs.items():
+                if item not in stock:
+                    errors.append(f"{item}: não existe mais no estoque")
+                    continue
+                available = stock.quantity(item)
+                if available < qty:
+                    errors.append(f"{item}: baixa de {qty}, saldo {available}")
+            if errors:
+                QMessageBox.warning(self, "Estoque insuficiente",
+                                    "Nenhuma baixa foi feita. Corrija os itens:\n" + "\n".join(errors))
+                return False
+
+            events = [
+                new_event(BAIXA, ESTOQUE_SETOR_JSON, item, -qty)
+                for item, qty in write_offs.items()
+            ]
+
+            # Registrar no livro de movimentações; o saldo é conferido de novo
+            # no commit, com o livro bloqueado (outra estação pode ter dado baixa)
+            with store.transaction() as tx:
+                tx.record_movements(events)
+                tx.require_stock(events)
+            return True
+        except InsufficientStockError as e:
+            errors = [f"{item}: baixa de {need}, saldo {have}"
+                      for item, (need, have) in e.shortages.items()]
+            QMessageBox.warning(self, "Estoque insuficiente",
+                                "O saldo mudou em outra estação. Nenhuma baixa foi feita:\n"
+                                + "\n".join(errors))
+            return False
         except Exception as e:
             QMessageBox.critical(self, "Erro ao salvar",
                                  f"Falha ao salvar estoque atualizado: {str(e)}")
+            return False
 
 
 if __name__ == "__main__":
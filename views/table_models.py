@@ -0,0 +1,496 @@
+# views\table_models.py
+
+import bisect
+import math
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+from PySide6.QtGui import QColor
+
+from storage.text_index import TextIndex
+from views.money import format_currency, parse_currency
+
+STOCK_HEADERS = ["Item", "Quantidade", "Valor Unitário", "Valor Total"]
+# Almoxarifado: saldo, reservado para requisições aprovadas e disponível
+RESERVED_STOCK_HEADERS = ["Item", "Quantidade", "Reservado", "Disponível",
+                          "Valor Unitário", "Valor Total"]
+
+
+def stock_total_value(row):
+    """Valor total do registro; se não existir, calcula quantidade * valor unitário"""
+    qtd = row.get('quantidade', 0)
+    unit_value = row.get('valor_unitario', 0.0)
+    total_value = row.get('valor_total', 0.0)
+    if total_value == 0 and qtd != 0 and unit_value != 0:
+        total_value = qtd * unit_value
+    return total_value
+
+
+def _runs(positions):
+    """Agrupa posições crescentes em intervalos contínuos (início, fim)"""
+    runs = []
+    for pos in positions:
+        if runs and runs[-1][1] == pos - 1:
+            runs[-1][1] = pos
+        else:
+            runs.append([pos, pos])
+    return runs
+
+
+class StockTableModel(QAbstractTableModel):
+    """Modelo somente leitura sobre os registros de um estoque.
+
+    Não cria nenhum objeto por célula: o texto é formatado em ``data()``,
+    chamado pela view apenas para as linhas visíveis. O modelo guarda uma
+    cópia leve (uma tupla por linha) do que está sendo exibido, usada por
+    ``update_snapshot`` para notificar a view só do que mudou, e um índice
+    de texto dos nomes (storage.text_index) para o filtro de ``set_filter``.
+
+    Com ``reservations``, exibe também as colunas Reservado e Disponível
+    (os snapshots devem ser montados com os níveis do estoque).
+    """
+
+    def __init__(self, format_currency, parent=None, reservations=False):
+        super().__init__(parent)
+        self._headers = RESERVED_STOCK_HEADERS if reservations else STOCK_HEADERS
+        # Colunas em reais: as duas últimas do snapshot
+        self._money_from = len(self._headers) - 2
+        self._rows = []        # (item, quantidade, [reservado, disponível,] valor unitário, valor total)
+        self._positions = {}   # item -> posição em _rows
+        self._index = TextIndex()
+        self._query = ""
+        self._visible = None   # posições exibidas quando há filtro
+        self._format_currency = format_currency
+
+    @staticmethod
+    def snapshot(rows, levels=None):
+        """Tuplas exibidas pelo modelo; pode ser montado fora da thread da interface.
+
+        ``levels`` (storage.reservation.StockLevels do mesmo estoque)
+        acrescenta as colunas de reserva.
+        """
+        if levels is None:
+            return [
+                (str(item.get('item', '')), item.get('quantidade', 0),
+                 item.get('valor_unitario', 0.0), stock_total_value(item))
+                for item in rows
+            ]
+        snapshot = []
+        for item in rows:
+            name = str(item.get('item', ''))
+            snapshot.append((name, item.get('quantidade', 0),
+                             levels.reserved(name), levels.available(name),
+                             item.get('valor_unitario', 0.0), stock_total_value(item)))
+        return snapshot
+
+    def set_rows(self, rows):
+        """Passa a exibir ``rows`` (lista de registros de estoque)"""
+        self.set_snapshot(self.snapshot(rows))
+
+    def set_snapshot(self, snapshot):
+        self.beginResetModel()
+        self._rows = snapshot
+        self._positions = {row[0]: pos for pos, row in enumerate(snapshot)}
+        self._index = TextIndex(self._positions)
+        self._visible = self._filtered_positions()
+        self.endResetModel()
+
+    def update_rows(self, rows):
+        self.update_snapshot(self.snapshot(rows))
+
+    def update_snapshot(self, new):
+        """Atualiza a exibição emitindo apenas remoções, inclusões e células alteradas.
+
+        Itens novos entram no fim do estoque; se a ordem dos itens existentes
+        mudou, o modelo é recarregado por inteiro. Com um filtro ativo, os
+        dados e o índice são atualizados do mesmo modo e o filtro é reaplicado.
+        """
+        old = self._rows
+        new_keys = {row[0] for row in new}
+
+        removed = [pos for pos, row in enumerate(old) if row[0] not in new_keys]
+        kept = [row[0] for row in old if row[0] in new_keys]
+        if [row[0] for row in new[:len(kept)]] != kept:
+            self.set_snapshot(new)
+            return
+
+        filtered = self._visible is not None
+        if filtered:
+            self.beginResetModel()
+
+        # Remoções, de baixo para cima para que as posições continuem válidas
+        for start, end in reversed(_runs(removed)):
+            for row in old[start:end + 1]:
+                self._index.remove(row[0])
+            if not filtered:
+                self.beginRemoveRows(QModelIndex(), start, end)
+            del old[start:end + 1]
+            if not filtered:
+                self.endRemoveRows()
+        if removed:
+            self._positions = {row[0]: pos for pos, row in enumerate(old)}
+
+        # Células alteradas
+        changed = [pos for pos, row in enumerate(old) if new[pos] != row]
+        for pos in changed:
+            old[pos] = new[pos]
+        if not filtered:
+            last_column = len(self._headers) - 1
+            for start, end in _runs(changed):
+                self.dataChanged.emit(self.index(start, 0), self.index(end, last_column))
+
+        # Inclusões no final
+        if len(new) > len(old):
+            if not filtered:
+                self.beginInsertRows(QModelIndex(), len(old), len(new) - 1)
+            for pos in range(len(old), len(new)):
+                self._positions[new[pos][0]] = pos
+                self._index.add(new[pos][0])
+            old.extend(new[len(old):])
+            if not filtered:
+                self.endInsertRows()
+
+        if filtered:
+            self._visible = self._filtered_positions()
+            self.endResetModel()
+
+    def set_filter(self, query):
+        """Exibe só os itens cujo nome atende a ``query`` (sem acentos/maiúsculas)"""
+        query = query.strip()
+        if query == self._query:
+            return
+        self.beginResetModel()
+        self._query = query
+        self._visible = self._filtered_positions()
+        self.endResetModel()
+
+    def _filtered_positions(self):
+        if not self._query:
+            return None
+        return sorted(self._positions[item] for item in self._index.search(self._query))
+
+    def view_row(self, item):
+        """Linha exibida do item (None se não existir ou estiver fora do filtro)"""
+        pos = self._positions.get(item)
+        if pos is None or self._visible is None:
+            return pos
+        row = bisect.bisect_left(self._visible, pos)
+        return row if row < len(self._visible) and self._visible[row] == pos else None
+
+    def row_values(self, row):
+        """Tupla do snapshot (item, quantidade, ...) da linha exibida ``row``"""
+        return self._rows[row if self._visible is None else self._visible[row]]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows) if self._visible is None else len(self._visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):  # type: ignore
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:  # type: ignore
+            return self._headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):  # type: ignore
+        if not index.isValid():
+            return None
+
+        value = self.row_values(index.row())[index.column()]
+        if role == Qt.DisplayRole:  # type: ignore
+            if index.column() >= self._money_from:
+                return self._format_currency(value)
+            return str(value)
+
+        if role == Qt.UserRole:  # type: ignore
+            # Valor numérico da célula (para ordenação e cálculos)
+            return value
+        return None
+
+
+class StockOffModel(StockTableModel):
+    """Estoque com a coluna editável "Baixar" (quantidade a dar baixa por item).
+
+    As quantidades ficam num dicionário item -> quantidade, que sobrevive a
+    filtros e recargas; ``write_offs()`` devolve o lote inteiro para ser
+    validado e gravado de uma vez.
+    """
+
+    def __init__(self, format_currency, parent=None):
+        super().__init__(format_currency, parent)
+        self._headers = STOCK_HEADERS + ["Baixar"]
+        self._write_off_column = len(STOCK_HEADERS)
+        self._write_offs = {}
+
+    def write_offs(self):
+        """{item: quantidade a baixar} dos itens com quantidade informada"""
+        return dict(self._write_offs)
+
+    def set_write_offs(self, quantities):
+        """Substitui as quantidades a baixar (ex.: lista colada) e atualiza a coluna"""
+        self._write_offs = {item: qty for item, qty in quantities.items() if qty > 0}
+        self._write_off_column_changed()
+
+    def clear_write_offs(self):
+        self._write_offs = {}
+        self._write_off_column_changed()
+
+    def add_write_off(self, item, qty=1):
+        """Soma ``qty`` à baixa do item e atualiza só a célula dele; devolve o novo total"""
+        total = self._write_offs.get(item, 0) + qty
+        self._write_offs[item] = total
+        row = self.view_row(item)
+        if row is not None:
+            index = self.index(row, self._write_off_column)
+            self.dataChanged.emit(index, index)
+        return total
+
+    def _write_off_column_changed(self):
+        if self.rowCount():
+            column = self._write_off_column
+            self.dataChanged.emit(self.index(0, column), self.index(self.rowCount() - 1, column))
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == self._write_off_column:
+            flags |= Qt.ItemIsEditable  # type: ignore
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):  # type: ignore
+        if not index.isValid() or index.column() != self._write_off_column:
+            return super().data(index, role)
+
+        item, on_hand = self.row_values(index.row())[:2]
+        qty = self._write_offs.get(item, 0)
+        if role == Qt.DisplayRole:  # type: ignore
+            return str(qty) if qty else ""
+        if role in (Qt.EditRole, Qt.UserRole):  # type: ignore
+            return qty
+        if role == Qt.BackgroundRole and qty > on_hand:  # type: ignore
+            return _STATUS_COLORS["Necessita compra"]  # acima do saldo
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):  # type: ignore
+        if (not index.isValid() or role != Qt.EditRole  # type: ignore
+                or index.column() != self._write_off_column):
+            return False
+        try:
+            qty = int(value) if value != "" else 0
+        except (TypeError, ValueError):
+            return False
+        if qty < 0:
+            return False
+
+        item = self.row_values(index.row())[0]
+        if qty:
+            self._write_offs[item] = qty
+        else:
+            self._write_offs.pop(item, None)
+        self.dataChanged.emit(index, index)
+        return True
+
+
+# Requisições entregues à view por vez, conforme a rolagem
+REQUEST_PAGE_SIZE = 100
+
+
+class RequestListModel(QAbstractTableModel):
+    """Lista de requisições exibida por páginas (canFetchMore/fetchMore).
+
+    A view pede mais linhas apenas quando a rolagem chega ao fim das já
+    entregues, e o texto de cada célula é montado em ``data()`` só para as
+    linhas visíveis. ``columns`` é uma lista de (cabeçalho, função que recebe
+    a requisição e devolve o texto).
+    """
+
+    def __init__(self, columns, parent=None):
+        super().__init__(parent)
+        self._columns = columns
+        self._requests = []
+        self._loaded = 0
+
+    def set_requests(self, requests):
+        self.beginResetModel()
+        self._requests = requests
+        self._loaded = min(REQUEST_PAGE_SIZE, len(requests))
+        self.endResetModel()
+
+    def request(self, row):
+        """Requisição exibida na linha ``row`` (None se inválida)"""
+        if 0 <= row < self._loaded:
+            return self._requests[row]
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._requests)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(REQUEST_PAGE_SIZE, len(self._requests) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):  # type: ignore
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:  # type: ignore
+            return self._columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):  # type: ignore
+        if not index.isValid() or role != Qt.DisplayRole:  # type: ignore
+            return None
+        return self._columns[index.column()][1](self._requests[index.row()])
+
+
+PURCHASE_HEADERS = [
+    "Item",
+    "Quantidade Solicitada",
+    "Estoque Almoxarifado",
+    "Quantidade Disponível",
+    "Quantidade a Comprar",
+    "Preço Unitário",
+    "Valor Total",
+    "Status"
+]
+PURCHASE_QTY_COLUMN = 4
+PURCHASE_PRICE_COLUMN = 5
+_PURCHASE_TOTAL_COLUMN = 6
+
+_STATUS_COLORS = {
+    "Em estoque": QColor(220, 255, 220),        # Verde claro
+    "Necessita compra": QColor(255, 220, 220),  # Vermelho claro
+}
+
+
+class PurchaseLineModel(QAbstractTableModel):
+    """Linhas de uma compra, editáveis na quantidade a comprar e no preço.
+
+    Quantidades e preços ficam guardados como números; o texto em reais só
+    é montado em ``data()``. O total da compra é mantido somando a diferença
+    de cada edição (O(1), sem percorrer as linhas) e anunciado por
+    ``total_changed``.
+    """
+
+    total_changed = Signal(float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # [item, solicitada, estoque, disponível, a comprar, preço unitário, status]
+        self._lines = []
+        self._total = 0.0
+
+    @staticmethod
+    def build_lines(items, stock, allocated=None):
+        """Linhas para ``items`` (registros item/quantidade) conforme o saldo em ``stock``.
+
+        ``allocated`` (item -> quantidade) é a parte do estoque destinada a
+        estes itens pela alocação entre as requisições (storage.allocation);
+        sem ela, todo o saldo é considerado disponível.
+        """
+        lines = []
+        for item in items:
+            name = item["item"]
+            requested = item["quantidade"]
+            record = stock.get(name) or {}
+            in_stock = record.get("quantidade", 0)
+            if allocated is None:
+                available = min(requested, in_stock)
+            else:
+                available = min(requested, allocated.get(name, 0))
+            to_buy = max(0, requested - available)
+            status = "Em estoque" if to_buy == 0 else "Necessita compra"
+            # float: com um preço inteiro o editor seria um QSpinBox, sem centavos
+            lines.append([name, requested, in_stock, available, to_buy,
+                          float(record.get("valor_unitario") or 0.0), status])
+        return lines
+
+    def set_lines(self, lines):
+        self.beginResetModel()
+        self._lines = lines
+        self._total = sum(line[PURCHASE_QTY_COLUMN] * line[PURCHASE_PRICE_COLUMN] for line in lines)
+        self.endResetModel()
+        self.total_changed.emit(self._total)
+
+    def total(self):
+        return self._total
+
+    def purchases(self):
+        """(item, quantidade a comprar, preço unitário) das linhas com compra"""
+        return [(line[0], line[PURCHASE_QTY_COLUMN], line[PURCHASE_PRICE_COLUMN])
+                for line in self._lines if line[PURCHASE_QTY_COLUMN] > 0]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(PURCHASE_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):  # type: ignore
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:  # type: ignore
+            return PURCHASE_HEADERS[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (PURCHASE_QTY_COLUMN, PURCHASE_PRICE_COLUMN):
+            flags |= Qt.ItemIsEditable  # type: ignore
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):  # type: ignore
+        if not index.isValid():
+            return None
+        line = self._lines[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:  # type: ignore
+            if column == PURCHASE_PRICE_COLUMN:
+                return format_currency(line[PURCHASE_PRICE_COLUMN])
+            if column == _PURCHASE_TOTAL_COLUMN:
+                return format_currency(line[PURCHASE_QTY_COLUMN] * line[PURCHASE_PRICE_COLUMN])
+            return str(line[column if column < _PURCHASE_TOTAL_COLUMN else column - 1])
+
+        if role == Qt.EditRole:  # type: ignore
+            # O editor recebe o número, e não o texto formatado
+            if column in (PURCHASE_QTY_COLUMN, PURCHASE_PRICE_COLUMN):
+                return line[column]
+            return None
+
+        if role == Qt.BackgroundRole and column == len(PURCHASE_HEADERS) - 1:  # type: ignore
+            return _STATUS_COLORS.get(line[-1])
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):  # type: ignore
+        if not index.isValid() or role != Qt.EditRole:  # type: ignore
+            return False
+        column = index.column()
+        try:
+            if column == PURCHASE_QTY_COLUMN:
+                value = int(value)
+            elif column == PURCHASE_PRICE_COLUMN:
+                value = parse_currency(value) if isinstance(value, str) else float(value)
+            else:
+                return False
+        except (TypeError, ValueError, OverflowError):
+            return False
+        if not math.isfinite(value) or value < 0:
+            return False
+
+        line = self._lines[index.row()]
+        old_total = line[PURCHASE_QTY_COLUMN] * line[PURCHASE_PRICE_COLUMN]
+        line[column] = value
+        self._total += line[PURCHASE_QTY_COLUMN] * line[PURCHASE_PRICE_COLUMN] - old_total
+
+        self.dataChanged.emit(self.index(index.row(), column),
+                              self.index(index.row(), _PURCHASE_TOTAL_COLUMN))
+        self.total_changed.emit(self._total)
+        return True
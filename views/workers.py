@@ -0,0 +1,126 @@
+# views\workers.py
+
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal, Slot
+
+
+class WorkerSignals(QObject):
+    finished = Signal(int, object)   # (número da tarefa, resultado)
+    failed = Signal(int, object)     # (número da tarefa, exceção)
+
+
+class Worker(QRunnable):
+    """Executa ``fn`` numa thread do QThreadPool e devolve o resultado por sinais.
+
+    Os sinais são entregues na thread da interface (conexão enfileirada).
+    Uma tarefa cancelada antes de começar não executa ``fn``; se já estiver
+    em andamento, o resultado é descartado.
+    """
+
+    def __init__(self, task_id, fn):
+        super().__init__()
+        self.setAutoDelete(False)  # a referência é mantida pelo TaskRunner
+        self.task_id = task_id
+        self.fn = fn
+        self.cancelled = False
+        self.signals = WorkerSignals()
+
+    def run(self):
+        result = None
+        if not self.cancelled:
+            try:
+                result = self.fn()
+            except Exception as e:
+                self.signals.failed.emit(self.task_id, e)
+                return
+        self.signals.finished.emit(self.task_id, result)
+
+
+class TaskRunner(QObject):
+    """Carregamentos em segundo plano de uma janela.
+
+    ``run(chave, fn, on_result, on_error)`` executa ``fn`` fora da thread da
+    interface e chama ``on_result(resultado)`` (ou ``on_error(exceção)``) na
+    thread da interface. Uma nova tarefa com a mesma chave cancela a anterior,
+    cujo resultado nunca é entregue. Enquanto houver tarefas, o ``busy_widget``
+    mostra o cursor de ocupado e ``busy_changed`` é emitido.
+
+    Deve ser filho da janela: se ela for destruída, os resultados pendentes
+    são ignorados.
+    """
+
+    busy_changed = Signal(bool)
+
+    def __init__(self, parent=None, busy_widget=None):
+        super().__init__(parent)
+        self.busy_widget = busy_widget
+        self._next_id = 0
+        self._tasks = {}     # chave -> (worker, on_result, on_error)
+        self._workers = {}   # número da tarefa -> worker ainda em execução
+        self._busy = False
+
+    def run(self, key, fn, on_result, on_error=None):
+        self.cancel(key)
+        self._next_id += 1
+        worker = Worker(self._next_id, fn)
+        worker.signals.finished.connect(self._on_finished, Qt.QueuedConnection)  # type: ignore
+        worker.signals.failed.connect(self._on_failed, Qt.QueuedConnection)  # type: ignore
+        self._tasks[key] = (worker, on_result, on_error)
+        self._workers[worker.task_id] = worker
+        self._update_busy()
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel(self, key):
+        """Cancela a tarefa ``key``, se houver (o resultado não será entregue)"""
+        task = self._tasks.pop(key, None)
+        if task is None:
+            return
+        worker = task[0]
+        worker.cancelled = True
+        if QThreadPool.globalInstance().tryTake(worker):
+            # Ainda não tinha começado: não emitirá nenhum sinal
+            self._workers.pop(worker.task_id, None)
+        self._update_busy()
+
+    def cancel_all(self):
+        for key in list(self._tasks):
+            self.cancel(key)
+
+    def is_busy(self):
+        return bool(self._tasks)
+
+    def _take(self, task_id):
+        self._workers.pop(task_id, None)
+        for key, task in self._tasks.items():
+            if task[0].task_id == task_id:
+                del self._tasks[key]
+                self._update_busy()
+                return task
+        return None  # tarefa cancelada ou substituída
+
+    @Slot(int, object)
+    def _on_finished(self, task_id, result):
+        task = self._take(task_id)
+        if task is not None:
+            task[1](result)
+
+    @Slot(int, object)
+    def _on_failed(self, task_id, error):
+        task = self._take(task_id)
+        if task is None:
+            return
+        if task[2] is not None:
+            task[2](error)
+        else:
+            print(f"Erro no carregamento em segundo plano: {error}")
+
+    def _update_busy(self):
+        busy = bool(self._tasks)
+        if busy == self._busy:
+            return
+        self._busy = busy
+        if self.busy_widget is not None:
+            if busy:
+                self.busy_widget.setCursor(Qt.BusyCursor)  # type: ignore
+            else:
+                self.busy_widget.unsetCursor()
+        self.busy_changed.emit(busy)